@@ -1,132 +1,442 @@
+import logging
 import time
-import pandas as pd
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from agents import SheetAgent, TextExtractionAgent, CriteriaAnalysisAgent
-from config import API_RATE_LIMIT_DELAY, COLUMN_NAMES
+from config import API_RATE_LIMIT_DELAY, COLUMN_NAMES, MAX_WORKERS, RESPONSE_CACHE_ENABLED, MULTI_RESUME_MAX_PER_REQUEST, DEDUP_ENABLED, INCREMENTAL_RESCREENING
+from cache import get_response_cache
+from candidate_store import DUPLICATE_COLUMN
+from dedup import DuplicateDetector, representatives, log_clusters
+from rate_limiter import get_rate_limiter
+from metrics import get_metrics
+from logging_setup import candidate_context, candidate_trace_id
+from sheet_io import iter_records
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = {**COLUMN_NAMES, "duplicate_of": DUPLICATE_COLUMN}
+
+def is_error_result(result):
+    """True for error verdicts ("Erro", "ERROR: ...", "Error: ...")"""
+    return str(result).lower().startswith("err")
 
 class AgentChain:
     """
     Main class that orchestrates the resume screening process by coordinating the agents
     """
     
-    def __init__(self, excel_path):
-        """Initialize the agent chain with the path to the Excel file"""
-        self.sheet_agent = SheetAgent(excel_path)
+    def __init__(self, excel_path, max_workers=MAX_WORKERS, store=None):
+        """Initialize the agent chain with the path to the Excel file (and optionally its own candidate store)"""
+        self.sheet_agent = SheetAgent(excel_path, store)
         self.extraction_agent = TextExtractionAgent()
         self.analysis_agent = CriteriaAnalysisAgent()
-        self.checkpoint_interval = 5  # Save every 5 candidates
+        self.duplicate_detector = DuplicateDetector() if DEDUP_ENABLED else None
         self.cv_folder = "cvs"  # Folder containing CV files
+        self.max_workers = max(1, int(max_workers or 1))
+        self._texts = {}  # Resume text extracted in batch, by CV path
+        self._previous = {}  # Stages recorded with outdated verdicts, by row index
+        self._stages = {}  # Stages behind each new verdict until it is written, by row index
     
     def run(self):
         """Run the complete agent chain to process all candidates"""
-        print("Starting resume screening process...")
+        logger.info("Starting resume screening process...")
         
         # Get candidates from sheet
         df = self.sheet_agent.get_candidates()
         
         # Get initial stats
         summary = self.sheet_agent.get_summary()
-        print(f"Found {summary['total']} candidates total")
-        print(f"Already processed: {summary['processed']} candidates")
-        print(f"Remaining to process: {summary['remaining']} candidates")
+        logger.info(f"Found {summary['total']} candidates total")
+        logger.info(f"Already processed: {summary['processed']} candidates")
+        logger.info(f"Remaining to process: {summary['remaining']} candidates")
         
-        # Create checkpoint counter
-        candidates_since_save = 0
+        # Verdicts reached with criteria, prompts or a model that changed since are screened again
+        if INCREMENTAL_RESCREENING:
+            self._previous = self.sheet_agent.outdated_candidates(self.analysis_agent)
+            if self._previous:
+                logger.info(f"Screening {len(self._previous)} candidates again: their verdict used criteria, prompts or a model "
+                      f"that changed since (unchanged stages are reused)")
         
-        # Process each candidate
-        for index, row in df.iterrows():
-            try:
-                # Skip if already processed
-                if pd.notna(row[COLUMN_NAMES["result"]]):
-                    continue
-                
-                # Update progress
-                current = index + 1
-                print(f"\nProcessing candidate {current}/{summary['total']}: {row[COLUMN_NAMES['name']]}")
-                
-                # Check if there's a PDF_Filename for this candidate
-                if pd.isna(row[COLUMN_NAMES['pdf_filename']]):
-                    print(f"Error: No PDF file linked for {row[COLUMN_NAMES['name']]}")
-                    self.sheet_agent.update_candidate_status(index, "Erro")
-                    # Increment the candidates processed counter
-                    candidates_since_save += 1
-                    # Save immediately after errors
-                    self.sheet_agent.save_results()
-                    candidates_since_save = 0
-                    continue
-                
-                # Get the PDF filename from the column
-                pdf_filename = row[COLUMN_NAMES['pdf_filename']]
-                cv_path = os.path.join(self.cv_folder, pdf_filename)
-                
-                # Check if the file exists
-                if not os.path.exists(cv_path):
-                    print(f"Error: CV file not found at {cv_path}")
-                    self.sheet_agent.update_candidate_status(index, "Erro")
-                    # Save immediately after errors
-                    self.sheet_agent.save_results()
-                    candidates_since_save = 0
-                    continue
-                
-                # Extract text from CV file
-                print(f"Extracting resume from: {cv_path}")
-                resume_text = self.extraction_agent.extract_text_from_local_file(cv_path)
-                
-                if resume_text.startswith("Error"):
-                    print(f"Error extracting resume: {resume_text}")
-                    self.sheet_agent.update_candidate_status(index, "Erro")
-                    # Increment the candidates processed counter
-                    candidates_since_save += 1
-                    # Save immediately after errors
-                    self.sheet_agent.save_results()
-                    candidates_since_save = 0
-                    continue
-                
-                # Analyze resume against criteria
-                print("Analyzing resume against criteria...")
-                result = self.analysis_agent.analyze_resume(resume_text)
-                
-                # Update sheet with result
-                self.sheet_agent.update_candidate_status(index, result)
-                print(f"Result for {row[COLUMN_NAMES['name']]}: {result}")
-                
-                # Increment the candidates processed counter
-                candidates_since_save += 1
-                
-                # Save progress periodically or after each candidate based on checkpoint_interval
-                if candidates_since_save >= self.checkpoint_interval:
-                    print(f"Saving progress after processing {candidates_since_save} candidates...")
-                    self.sheet_agent.save_results()
-                    candidates_since_save = 0
-                
-                # Rate limiting to avoid API throttling
-                time.sleep(API_RATE_LIMIT_DELAY)
-                
-            except Exception as e:
-                print(f"Error processing candidate {row[COLUMN_NAMES['name']]}: {str(e)}")
-                self.sheet_agent.update_candidate_status(index, "Erro")
-                # Save immediately after errors
-                self.sheet_agent.save_results()
-                candidates_since_save = 0
-        
-        # Save final results if any unsaved changes
-        if candidates_since_save > 0:
-            print(f"Saving final progress...")
+        # Duplicates left waiting by a representative that failed in an earlier run are screened now
+        self._replace_failed_representatives()
+        
+        # Skip candidates that were already processed in a previous run, and
+        # re-submissions waiting for the verdict of their group's representative
+        records = [row for row in iter_records(df, RECORD_FIELDS) if row.duplicate_of is None]
+        pending = [(row.index, row) for row in records if row.result is None or row.index in self._previous]
+        screened = [
+            (row.index, row) for row in records
+            if row.result is not None and row.index not in self._previous and not is_error_result(row.result)
+        ]
+        
+        multi_resume = self.analysis_agent.multi_resume_agent is not None
+        if multi_resume or self.max_workers > 1 or self.duplicate_detector is not None:
+            self._prefetch_texts(pending)
+        if self.duplicate_detector is not None and pending:
+            pending = self._skip_duplicates(pending, screened)
+        
+        # Pick the multi-resume, sequential or worker-pool engine
+        if multi_resume:
+            logger.info(f"Screening {len(pending)} candidates, up to {MULTI_RESUME_MAX_PER_REQUEST} per Gemini request...")
+            results = self._screen_grouped(pending, MULTI_RESUME_MAX_PER_REQUEST)
+        elif self.max_workers > 1:
+            logger.info(f"Screening {len(pending)} candidates with {self.max_workers} workers...")
+            results = self._screen_parallel(pending, summary['total'])
+        else:
+            results = self._screen_sequential(pending, summary['total'])
+        
+        screened = self._write_results(results)
+        
+        # Duplicates of a representative that failed just now wait for the next latest submission instead
+        replacements = self._replace_failed_representatives()
+        if replacements:
+            screened += self._write_results(self._screen_sequential(replacements, summary['total']))
+        
+        # Duplicates get the verdict of their representative
+        copied = self.sheet_agent.propagate_duplicates()
+        if copied:
+            logger.info(f"Copied verdicts to {len(copied)} duplicate submissions")
+        
+        # Export the Excel file once, at the end
+        if screened > 0 or copied:
+            logger.info("Exporting results...")
             self.sheet_agent.save_results()
         
         # Get final stats
         final_summary = self.sheet_agent.get_summary()
         
         # Print summary
-        print("\n===== Resume Screening Complete =====")
-        print(f"Total candidates: {final_summary['total']}")
-        print(f"Processed: {final_summary['processed']}")
-        print(f"Approved ('Sim'): {final_summary['approved']}")
-        print(f"Rejected ('Não'): {final_summary['rejected']}")
-        print(f"Errors: {final_summary['errors']}")
-        print("=====================================")
+        logger.info("===== Resume Screening Complete =====")
+        logger.info(f"Total candidates: {final_summary['total']}")
+        logger.info(f"Processed: {final_summary['processed']}")
+        logger.info(f"Approved ('Sim'): {final_summary['approved']}")
+        logger.info(f"Rejected ('Não'): {final_summary['rejected']}")
+        logger.info(f"Errors: {final_summary['errors']}")
+        prefilter = self.analysis_agent.prefilter_summary()
+        if prefilter:
+            logger.info(f"Local pre-filter: {prefilter['accepted']} approved, {prefilter['rejected']} rejected, "
+                  f"{prefilter['ambiguous']} sent to Gemini ({prefilter['llm_calls_saved']} Gemini calls saved)")
+        sections = self.analysis_agent.section_summary()
+        if sections and sections['candidates']:
+            logger.info(f"Section extraction: {sections['tokens_saved']} resume tokens saved "
+                  f"({sections['tokens_saved_per_candidate']:.0f} per candidate sent to Gemini)")
+        usage = get_rate_limiter().usage_summary()
+        if usage:
+            logger.info(f"Gemini input tokens: {usage['prompt_tokens']} ({usage['cached_tokens']} cached, "
+                  f"{usage['uncached_tokens']} uncached, {usage['cached_ratio']:.0%} cached by Gemini)")
+        if RESPONSE_CACHE_ENABLED:
+            cache_stats = get_response_cache().stats()
+            logger.info(f"Gemini cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+        get_metrics().report()
+        logger.info("=====================================")
         
         return final_summary 
+    
+    def _write_results(self, results):
+        """Write results back in sheet order, each one committed to the candidate store; returns how many were written"""
+        written = 0
+        for index, row, result, is_error in results:
+            stages = self._stages.pop(index, None)
+            with candidate_context(candidate_trace_id(index)):
+                if is_error and index in self._previous:
+                    # An outdated verdict is still better than an error
+                    logger.warning(f"Screening {row.name} again failed, keeping the previous verdict")
+                    continue
+                self.sheet_agent.update_candidate_status(index, result, None if is_error else stages)
+                if not is_error:
+                    logger.info(f"Result for {row.name}: {result}")
+            written += 1
+        return written
+    
+    def _prefetch_texts(self, pending):
+        """
+        Extract all pending PDFs up front on a process pool
+        
+        Screening threads would otherwise run PyPDF2 one at a time behind the GIL.
+        The extracted text is kept in memory and looked up by _screen_candidate.
+        """
+        paths = []
+        for _, row in pending:
+            if row.pdf_filename is not None:
+                cv_path = os.path.join(self.cv_folder, row.pdf_filename)
+                if os.path.exists(cv_path):
+                    paths.append(cv_path)
+        
+        logger.info(f"Extracting text from {len(paths)} resumes...")
+        for cv_path, text in self.extraction_agent.extract_texts_from_local_files(paths):
+            self._texts[cv_path] = text
+    
+    def _skip_duplicates(self, pending, screened=()):
+        """
+        Keep one candidate per group of duplicate submissions
+        
+        Candidates with the same form email or a near-identical resume are
+        grouped, together with the candidates screened in earlier runs. A group
+        with a screened candidate reuses the verdict of its latest screened
+        submission; otherwise only the latest submission is screened. The others
+        are marked to receive that verdict once it is known.
+        """
+        # Screened resumes only join the index; their text mostly comes from the extraction cache
+        screened = list(screened)
+        self._prefetch_texts(screened)
+        candidates = list(pending) + screened
+        texts = {}
+        for index, row in candidates:
+            if row.pdf_filename is not None:
+                resume_text = self._texts.get(os.path.join(self.cv_folder, row.pdf_filename))
+                # Scans have next to no text, so any two of them would look identical
+                if resume_text is not None and not resume_text.startswith("Error") and self._scanned_pdf(row, resume_text) is None:
+                    texts[index] = resume_text
+        
+        # Candidates whose CV could not be read are screened (and fail) on their own
+        emails = {index: row.email for index, row in candidates if index in texts}
+        with get_metrics().timer("deduplicate"):
+            groups = self.duplicate_detector.find_groups(texts, emails)
+        
+        done = {index for index, _ in screened}
+        duplicates = {}
+        for group in groups:
+            waiting = [index for index in group if index not in done]
+            reusable = [index for index in group if index in done]
+            # A group with no pending submission needs nothing; screened rows are never re-pointed
+            if waiting:
+                representative = reusable[-1] if reusable else group[-1]
+                duplicates.update({index: representative for index in waiting if index != representative})
+        groups = [group for group in groups if any(index not in done for index in group)]
+        log_clusters(groups, {index: row.name for index, row in candidates}, duplicates)
+        
+        # Screened resumes are not needed any more
+        for index, row in screened:
+            self._texts.pop(os.path.join(self.cv_folder, row.pdf_filename), None)
+        if not duplicates:
+            return pending
+        
+        get_metrics().increment("duplicates_skipped", value=len(duplicates))
+        reused = sum(1 for representative in duplicates.values() if representative in done)
+        if reused:
+            logger.info(f"{reused} re-submissions reuse the verdict of a candidate screened earlier")
+        self.sheet_agent.mark_duplicates(duplicates)
+        for index, row in pending:
+            if index in duplicates:
+                self._texts.pop(os.path.join(self.cv_folder, row.pdf_filename), None)
+        return [(index, row) for index, row in pending if index not in duplicates]
+    
+    def _replace_failed_representatives(self):
+        """
+        Give the duplicates of representatives whose screening failed a new representative
+        
+        Errors are not copied to duplicates, so they would wait forever. The
+        latest waiting duplicate of each such group is released to be screened
+        on its own, and the rest of the group waits for its verdict instead.
+        
+        Returns:
+            list: (index, row) of the released candidates
+        """
+        rows = {row.index: row for row in iter_records(self.sheet_agent.get_candidates(), RECORD_FIELDS)}
+        duplicates = {}
+        released = []
+        for representative, members in self.sheet_agent.duplicate_groups().items():
+            if representative not in rows or not is_error_result(rows[representative].result):
+                continue
+            waiting = [index for index in members if index in rows and rows[index].result is None]
+            if not waiting:
+                continue
+            released.append(waiting[-1])
+            duplicates.update({index: waiting[-1] for index in waiting[:-1]})
+        if not released:
+            return []
+        
+        logger.info(f"Screening {len(released)} duplicate submissions whose representative failed")
+        self.sheet_agent.mark_duplicates(duplicates, released)
+        return [(index, rows[index]) for index in released]
+    
+    def _screen_sequential(self, pending, total):
+        """Screen candidates one at a time, yielding (index, row, result, is_error)"""
+        for index, row in pending:
+            with candidate_context(candidate_trace_id(index)):
+                logger.info(f"Processing candidate {index + 1}/{total}: {row.name}")
+            result, is_error = self._screen_with_trace(index, row)
+            yield index, row, result, is_error
+            
+            # Rate limiting to avoid API throttling
+            if not is_error:
+                time.sleep(API_RATE_LIMIT_DELAY)
+    
+    def _screen_parallel(self, pending, total):
+        """
+        Screen candidates on a thread pool, yielding (index, row, result, is_error)
+        
+        At most a small window of candidates is in flight at once, and results are
+        yielded in sheet order so the caller writes them back deterministically.
+        Only the caller touches the SheetAgent; workers just extract and analyze.
+        """
+        window = self.max_workers * 2
+        in_flight = deque()
+        candidates = iter(pending)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while True:
+                    # Keep the window full
+                    while len(in_flight) < window:
+                        try:
+                            index, row = next(candidates)
+                        except StopIteration:
+                            break
+                        logger.debug(f"Queued candidate {index + 1}/{total}: {row.name}")
+                        in_flight.append((index, row, executor.submit(self._screen_with_trace, index, row)))
+                    
+                    if not in_flight:
+                        break
+                    
+                    # Wait for the oldest candidate so results stay in order
+                    index, row, future = in_flight.popleft()
+                    result, is_error = future.result()
+                    yield index, row, result, is_error
+            finally:
+                # Drop queued work if the caller stops early (e.g. Ctrl+C)
+                for _, _, future in in_flight:
+                    future.cancel()
+    
+    def _screen_grouped(self, pending, group_size):
+        """
+        Screen candidates in groups that share multi-resume Gemini requests, yielding (index, row, result, is_error)
+        
+        Groups run on the thread pool, a small window at a time, and results are
+        yielded in sheet order like in _screen_parallel.
+        """
+        groups = [pending[start:start + group_size] for start in range(0, len(pending), group_size)]
+        window = self.max_workers * 2
+        in_flight = deque()
+        remaining = iter(groups)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while True:
+                    while len(in_flight) < window:
+                        group = next(remaining, None)
+                        if group is None:
+                            break
+                        in_flight.append((group, executor.submit(self._screen_group, group)))
+                    
+                    if not in_flight:
+                        break
+                    
+                    group, future = in_flight.popleft()
+                    for (index, row), (result, is_error) in zip(group, future.result()):
+                        yield index, row, result, is_error
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+    
+    def _screen_group(self, group):
+        """Load the resumes of a group of (index, row) and analyze them together; returns [(result, is_error)]"""
+        outcomes = [("Erro", True)] * len(group)
+        texts = {}
+        for position, (index, row) in enumerate(group):
+            with candidate_context(candidate_trace_id(index)):
+                resume_text = self._load_resume(row)
+                if resume_text is None:
+                    continue
+                pdf_content = self._scanned_pdf(row, resume_text)
+                if pdf_content is None:
+                    texts[position] = resume_text
+                    continue
+                # Scans cannot share a text request, they get a multimodal request of their own
+                stages = {}
+                try:
+                    verdict = self.analysis_agent.analyze_scanned(pdf_content, previous=self._previous.get(index), stages=stages)
+                except Exception as e:
+                    logger.warning(f"Error analyzing the scanned resume of {row.name}: {str(e)}")
+                    continue
+                outcomes[position] = (verdict, False)
+                self._stages[index] = stages
+        
+        indexes = [group[position][0] for position in texts]
+        stages = [{} for _ in indexes]
+        try:
+            verdicts = self.analysis_agent.analyze_batch(
+                list(texts.values()), previous=[self._previous.get(index) for index in indexes], stages=stages
+            )
+        except Exception as e:
+            logger.warning(f"Error analyzing a group of {len(texts)} candidates: {str(e)}")
+            return outcomes
+        for position, index, verdict, verdict_stages in zip(texts, indexes, verdicts, stages):
+            outcomes[position] = (verdict, verdict == "Erro")
+            self._stages[index] = verdict_stages
+        return outcomes
+    
+    def _screen_with_trace(self, index, row):
+        """Screen a candidate with its trace ID on every log record of this thread"""
+        with candidate_context(candidate_trace_id(index)):
+            return self._screen_candidate(row)
+    
+    def _screen_candidate(self, row):
+        """
+        Extract and analyze a single candidate's resume
+        
+        Returns:
+            tuple: (result, is_error) where result is "Sim", "Não" or "Erro"
+        """
+        name = row.name
+        try:
+            resume_text = self._load_resume(row)
+            if resume_text is None:
+                return "Erro", True
+            
+            # Analyze resume against criteria, reusing the stages of an outdated verdict that still hold
+            logger.debug(f"Analyzing resume of {name} against criteria...")
+            stages = {}
+            previous = self._previous.get(row.index)
+            pdf_content = self._scanned_pdf(row, resume_text)
+            if pdf_content is not None:
+                result = self.analysis_agent.analyze_scanned(pdf_content, previous=previous, stages=stages)
+            else:
+                result = self.analysis_agent.analyze_resume(resume_text, previous=previous, stages=stages)
+            self._stages[row.index] = stages
+            return result, False
+            
+        except Exception as e:
+            logger.warning(f"Error processing candidate {name}: {str(e)}")
+            return "Erro", True
+    
+    def _scanned_pdf(self, row, resume_text):
+        """Return the bytes of a candidate's CV when it is a scan to screen as a PDF, else None"""
+        if self.analysis_agent.scanned_agent is None:
+            return None
+        return self.extraction_agent.read_scanned_pdf(os.path.join(self.cv_folder, row.pdf_filename), resume_text)
+    
+    def _load_resume(self, row):
+        """Return the text of a candidate's CV, or None (after logging why) when it cannot be read"""
+        try:
+            # Check if there's a PDF_Filename for this candidate
+            if row.pdf_filename is None:
+                logger.warning(f"No PDF file linked for {row.name}")
+                return None
+            
+            # Get the PDF filename from the column
+            cv_path = os.path.join(self.cv_folder, row.pdf_filename)
+            
+            # Check if the file exists
+            if not os.path.exists(cv_path):
+                logger.warning(f"CV file not found at {cv_path}")
+                return None
+            
+            # Extract text from CV file, unless it was already extracted in batch
+            resume_text = self._texts.pop(cv_path, None)
+            if resume_text is None:
+                logger.debug(f"Extracting resume from: {cv_path}")
+                resume_text = self.extraction_agent.extract_text_from_local_file(cv_path)
+            
+            if resume_text.startswith("Error"):
+                logger.warning(f"Error extracting resume: {resume_text}")
+                return None
+            return resume_text
+            
+        except Exception as e:
+            logger.warning(f"Error processing candidate {row.name}: {str(e)}")
+            return None
 
 class AgentPDFProcessor:
     """
@@ -138,7 +448,7 @@ class AgentPDFProcessor:
         self.extraction_agent = TextExtractionAgent()
         self.analysis_agent = CriteriaAnalysisAgent()
     
-    def process_pdf(self, pdf_path, person_name=None, email=None):
+    def process_pdf(self, pdf_path, person_name=None, email=None, previous=None, stages=None):
         """
         Process a PDF file and extract/analyze its content
         
@@ -146,6 +456,8 @@ class AgentPDFProcessor:
             pdf_path (str): Path to the PDF file
             person_name (str, optional): Name of the person associated with the PDF
             email (str, optional): Email of the person associated with the PDF
+            previous (dict, optional): Stages of an outdated verdict, reused where still up to date
+            stages (dict, optional): Filled with the stages behind the new verdict
             
         Returns:
             str: Analysis result or error message
@@ -153,24 +465,32 @@ class AgentPDFProcessor:
         try:
             # Extract text from PDF file
             if person_name:
-                print(f"Extracting resume for {person_name} from: {pdf_path}")
+                logger.debug(f"Extracting resume for {person_name} from: {pdf_path}")
             else:
-                print(f"Extracting resume from: {pdf_path}")
+                logger.debug(f"Extracting resume from: {pdf_path}")
                 
             resume_text = self.extraction_agent.extract_text_from_local_file(pdf_path)
             
             if resume_text.startswith("Error"):
-                print(f"Error extracting resume: {resume_text}")
+                logger.warning(f"Error extracting resume: {resume_text}")
                 return f"Error: {resume_text}"
             
+            # Scans go to Gemini as a PDF, everything else is screened from its text
+            pdf_content = None
+            if self.analysis_agent.scanned_agent is not None:
+                pdf_content = self.extraction_agent.read_scanned_pdf(pdf_path, resume_text)
+            
             # Analyze resume against criteria
-            print("Analyzing resume against criteria...")
-            result = self.analysis_agent.analyze_resume(resume_text)
+            logger.debug("Analyzing resume against criteria...")
+            if pdf_content is not None:
+                result = self.analysis_agent.analyze_scanned(pdf_content, previous=previous, stages=stages)
+            else:
+                result = self.analysis_agent.analyze_resume(resume_text, previous=previous, stages=stages)
             
             # Return the result
             return result
             
         except Exception as e:
             error_msg = f"Error processing PDF: {str(e)}"
-            print(error_msg)
+            logger.warning(error_msg)
             return error_msg 
\ No newline at end of file
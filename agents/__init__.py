@@ -2,4 +2,9 @@ from .sheet_agent import SheetAgent
 from .extraction_agent import TextExtractionAgent
 from .analysis_agent import CriteriaAnalysisAgent
 from .university_filter_agent import UniversityFilterAgent
-from .company_filter_agent import CompanyFilterAgent 
\ No newline at end of file
+from .company_filter_agent import CompanyFilterAgent
+from .combined_screening_agent import CombinedScreeningAgent
+from .prefilter_agent import KeywordPreFilterAgent
+from .section_agent import ResumeSectionAgent
+from .multi_resume_agent import MultiResumeScreeningAgent
+from .scanned_resume_agent import ScannedResumeAgent
\ No newline at end of file
@@ -1,42 +1,341 @@
+import logging
+import asyncio
+import threading
 import google.generativeai as genai
-from config import GEMINI_MODEL, CRITERIA
+from config import (
+    GEMINI_MODEL, CRITERIA, USE_COMBINED_SCREENING, USE_LOCAL_PREFILTER, ASYNC_MAX_IN_FLIGHT,
+    USE_SECTION_EXTRACTION, SECTION_TOKEN_BUDGETS, MULTI_RESUME_SCREENING, SCANNED_PDF_ROUTING
+)
 from utils import rate_limited_request
+from cache import sha256_text
 from agents.university_filter_agent import UniversityFilterAgent
 from agents.company_filter_agent import CompanyFilterAgent
+from agents.combined_screening_agent import CombinedScreeningAgent, screening_verdict
+from agents.prefilter_agent import KeywordPreFilterAgent
+from agents.section_agent import ResumeSectionAgent
+from agents.multi_resume_agent import MultiResumeScreeningAgent
+from agents.scanned_resume_agent import ScannedResumeAgent
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
 
 class CriteriaAnalysisAgent:
     """Agent responsible for analyzing resume text against criteria using specialized agents"""
     
-    def __init__(self):
+    def __init__(self, combined=USE_COMBINED_SCREENING, prefilter=USE_LOCAL_PREFILTER, sections=USE_SECTION_EXTRACTION,
+                 multi_resume=MULTI_RESUME_SCREENING, scanned=SCANNED_PDF_ROUTING):
         """Initialize the analysis agent with specialized filter agents"""
         self.university_agent = UniversityFilterAgent()
         self.company_agent = CompanyFilterAgent()
+        self.combined_agent = CombinedScreeningAgent() if combined else None
+        self.prefilter_agent = KeywordPreFilterAgent() if prefilter else None
+        self.section_agent = ResumeSectionAgent(SECTION_TOKEN_BUDGETS) if sections else None
+        self.multi_resume_agent = MultiResumeScreeningAgent() if multi_resume else None
+        self.scanned_agent = ScannedResumeAgent() if scanned else None
+        self.llm_calls_saved = 0
+        self.candidates_trimmed = 0
+        self._stats_lock = threading.Lock()
+        self.fingerprints = self._stage_fingerprints()
     
-    def analyze_resume(self, resume_text):
+    def _stage_fingerprints(self):
+        """
+        Fingerprint of everything each screening stage depends on besides the resume
+        
+        Criteria keywords, prompt template and model come from the agent; the
+        section budget decides which part of the resume the stage receives.
+        """
+        agents = {
+            "university": self.university_agent, "company": self.company_agent,
+            "combined": self.combined_agent, "multi_resume": self.multi_resume_agent
+        }
+        fingerprints = {}
+        for name, agent in agents.items():
+            if agent is None:
+                continue
+            section_agent_name = "combined" if name == "multi_resume" else name
+            sections = self.section_agent.token_budgets[section_agent_name] if self.section_agent is not None else "full"
+            fingerprints[name] = sha256_text(f"{agent.fingerprint}\nsections={sections}")
+        if self.prefilter_agent is not None:
+            fingerprints["prefilter"] = self.prefilter_agent.fingerprint
+        if self.scanned_agent is not None:
+            # Always sees the whole PDF, so no section budget
+            fingerprints["scanned"] = self.scanned_agent.fingerprint
+        return fingerprints
+    
+    def outdated_stages(self, stages):
+        """Names of the recorded stages whose fingerprint no longer matches (stages that failed always count)"""
+        return [name for name, entry in stages.items() if name in self.fingerprints and entry.get("fp") != self.fingerprints[name]]
+    
+    def analyze_resume(self, resume_text, previous=None, stages=None):
         """
         Analyze resume text using specialized agents to check if criteria are met:
         1. Currently enrolled in an undergraduate program at Federal/State university (UniversityFilterAgent)
         2. Has done scientific research OR works at a recognized company (CompanyFilterAgent)
+        
+        In combined mode both criteria are checked with a single JSON request,
+        falling back to the two-step flow if the answer cannot be validated.
+        Clear-cut resumes are decided by the local keyword pre-filter first.
+        
+        Args:
+            resume_text (str): The resume
+            previous (dict, optional): Stages recorded with an earlier verdict; those whose
+                fingerprint still matches are reused instead of being run again
+            stages (dict, optional): Filled with the stages behind this verdict, for the next run
+        """
+        verdict = self._prefilter_stage(resume_text, stages)
+        if verdict is not None:
+            return verdict
+        return self._analyze_with_gemini(resume_text, previous=previous, stages=stages)
+    
+    def analyze_scanned(self, pdf_content, previous=None, stages=None):
+        """
+        Check both criteria of a scanned resume with one multimodal request on the PDF itself
+        
+        Scans carry almost no extractable text, so the text prompts and the
+        keyword pre-filter would only see an empty resume. previous and stages
+        work as in analyze_resume.
+        """
+        logger.debug("Currículo digitalizado, verificando os critérios no próprio PDF...")
+        return self._run_stage(
+            "scanned", previous, stages,
+            lambda: (self._combined_verdict(self.scanned_agent.screen_pdf(pdf_content)), True)
+        )
+    
+    def analyze_batch(self, resume_texts, previous=None, stages=None):
         """
+        Analyze several resumes, packing those Gemini has to decide into multi-resume requests
+        
+        Resumes the batched answer leaves out, even after retrying them in
+        smaller requests, go through the one-resume flow of analyze_resume;
+        those whose request failed with an API error after its retries are errors.
+        Without multi-resume screening this is analyze_resume in a loop.
+        previous and stages are lists with one entry per resume, as in analyze_resume.
+        
+        Returns:
+            list: "Sim", "Não" or "Erro" for each resume, in input order
+        """
+        previous = previous or [None] * len(resume_texts)
+        stages = stages or [None] * len(resume_texts)
+        verdicts = [self._prefilter_stage(resume_text, stages[position]) for position, resume_text in enumerate(resume_texts)]
+        pending = {position: resume_text for position, resume_text in enumerate(resume_texts) if verdicts[position] is None}
+        
+        results = {}
+        failed = set()
+        if self.multi_resume_agent is not None and pending:
+            to_send = {}
+            for position, resume_text in pending.items():
+                self._count_trimmed_candidate()
+                reused = self._reuse_stage("multi_resume", previous[position])
+                if reused is not None:
+                    verdicts[position] = reused
+                    self._record_stage("multi_resume", stages[position], reused)
+                else:
+                    to_send[position] = self.section_text("combined", resume_text)
+            results = self.multi_resume_agent.screen_many(to_send, failed)
+        
+        for position, resume_text in pending.items():
+            if verdicts[position] is not None:
+                continue
+            if position in failed:
+                verdicts[position] = "Erro"
+                continue
+            try:
+                if position in results:
+                    verdicts[position] = self._combined_verdict(results[position])
+                    self._record_stage("multi_resume", stages[position], verdicts[position])
+                else:
+                    verdicts[position] = self._analyze_with_gemini(
+                        resume_text, counted=self.multi_resume_agent is not None,
+                        previous=previous[position], stages=stages[position]
+                    )
+            except Exception as e:
+                logger.warning(f"Error analyzing resume: {str(e) or type(e).__name__}")
+                verdicts[position] = "Erro"
+        return verdicts
+    
+    def _analyze_with_gemini(self, resume_text, counted=False, previous=None, stages=None):
+        """Check the criteria of a resume the pre-filter could not decide"""
+        if not counted:
+            self._count_trimmed_candidate()
+        
+        if self.combined_agent is not None:
+            try:
+                return self._run_stage("combined", previous, stages, lambda: (self._analyze_combined(self.section_text("combined", resume_text)), True))
+            except Exception as e:
+                logger.warning(f"Combined screening failed ({str(e)}), falling back to step-by-step analysis...")
+        
         # Step 1: Check university criteria
-        print("Verificando critérios universitários...")
-        uni_passes, uni_message = self.university_agent.check_university_criteria(resume_text)
+        logger.debug("Verificando critérios universitários...")
+        uni_passes = self._run_stage(
+            "university", previous, stages,
+            lambda: self._run_check(self.university_agent.check_university_criteria, "university", resume_text)
+        )
         
         # If university criteria not met, reject immediately
         if not uni_passes:
-            print(f"Reprovado: {uni_message}")
+            logger.debug("Reprovado nos critérios universitários")
             return "Não"
         
-        print(f"Universidade aprovada: {uni_message}")
-        
         # Step 2: Check experience criteria
-        print("Verificando critérios de experiência...")
-        exp_passes, exp_message = self.company_agent.check_experience_criteria(resume_text)
+        logger.debug("Verificando critérios de experiência...")
+        exp_passes = self._run_stage(
+            "company", previous, stages,
+            lambda: self._run_check(self.company_agent.check_experience_criteria, "company", resume_text)
+        )
         
         # Final decision
-        if exp_passes:
-            print(f"Experiência aprovada: {exp_message}")
-            return "Sim"
+        return "Sim" if exp_passes else "Não"
+    
+    def _run_check(self, check, agent_name, resume_text):
+        """Run a filter agent check on its resume sections; returns (passes, ok) with ok False when the check failed"""
+        passes, message = check(self.section_text(agent_name, resume_text))
+        logger.debug(f"{'Aprovado' if passes else 'Reprovado'}: {message}")
+        return passes, not message.startswith("Erro")
+    
+    def _reuse_stage(self, name, previous):
+        """Return the previous result of a stage if its fingerprint still matches, else None"""
+        entry = (previous or {}).get(name)
+        if entry is None or entry.get("fp") is None or entry["fp"] != self.fingerprints.get(name):
+            return None
+        get_metrics().increment("screening_stages", stage=name, source="reused")
+        logger.debug(f"Reusing the {name} stage result of the previous screening")
+        return entry["result"]
+    
+    def _record_stage(self, name, stages, result, ok=True):
+        """Record a stage result with its fingerprint; failed stages get none, so the next run repeats them"""
+        if stages is not None:
+            stages[name] = {"fp": self.fingerprints.get(name) if ok else None, "result": result}
+    
+    def _run_stage(self, name, previous, stages, compute):
+        """Reuse a stage's previous result or compute it (compute returns (result, ok)), and record it"""
+        result = self._reuse_stage(name, previous)
+        ok = True
+        if result is None:
+            result, ok = compute()
+            get_metrics().increment("screening_stages", stage=name, source="run")
+        self._record_stage(name, stages, result, ok)
+        return result
+    
+    def _prefilter_stage(self, resume_text, stages):
+        """Return the pre-filter verdict (None when Gemini has to decide) and record it"""
+        if self.prefilter_agent is None:
+            return None
+        # Local and deterministic, so it is simply run again
+        verdict = self._prefilter(resume_text)
+        self._record_stage("prefilter", stages, verdict)
+        return verdict
+    
+    async def analyze_resume_async(self, resume_text):
+        """
+        Async version of analyze_resume
+        
+        Gemini calls run on the event loop, so hundreds of resumes can be in
+        flight at once without a thread each; identical prompts are coalesced.
+        """
+        verdict = self._prefilter(resume_text)
+        if verdict is not None:
+            return verdict
+        self._count_trimmed_candidate()
+        
+        if self.combined_agent is not None:
+            try:
+                logger.debug("Verificando todos os critérios em uma única requisição...")
+                return self._combined_verdict(await self.combined_agent.screen_async(self.section_text("combined", resume_text)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Combined screening failed ({str(e)}), falling back to step-by-step analysis...")
+        
+        # Step 1: Check university criteria
+        uni_passes, uni_message = await self.university_agent.check_university_criteria_async(self.section_text("university", resume_text))
+        if not uni_passes:
+            logger.debug(f"Reprovado: {uni_message}")
+            return "Não"
+        
+        # Step 2: Check experience criteria
+        exp_passes, exp_message = await self.company_agent.check_experience_criteria_async(self.section_text("company", resume_text))
+        logger.debug(f"{'Experiência aprovada' if exp_passes else 'Reprovado'}: {exp_message}")
+        return "Sim" if exp_passes else "Não"
+    
+    async def analyze_many_async(self, resume_texts, max_in_flight=ASYNC_MAX_IN_FLIGHT):
+        """
+        Screen many resumes concurrently on the running event loop
+        
+        Returns:
+            list: "Sim", "Não" or "Erro" for each resume, in input order
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+        
+        async def screen(resume_text):
+            async with semaphore:
+                try:
+                    return await self.analyze_resume_async(resume_text)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Error analyzing resume: {str(e) or type(e).__name__}")
+                    return "Erro"
+        
+        return await asyncio.gather(*(screen(resume_text) for resume_text in resume_texts))
+    
+    def _prefilter(self, resume_text):
+        """Return the local pre-filter verdict, or None when Gemini has to decide"""
+        if self.prefilter_agent is None:
+            return None
+        verdict, reason = self.prefilter_agent.decide(resume_text)
+        get_metrics().increment("prefilter_decisions", decision={"Sim": "accepted", "Não": "rejected"}.get(verdict, "ambiguous"))
+        if verdict is not None:
+            self._count_saved_calls(verdict)
+            logger.debug(f"{'Aprovado' if verdict == 'Sim' else 'Reprovado'} pelo pré-filtro local: {reason}")
+        return verdict
+    
+    def section_text(self, agent_name, resume_text):
+        """Return the part of the resume sent to an agent ("university", "company" or "combined")"""
+        if self.section_agent is None:
+            return resume_text
+        selected, _ = self.section_agent.select(agent_name, resume_text)
+        return selected
+    
+    def _count_trimmed_candidate(self):
+        """Count a candidate whose resume goes to Gemini, for the per-candidate savings"""
+        with self._stats_lock:
+            self.candidates_trimmed += 1
+    
+    def _analyze_combined(self, resume_text):
+        """Check both criteria with one request and return Sim or Não"""
+        logger.debug("Verificando todos os critérios em uma única requisição...")
+        return self._combined_verdict(self.combined_agent.screen(resume_text))
+    
+    def _combined_verdict(self, result):
+        """Turn a validated combined screening result into Sim or Não"""
+        verdict = screening_verdict(result)
+        logger.debug(f"{'Aprovado' if verdict == 'Sim' else 'Reprovado'}: {result['reasons']}")
+        return verdict
+    
+    def _count_saved_calls(self, verdict):
+        """Add the Gemini requests a local decision avoided"""
+        if self.combined_agent is not None:
+            saved = 1
         else:
-            print(f"Reprovado: {exp_message}")
-            return "Não" 
\ No newline at end of file
+            # A rejection only skips the university check, an approval skips both checks
+            saved = 2 if verdict == "Sim" else 1
+        with self._stats_lock:
+            self.llm_calls_saved += saved
+    
+    def prefilter_summary(self):
+        """Return the pre-filter decision counts and the Gemini calls saved, or None if disabled"""
+        if self.prefilter_agent is None:
+            return None
+        summary = dict(self.prefilter_agent.stats)
+        summary["llm_calls_saved"] = self.llm_calls_saved
+        return summary
+    
+    def section_summary(self):
+        """Return resume tokens before and after section extraction and the savings per candidate, or None if disabled"""
+        if self.section_agent is None:
+            return None
+        summary = dict(self.section_agent.stats)
+        summary["tokens_saved"] = summary["tokens_before"] - summary["tokens_after"]
+        summary["candidates"] = self.candidates_trimmed
+        summary["tokens_saved_per_candidate"] = summary["tokens_saved"] / max(1, self.candidates_trimmed)
+        return summary
\ No newline at end of file
@@ -0,0 +1,140 @@
+import json
+import re
+import google.generativeai as genai
+from config import GEMINI_MODEL, CRITERIA
+from utils import cached_generate, cached_generate_async, prompt_fingerprint
+
+# Expected fields of the JSON answer and their types
+SCREENING_SCHEMA = {
+    "university_ok": bool,
+    "enrolled": bool,
+    "research": bool,
+    "company": bool,
+    "reasons": str
+}
+
+def parse_screening_result(response_text):
+    """
+    Parse and validate the JSON answer of a combined screening prompt
+
+    Raises:
+        ValueError: If the answer is not a JSON object matching SCREENING_SCHEMA
+    """
+    text = response_text.strip()
+    # Gemini often wraps JSON in a markdown code fence
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in screening answer: {str(e)}")
+
+    return validate_screening_result(data)
+
+def validate_screening_result(data):
+    """Check that a decoded answer matches SCREENING_SCHEMA and return it"""
+    if not isinstance(data, dict):
+        raise ValueError("Screening answer is not a JSON object")
+
+    for field, field_type in SCREENING_SCHEMA.items():
+        if field not in data:
+            raise ValueError(f"Screening answer is missing '{field}'")
+        if field == "reasons" and isinstance(data[field], list):
+            data[field] = "; ".join(str(reason) for reason in data[field])
+        if not isinstance(data[field], field_type):
+            raise ValueError(f"Screening answer field '{field}' must be {field_type.__name__}")
+
+    return data
+
+def screening_verdict(result):
+    """Return "Sim" or "Não" for a validated screening result"""
+    passes = result["university_ok"] and result["enrolled"] and (result["research"] or result["company"])
+    return "Sim" if passes else "Não"
+
+def criteria_instructions():
+    """
+    Describe each SCREENING_SCHEMA criterion with its CRITERIA keywords
+
+    Shared by every prompt that answers with these fields, so the screening
+    rules are written once.
+    """
+    university_types = ", ".join(CRITERIA["university_type"])
+    excluded_types = ", ".join(CRITERIA["excluded_university_type"])
+    education_keywords = ", ".join(CRITERIA["education_status"])
+    graduation_keywords = ", ".join(CRITERIA["graduation_keywords"])
+    research_keywords = ", ".join(CRITERIA["research_keywords"])
+    top_companies = ", ".join(CRITERIA["top_companies"])
+
+    return f"""enrolled: O candidato está ATUALMENTE CURSANDO a graduação (não se formou e não está apenas na pós).
+           Palavras-chave que indicam que está cursando: {education_keywords}
+           Palavras que indicam que já se formou: {graduation_keywords}
+
+        university_ok: A graduação é em uma universidade Federal ou Estadual (NÃO PODE SER PARTICULAR).
+           Palavras-chave para universidades aceitas: {university_types}
+           Exemplos de instituições NÃO aceitas: {excluded_types}
+           Em caso de dúvida sobre se a universidade é federal/estadual ou privada, presuma que é privada (false).
+
+        research: O candidato tem experiência em pesquisa científica ou iniciação científica.
+           Palavras-chave para experiência em pesquisa: {research_keywords}
+
+        company: O candidato trabalha ou trabalhou em uma empresa reconhecida no mercado.
+           Exemplos de empresas reconhecidas: {top_companies}
+           Considere também outras empresas de grande porte ou com boa reputação que não estejam nesta lista."""
+
+class CombinedScreeningAgent:
+    """Agent that checks university and experience criteria in a single Gemini request"""
+
+    def __init__(self):
+        """Initialize the combined screening agent with the Gemini model"""
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        # Instructions and keyword lists are the same for every candidate, so they are built once
+        self.prompt_prefix = self._create_prompt_prefix()
+        # Prompt with a placeholder instead of the resume, used as the cache key
+        self.prompt_template = self._create_analysis_prompt("{resume_text}")
+        # Identifies the criteria, prompt and model behind a stored verdict
+        self.fingerprint = prompt_fingerprint(self.prompt_template)
+
+    def screen(self, resume_text):
+        """
+        Evaluate both criteria with one request
+
+        Returns:
+            dict: Validated result with university_ok, enrolled, research, company and reasons
+
+        Raises:
+            ValueError: If Gemini does not return a valid JSON answer
+        """
+        prompt = self._create_analysis_prompt(resume_text)
+        response_text = cached_generate(
+            self.model, prompt, resume_text, self.prompt_template,
+            validate=parse_screening_result
+        )
+        return parse_screening_result(response_text)
+
+    async def screen_async(self, resume_text):
+        """Async version of screen"""
+        prompt = self._create_analysis_prompt(resume_text)
+        response_text = await cached_generate_async(
+            self.model, prompt, resume_text, self.prompt_template,
+            validate=parse_screening_result
+        )
+        return parse_screening_result(response_text)
+
+    def _create_analysis_prompt(self, resume_text):
+        """Create a prompt that asks for both criteria as a JSON object"""
+        return self.prompt_prefix + resume_text
+    
+    def _create_prompt_prefix(self):
+        """Build the static part of the prompt (instructions and CRITERIA keywords) that precedes the resume"""
+        return f"""
+        Analise o currículo a seguir e avalie cada um dos critérios abaixo de forma independente.
+
+        {criteria_instructions()}
+
+        Responda APENAS com um objeto JSON, sem texto adicional, no formato:
+        {{"university_ok": true/false, "enrolled": true/false, "research": true/false, "company": true/false, "reasons": "justificativa curta"}}
+
+        Texto do currículo:
+        """
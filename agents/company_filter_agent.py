@@ -1,6 +1,10 @@
+import logging
 import google.generativeai as genai
 from config import GEMINI_MODEL, CRITERIA
-from utils import rate_limited_request
+from utils import cached_generate, cached_generate_async, prompt_fingerprint
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
 
 class CompanyFilterAgent:
     """Agent responsible for analyzing if a candidate meets company/research criteria"""
@@ -8,6 +12,12 @@ class CompanyFilterAgent:
     def __init__(self):
         """Initialize the company filter agent with the Gemini model"""
         self.model = genai.GenerativeModel(GEMINI_MODEL)
+        # Instructions and keyword lists are the same for every candidate, so they are built once
+        self.prompt_prefix = self._create_prompt_prefix()
+        # Prompt with a placeholder instead of the resume, used as the cache key
+        self.prompt_template = self._create_analysis_prompt("{resume_text}")
+        # Identifies the criteria, prompt and model behind a stored verdict
+        self.fingerprint = prompt_fingerprint(self.prompt_template)
     
     def check_experience_criteria(self, resume_text):
         """
@@ -17,22 +27,46 @@ class CompanyFilterAgent:
         prompt = self._create_analysis_prompt(resume_text)
         
         try:
-            # Generate the analysis with Gemini using rate limiting
-            response = rate_limited_request(self.model.generate_content, prompt)
-            result = response.text.strip().lower()
-            
-            # Determine the result
-            if "sim" in result:
-                return True, "Candidato atende aos critérios de experiência"
-            else:
-                return False, "Candidato não atende aos critérios de experiência"
+            # Generate the analysis with Gemini (cached and rate limited)
+            with get_metrics().timer("criteria_check", agent="company"):
+                response_text = cached_generate(self.model, prompt, resume_text, self.prompt_template)
+            return self._parse_result(response_text)
                 
         except Exception as e:
-            print(f"Error analyzing experience criteria: {str(e)}")
+            logger.warning(f"Error analyzing experience criteria: {str(e)}")
             return False, f"Erro na análise: {str(e)}"
     
+    async def check_experience_criteria_async(self, resume_text):
+        """
+        Async version of check_experience_criteria, for screening many resumes on one event loop
+        """
+        prompt = self._create_analysis_prompt(resume_text)
+        
+        try:
+            with get_metrics().timer("criteria_check", agent="company"):
+                response_text = await cached_generate_async(self.model, prompt, resume_text, self.prompt_template)
+            return self._parse_result(response_text)
+        
+        except Exception as e:
+            logger.warning(f"Error analyzing experience criteria: {str(e) or type(e).__name__}")
+            return False, f"Erro na análise: {str(e) or type(e).__name__}"
+    
+    def _parse_result(self, response_text):
+        """Turn Gemini's answer into (passes, message)"""
+        result = response_text.strip().lower()
+        
+        # Determine the result
+        if "sim" in result:
+            return True, "Candidato atende aos critérios de experiência"
+        else:
+            return False, "Candidato não atende aos critérios de experiência"
+    
     def _create_analysis_prompt(self, resume_text):
         """Create a clear prompt for analyzing experience criteria"""
+        return self.prompt_prefix + resume_text
+    
+    def _create_prompt_prefix(self):
+        """Build the static part of the prompt (instructions and CRITERIA keywords) that precedes the resume"""
         # Get criteria from config
         research_keywords = ", ".join(CRITERIA["research_keywords"])
         top_companies = ", ".join(CRITERIA.get("top_companies", ["Google", "Microsoft", "Amazon", "Meta", "Apple", "IBM", "Oracle", "SAP", "Intel", "Cisco", "Dell", "HP", "NVIDIA", "Samsung", "Sony", "Siemens", "LG", "Huawei", "Accenture", "Capgemini", "Deloitte", "Ernst & Young", "KPMG", "PwC", "BCG", "McKinsey", "Bain", "Globo", "Itaú", "Bradesco", "Santander", "Banco do Brasil", "Caixa", "Vale", "Petrobras", "Embraer", "Ambev", "Natura"]))
@@ -53,4 +87,4 @@ class CompanyFilterAgent:
         Responda apenas com 'Sim' se pelo menos UM dos critérios for atendido, ou 'Não' se nenhum critério for atendido.
         
         Texto do currículo:
-        {resume_text}""" 
\ No newline at end of file
+        """ 
\ No newline at end of file
@@ -1,18 +1,94 @@
+import json
+import logging
+import multiprocessing
 import requests
-from PyPDF2 import PdfReader
-from io import BytesIO
 import re
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import google.generativeai as genai
-from config import GEMINI_MODEL, MAX_FILE_SIZE, ALLOWED_FILE_TYPES
-from utils import rate_limited_request, download_file, download_file_from_drive
+from config import (
+    GEMINI_MODEL, MAX_FILE_SIZE, ALLOWED_FILE_TYPES, EXTRACTION_CACHE_ENABLED, PDF_EXTRACTOR_VERSION,
+    PDF_MAX_PAGES, EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, PDF_BACKENDS, PDF_MIN_TEXT_QUALITY
+)
+from cache import get_extraction_cache, sha256_bytes
+from pdf_backends import extract_pdf_pages, available_backends, read_pdf, scan_profile, may_be_scanned, is_scanned
+from metrics import get_metrics
+from utils import rate_limited_request, retry_request, download_file, download_file_from_drive
+
+logger = logging.getLogger(__name__)
+
+def pdf_extractor_version(max_pages=PDF_MAX_PAGES):
+    """Version tag of the PDF extractor (installed backends and quality threshold included), used as part of the extraction cache key"""
+    return f"{PDF_EXTRACTOR_VERSION}-{'+'.join(available_backends(PDF_BACKENDS))}-q{PDF_MIN_TEXT_QUALITY}-p{max_pages}"
+
+def extract_pdf_bytes(content, max_pages=PDF_MAX_PAGES):
+    """Extract the text of the first max_pages pages of a PDF with the configured backends"""
+    # A newline keeps words of adjacent pages apart
+    return "\n".join(extract_pdf_pages(content, max_pages))
+
+def scan_profile_version(max_pages=PDF_MAX_PAGES):
+    """Extraction cache version under which the scan profile of a PDF is kept next to its text"""
+    return f"{pdf_extractor_version(max_pages)}-scan"
+
+def _extract_pdf_worker(filepath, max_pages):
+    """Process pool entry point: read and extract one PDF; returns (digest, text, scan profile or None)"""
+    with open(filepath, 'rb') as f:
+        content = f.read()
+    return (sha256_bytes(content),) + read_pdf(content, max_pages)
+
+def _register_worker(worker_pids):
+    """Process pool initializer: report the worker's PID so a worker stuck on a file can be killed"""
+    worker_pids.put(os.getpid())
+
+class ExtractionPool:
+    """
+    Process pool for PDF extraction whose workers can be killed
+
+    ProcessPoolExecutor cannot cancel a running job, so every worker reports
+    its PID when it starts and terminate() kills those still alive.
+    """
+
+    def __init__(self, workers):
+        """Start a pool of up to workers processes (they are spawned on demand)"""
+        context = multiprocessing.get_context()
+        self._worker_pids = context.SimpleQueue()
+        self._pids = set()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_register_worker, initargs=(self._worker_pids,)
+        )
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args) on a worker and return its future"""
+        return self.executor.submit(fn, *args)
+
+    def terminate(self):
+        """Shut the pool down without waiting, killing workers still stuck on a file"""
+        while not self._worker_pids.empty():
+            self._pids.add(self._worker_pids.get())
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # Only live children of this process, so a recycled PID is never killed
+        for process in multiprocessing.active_children():
+            if process.pid in self._pids:
+                process.terminate()
+        self._worker_pids.close()
 
 class TextExtractionAgent:
     """Agent responsible for extracting text from Google Drive resume links"""
     
-    def __init__(self):
-        """Initialize the text extraction agent"""
+    def __init__(self, use_cache=EXTRACTION_CACHE_ENABLED, executor=None):
+        """
+        Initialize the text extraction agent
+        
+        Pass a ProcessPoolExecutor as executor to parse PDFs outside the calling
+        thread's interpreter, so several threads can extract at the same time.
+        """
         self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.cache = get_extraction_cache() if use_cache else None
+        self.executor = executor
+        # Scan profiles measured while extracting, by (file digest, version), for read_scanned_pdf
+        self._scan_profiles = {}
     
     def extract_text_from_gdrive(self, link):
         """Extract text from Google Drive link"""
@@ -27,8 +103,8 @@ class TextExtractionAgent:
                 # Create a direct download link with confirm=t parameter to bypass the consent screen
                 download_link = f"https://drive.google.com/uc?export=download&id={file_id}&confirm=t"
                 
-                # Download the file with rate limiting
-                response = rate_limited_request(download_file, download_link)
+                # Download the file with retries
+                response = retry_request(download_file, download_link)
                 
                 # Check content type and look for Google's HTML consent page
                 content_type = response.headers.get('Content-Type', '')
@@ -48,10 +124,10 @@ class TextExtractionAgent:
                 return self._process_file_content(response)
                 
             except Exception as e:
-                print(f"Direct download failed: {str(e)}. Trying Google Drive API method...")
+                logger.warning(f"Direct download failed: {str(e)}. Trying Google Drive API method...")
                 
                 # Fall back to using the Google Drive API
-                file_data = rate_limited_request(download_file_from_drive, file_id)
+                file_data = retry_request(download_file_from_drive, file_id)
                 
                 # Check file type
                 content_type = file_data['mime_type']
@@ -60,10 +136,10 @@ class TextExtractionAgent:
                 
                 # Process the content
                 if "application/pdf" in content_type:
-                    return self._extract_pdf_text(file_data['content'].read())
+                    return self._extract_cached(file_data['content'].read(), True)
                 else:
                     # For other file types, use Gemini to extract text
-                    return self._extract_text_with_gemini(file_data['content'].read())
+                    return self._extract_cached(file_data['content'].read(), False)
                 
         except Exception as e:
             return f"Error extracting text: {str(e)}"
@@ -87,16 +163,174 @@ class TextExtractionAgent:
             # Process based on file type
             if ext == '.pdf':
                 with open(filepath, 'rb') as f:
-                    return self._extract_pdf_text(f.read())
+                    return self._extract_cached(f.read(), True)
             elif ext in ['.doc', '.docx']:
                 with open(filepath, 'rb') as f:
-                    return self._extract_text_with_gemini(f.read())
+                    return self._extract_cached(f.read(), False)
             else:
                 return f"Error: Unsupported file type: {ext}"
                 
         except Exception as e:
             return f"Error extracting text from local file: {str(e)}"
     
+    def extract_texts_from_local_files(self, filepaths, max_workers=EXTRACTION_WORKERS,
+                                       timeout=EXTRACTION_TIMEOUT, max_pages=PDF_MAX_PAGES):
+        """
+        Extract text from many local files, fanning PDFs out over a process pool
+        
+        PyPDF2 and pdfminer are pure Python, so extracting in worker processes sidesteps the GIL.
+        Cached files and non-PDF files are handled in this process.
+        
+        Yields:
+            tuple: (filepath, text) as each file finishes, in completion order.
+                   Failures yield an "Error: ..." string like extract_text_from_local_file.
+        """
+        version = pdf_extractor_version(max_pages)
+        pdf_jobs = []
+        
+        for filepath in filepaths:
+            if not filepath.lower().endswith('.pdf') or not os.path.exists(filepath):
+                yield filepath, self.extract_text_from_local_file(filepath)
+                continue
+            if os.path.getsize(filepath) > MAX_FILE_SIZE:
+                yield filepath, f"Error: File too large ({os.path.getsize(filepath)} bytes)"
+                continue
+            
+            digest = None
+            if self.cache is not None:
+                with open(filepath, 'rb') as f:
+                    digest = sha256_bytes(f.read())
+                text = self.cache.get(digest, version)
+                if text is not None:
+                    yield filepath, text
+                    continue
+            pdf_jobs.append((filepath, digest))
+        
+        if not pdf_jobs:
+            return
+        
+        workers = max_workers or os.cpu_count() or 1
+        pool = ExtractionPool(workers)
+        jobs = iter(pdf_jobs)
+        # future -> (filepath, digest, start time); at most one job per worker is in flight,
+        # so every job starts running as soon as it is submitted
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < workers:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    future = pool.submit(_extract_pdf_worker, job[0], max_pages)
+                    in_flight[future] = (job[0], job[1], time.monotonic())
+                
+                if not in_flight:
+                    break
+                
+                # Wake up when a file finishes or the oldest job hits its timeout
+                oldest_start = min(start for _, _, start in in_flight.values())
+                remaining = max(0.0, oldest_start + timeout - time.monotonic()) if timeout else None
+                done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+                
+                broken = False
+                for future in done:
+                    filepath, digest, start = in_flight.pop(future)
+                    get_metrics().observe("extraction", time.monotonic() - start, kind="pdf_pool")
+                    try:
+                        digest, text, profile = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        yield filepath, "Error: The PDF extraction process crashed"
+                        continue
+                    except Exception as e:
+                        yield filepath, f"Error extracting text from local file: {str(e)}"
+                        continue
+                    if self.cache is not None and text:
+                        self.cache.put(digest, version, text)
+                    self._remember_scan_profile(digest, profile, max_pages)
+                    yield filepath, text
+                
+                if broken:
+                    # A worker died (a native parser crashing on a malformed PDF) and took the pool with it;
+                    # every file in flight failed with it, since there is no telling which one crashed
+                    get_metrics().increment("extraction_pool_crashes")
+                    for filepath, _, _ in in_flight.values():
+                        yield filepath, "Error: The PDF extraction process crashed"
+                    in_flight = {}
+                    pool.terminate()
+                    pool = ExtractionPool(workers)
+                    continue
+                
+                if timeout:
+                    now = time.monotonic()
+                    timed_out = [future for future, (_, _, start) in in_flight.items() if now - start >= timeout]
+                    if not timed_out:
+                        continue
+                    for future in timed_out:
+                        filepath, _, _ = in_flight.pop(future)
+                        yield filepath, f"Error: Timed out extracting text after {timeout} seconds"
+                    # A running worker cannot be cancelled and would keep its slot, so the pool is
+                    # replaced; the other files in flight start over (with a new timer) on the new one
+                    pool.terminate()
+                    pool = ExtractionPool(workers)
+                    restarted = list(in_flight.values())
+                    in_flight = {}
+                    for filepath, digest, _ in restarted:
+                        future = pool.submit(_extract_pdf_worker, filepath, max_pages)
+                        in_flight[future] = (filepath, digest, time.monotonic())
+        finally:
+            pool.terminate()
+    
+    def read_scanned_pdf(self, filepath, resume_text, max_pages=PDF_MAX_PAGES):
+        """
+        Return the bytes of a local PDF if it is a scan, else None
+        
+        A scan has too little extracted text per page to be screened and pages
+        made of images. Files with plenty of text are ruled out from the text
+        length alone, and the others use the scan profile measured when they
+        were extracted; only text from an older extraction cache entry makes
+        this parse the file again.
+        """
+        if not filepath.lower().endswith('.pdf') or not may_be_scanned(resume_text, max_pages):
+            return None
+        
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        digest = sha256_bytes(content)
+        profile = self._known_scan_profile(digest, max_pages)
+        if profile is None:
+            try:
+                profile = scan_profile(content, resume_text, max_pages)
+            except Exception as e:
+                logger.debug(f"Could not inspect {filepath} for scanned pages: {str(e) or type(e).__name__}")
+                return None
+            self._remember_scan_profile(digest, profile, max_pages)
+        
+        if not is_scanned(profile):
+            return None
+        get_metrics().increment("scanned_pdfs")
+        logger.info(f"{os.path.basename(filepath)} looks scanned ({profile['chars_per_page']:.0f} characters per page, "
+              f"images on {profile['image_ratio']:.0%} of pages), screening the PDF itself")
+        return content
+    
+    def _remember_scan_profile(self, digest, profile, max_pages=PDF_MAX_PAGES):
+        """Keep the scan profile of a PDF in memory and next to its text in the extraction cache"""
+        if profile is None:
+            return
+        version = scan_profile_version(max_pages)
+        self._scan_profiles[(digest, version)] = profile
+        if self.cache is not None:
+            self.cache.put(digest, version, json.dumps(profile))
+    
+    def _known_scan_profile(self, digest, max_pages=PDF_MAX_PAGES):
+        """Return the scan profile measured when a PDF was extracted, or None"""
+        version = scan_profile_version(max_pages)
+        profile = self._scan_profiles.get((digest, version))
+        if profile is None and self.cache is not None:
+            cached = self.cache.get(digest, version)
+            profile = json.loads(cached) if cached is not None else None
+        return profile
+    
     def _extract_file_id(self, link):
         """Extract Google Drive file ID from various link formats"""
         # Format: ?id=FILE_ID
@@ -121,21 +355,49 @@ class TextExtractionAgent:
         # Check if it's a PDF
         content_type = response.headers.get('Content-Type', '')
         if "application/pdf" in content_type:
-            return self._extract_pdf_text(response.content)
+            return self._extract_cached(response.content, True)
         elif "text/html" in content_type:
             # If we still got HTML at this point, it's an error
             return f"Error: Unsupported file type: {content_type}"
         else:
             # For other file types, use Gemini to extract text
-            return self._extract_text_with_gemini(response.content)
+            return self._extract_cached(response.content, False)
+    
+    def _extract_cached(self, content, is_pdf):
+        """
+        Extract text from file content, reusing the on-disk cache when possible
+        
+        The cache is keyed by the SHA-256 of the bytes and the extractor version,
+        so re-screening the same file skips extraction entirely.
+        """
+        if is_pdf:
+            version, extract = pdf_extractor_version(), self._extract_pdf_text
+        else:
+            version, extract = f"gemini-{GEMINI_MODEL}-v1", self._extract_text_with_gemini
+        
+        if self.cache is None:
+            with get_metrics().timer("extraction", kind="pdf" if is_pdf else "gemini"):
+                return extract(content)
+        
+        digest = sha256_bytes(content)
+        text = self.cache.get(digest, version)
+        if text is not None:
+            return text
+        
+        with get_metrics().timer("extraction", kind="pdf" if is_pdf else "gemini"):
+            text = extract(content)
+        # Only cache real text, never error messages
+        if text and not text.startswith("Error"):
+            self.cache.put(digest, version, text)
+        return text
     
     def _extract_pdf_text(self, content):
-        """Extract text from PDF content"""
-        pdf_file = BytesIO(content)
-        pdf_reader = PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        """Extract text from PDF content, keeping the scan profile measured in the same pass"""
+        if self.executor is not None:
+            text, profile = self.executor.submit(read_pdf, content).result()
+        else:
+            text, profile = read_pdf(content)
+        self._remember_scan_profile(sha256_bytes(content), profile)
         return text
     
     def _extract_text_with_gemini(self, content):
@@ -0,0 +1,186 @@
+import json
+import logging
+import re
+import google.generativeai as genai
+from config import GEMINI_MODEL, MULTI_RESUME_MAX_PER_REQUEST, MULTI_RESUME_TOKEN_BUDGET, RESPONSE_CACHE_ENABLED
+from cache import get_response_cache
+from rate_limiter import estimate_tokens
+from utils import rate_limited_request, prompt_fingerprint
+from agents.combined_screening_agent import validate_screening_result, parse_screening_result, criteria_instructions
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+def parse_batch_result(response_text, candidate_ids):
+    """
+    Parse the JSON array answer of a multi-resume prompt
+
+    Entries with an unknown or repeated id, or that fail SCREENING_SCHEMA, are
+    dropped, so the caller can retry exactly the candidates that are missing.
+
+    Returns:
+        dict: Candidate id -> validated screening result
+
+    Raises:
+        ValueError: If the answer is not a JSON array
+    """
+    text = response_text.strip()
+    # Gemini often wraps JSON in a markdown code fence
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in batch screening answer: {str(e)}")
+    if not isinstance(data, list):
+        raise ValueError("Batch screening answer is not a JSON array")
+
+    entries = [entry for entry in data if isinstance(entry, dict) and entry.get("id") in candidate_ids]
+    ids = [entry["id"] for entry in entries]
+    results = {}
+    for entry in entries:
+        # Two answers for one id cannot be told apart, so neither is trusted
+        if ids.count(entry["id"]) > 1:
+            continue
+        try:
+            results[entry["id"]] = validate_screening_result({field: value for field, value in entry.items() if field != "id"})
+        except ValueError:
+            continue
+    return results
+
+def pack_resumes(resumes, max_per_request=MULTI_RESUME_MAX_PER_REQUEST, token_budget=MULTI_RESUME_TOKEN_BUDGET):
+    """
+    Group (key, resume_text) pairs into requests of at most max_per_request
+    resumes and about token_budget resume tokens, keeping the input order
+
+    A resume larger than the budget gets a request of its own.
+    """
+    groups = []
+    current, current_tokens = [], 0
+    for key, resume_text in resumes:
+        tokens = estimate_tokens(resume_text)
+        if current and (len(current) >= max_per_request or current_tokens + tokens > token_budget):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append((key, resume_text))
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+class MultiResumeScreeningAgent:
+    """
+    Agent that checks both criteria for several resumes in a single Gemini request.
+
+    The instructions are sent once per request instead of once per resume. Each
+    resume is tagged with a short id and the answer is a JSON array with one
+    verdict per id. Requests whose answer is malformed or misses ids are split
+    in half and retried, down to a single resume; API errors (429, quota) are
+    only retried with backoff by rate_limited_request, since smaller requests
+    would fail the same way. Per-resume answers are cached like every other
+    Gemini answer.
+    """
+
+    def __init__(self, max_per_request=MULTI_RESUME_MAX_PER_REQUEST, token_budget=MULTI_RESUME_TOKEN_BUDGET):
+        """Initialize the multi-resume agent with the Gemini model and the packing limits"""
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.max_per_request = max_per_request
+        self.token_budget = token_budget
+        # Instructions and keyword lists are the same for every request, so they are built once
+        self.prompt_prefix = self._create_prompt_prefix()
+        # Placeholder prompt used as the cache key of each per-resume answer
+        self.prompt_template = self.prompt_prefix + "{resumes}"
+        # Identifies the criteria, prompt and model behind a stored verdict
+        self.fingerprint = prompt_fingerprint(self.prompt_template)
+
+    def screen_many(self, resumes, failed=None):
+        """
+        Evaluate both criteria for many resumes with as few requests as possible
+
+        Args:
+            resumes (dict): Key -> resume text
+            failed (set, optional): Filled with the keys whose request still failed with an API error
+                after its retries; screening them one by one would hit the same error
+
+        Returns:
+            dict: Key -> validated result (as returned by CombinedScreeningAgent.screen)
+                for every resume that got a valid answer; failed keys are left out
+        """
+        cache = get_response_cache() if RESPONSE_CACHE_ENABLED else None
+        results = {}
+        uncached = []
+        for key, resume_text in resumes.items():
+            cached = cache.get(resume_text, self.prompt_template, GEMINI_MODEL) if cache is not None else None
+            if cached is not None:
+                results[key] = parse_screening_result(cached)
+            else:
+                uncached.append((key, resume_text))
+
+        for group in pack_resumes(uncached, self.max_per_request, self.token_budget):
+            try:
+                answered = self._screen_group(group)
+            except Exception as e:
+                logger.warning(f"Batched screening of {len(group)} resumes failed: {str(e) or type(e).__name__}")
+                get_metrics().increment("multi_resume_answers", result="failed", value=len(group))
+                if failed is not None:
+                    failed.update(key for key, _ in group)
+                continue
+            for key, result in answered.items():
+                results[key] = result
+                if cache is not None:
+                    cache.put(resumes[key], self.prompt_template, GEMINI_MODEL, json.dumps(result, ensure_ascii=False))
+        return results
+
+    def _screen_group(self, group):
+        """
+        Screen one packed group, splitting it and retrying the resumes the answer left out
+
+        Raises:
+            Exception: The API error of a request that failed after the retries of rate_limited_request
+        """
+        ids = {f"C{position + 1}": key for position, (key, _) in enumerate(group)}
+        prompt = self._create_analysis_prompt([(candidate_id, resume_text) for candidate_id, (_, resume_text) in zip(ids, group)])
+        with get_metrics().timer("criteria_check", agent="multi_resume"):
+            response = rate_limited_request(self.model.generate_content, prompt)
+        try:
+            # response.text raises ValueError too when the answer was blocked
+            parsed = parse_batch_result(response.text, ids)
+        except ValueError as e:
+            logger.warning(f"Invalid answer for a batch of {len(group)} resumes: {str(e)}")
+            parsed = {}
+
+        results = {ids[candidate_id]: result for candidate_id, result in parsed.items()}
+        missing = [(key, resume_text) for key, resume_text in group if key not in results]
+        get_metrics().increment("multi_resume_answers", result="ok", value=len(results))
+        if missing and len(group) > 1:
+            get_metrics().increment("multi_resume_answers", result="retried", value=len(missing))
+            logger.debug(f"Answer left out {len(missing)} of {len(group)} resumes, retrying them in smaller requests")
+            half = (len(missing) + 1) // 2
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    results.update(self._screen_group(part))
+        elif missing:
+            get_metrics().increment("multi_resume_answers", result="failed")
+        return results
+
+    def _create_analysis_prompt(self, tagged_resumes):
+        """Create a prompt with every (id, resume_text) pair delimited by its id"""
+        blocks = [f"=== INÍCIO {candidate_id} ===\n{resume_text}\n=== FIM {candidate_id} ===" for candidate_id, resume_text in tagged_resumes]
+        return self.prompt_prefix + "\n\n".join(blocks)
+
+    def _create_prompt_prefix(self):
+        """Build the static part of the prompt (instructions and CRITERIA keywords) that precedes the resumes"""
+        return f"""
+        A seguir há vários currículos, cada um entre as linhas "=== INÍCIO <id> ===" e "=== FIM <id> ===".
+        Avalie cada currículo SEPARADAMENTE, sem misturar informações de currículos diferentes,
+        e avalie cada um dos critérios abaixo de forma independente.
+
+        {criteria_instructions()}
+
+        Responda APENAS com um array JSON, sem texto adicional, com exatamente um objeto por currículo, no formato:
+        [{{"id": "C1", "university_ok": true/false, "enrolled": true/false, "research": true/false, "company": true/false, "reasons": "justificativa curta"}}, ...]
+
+        Currículos:
+        """
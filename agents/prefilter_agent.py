@@ -0,0 +1,135 @@
+import json
+import re
+import threading
+from config import CRITERIA
+from cache import sha256_text
+from agents.section_agent import normalize, split_sections, heading_section
+
+# Excluded terms that also name units of public universities ("Faculdade de Engenharia da UFMG"),
+# so they never reject a candidate on their own
+GENERIC_EXCLUDED_TERMS = {"particular", "private", "privada", "faculdade", "centro universitário", "universidade particular"}
+
+# Accepted-university terms that also describe employers, agencies or NGOs ("Receita Federal",
+# "ONG estadual"), so they are never evidence of a public university on their own
+GENERIC_UNIVERSITY_TERMS = {"federal", "estadual", "state", "fed"}
+
+# Acronyms of federal/state universities missing from CRITERIA (UFPE, UERJ, UNIFESP, ...)
+PUBLIC_UNIVERSITY_ACRONYM = re.compile(r"\bU(?:F|E|NIF)[A-Z]{1,5}\b")
+
+# Anything that may name another institution (UTFPR, ITA, "Instituto ...", "Universidade ..."),
+# which keeps an excluded institution from rejecting the candidate on its own
+INSTITUTION_MENTION = re.compile(r"\b[A-Z]{2,6}\b|\b(?i:universidade|universidad|university|instituto|institute|escola)\b")
+
+# Keywords that are usually just section titles or common words and say nothing about the degree status
+NON_DECISIVE_GRADUATION_TERMS = {"formação acadêmica"}
+NON_DECISIVE_ENROLLMENT_TERMS = {"atual"}
+
+def education_text(resume_text):
+    """Return the education section of a resume without its heading lines ("" when it has none)"""
+    education = split_sections(resume_text).get("education", "")
+    return "\n".join(line for line in education.splitlines() if heading_section(line) is None)
+
+class KeywordPreFilterAgent:
+    """
+    Agent that decides clear-cut resumes locally before any Gemini call.
+
+    All CRITERIA keyword lists are compiled into one accent- and case-insensitive
+    regex. Institutions and degree status are only read from the education
+    section, since experience and courses name agencies, NGOs and schools that
+    say nothing about the degree. A resume is rejected when its education
+    section names excluded institutions and no other institution, and accepted
+    when it names an accepted university (not just "federal" or "estadual"),
+    current enrollment and, anywhere, research or a recognized company, without
+    any contradicting keyword. Everything else, including resumes without an
+    education heading, is ambiguous and goes to Gemini.
+    """
+
+    ACCEPT = "Sim"
+    REJECT = "Não"
+
+    def __init__(self):
+        """Compile the combined keyword matcher from CRITERIA"""
+        # Map every normalized term to the categories it belongs to
+        self.term_categories = {}
+        categories = {
+            "university": CRITERIA["university_type"],
+            "excluded": CRITERIA["excluded_university_type"],
+            "enrolled": [term for term in CRITERIA["education_status"] if term not in NON_DECISIVE_ENROLLMENT_TERMS],
+            "graduated": [term for term in CRITERIA["graduation_keywords"] if term not in NON_DECISIVE_GRADUATION_TERMS],
+            "research": CRITERIA["research_keywords"],
+            "company": [term for term in CRITERIA["top_companies"] if self._is_decisive_company(term)]
+        }
+        for category, terms in categories.items():
+            for term in terms:
+                self.term_categories.setdefault(normalize(term), set()).add(category)
+
+        self.generic_excluded = {normalize(term) for term in GENERIC_EXCLUDED_TERMS}
+        self.generic_university = {normalize(term) for term in GENERIC_UNIVERSITY_TERMS}
+
+        # Longest terms first so "universidade particular" wins over "particular"
+        alternation = "|".join(
+            re.escape(term) for term in sorted(self.term_categories, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+        # Identifies the keyword lists behind a stored pre-filter decision
+        self.fingerprint = sha256_text(json.dumps(
+            [sorted((term, sorted(categories)) for term, categories in self.term_categories.items()), sorted(self.generic_excluded),
+             sorted(self.generic_university), "education-section"],
+            ensure_ascii=False
+        ))
+
+        self._lock = threading.Lock()
+        self.stats = {"accepted": 0, "rejected": 0, "ambiguous": 0}
+
+    @staticmethod
+    def _is_decisive_company(term):
+        """Skip short or numeric company names ("99", "EY", "B3") that match unrelated text"""
+        return len(term) >= 3 and not any(char.isdigit() for char in term)
+
+    def find_matches(self, resume_text):
+        """Return a dict mapping each category to the set of terms found in the resume"""
+        matches = {}
+        for match in self.pattern.finditer(normalize(resume_text)):
+            term = match.group(0)
+            for category in self.term_categories[term]:
+                matches.setdefault(category, set()).add(term)
+        return matches
+
+    def _other_institutions(self, education, excluded):
+        """True if the education section may name an institution besides the excluded ones"""
+        # The excluded institutions themselves ("FIAP", "SÃO JUDAS") are not other institutions
+        excluded_words = {word for term in excluded for word in term.split()}
+        for match in INSTITUTION_MENTION.finditer(education):
+            if normalize(match.group(0)) not in excluded_words:
+                return True
+        return False
+
+    def decide(self, resume_text):
+        """
+        Decide a resume locally when the keywords make the answer obvious
+
+        Returns:
+            tuple: (verdict, reason) where verdict is "Sim", "Não" or None if ambiguous
+        """
+        matches = self.find_matches(resume_text)
+        education = education_text(resume_text)
+        education_matches = self.find_matches(education)
+        university = education_matches.get("university", set()) - self.generic_university
+        public_acronym = PUBLIC_UNIVERSITY_ACRONYM.search(education)
+        excluded = education_matches.get("excluded", set())
+        excluded_names = excluded - self.generic_excluded
+
+        if excluded_names and not university and not public_acronym and not self._other_institutions(education, excluded):
+            verdict, reason = self.REJECT, f"instituição particular: {', '.join(sorted(excluded_names))}"
+        elif ((university or public_acronym) and not excluded and education_matches.get("enrolled")
+                and not education_matches.get("graduated") and (matches.get("research") or matches.get("company"))):
+            evidence = sorted(matches.get("research", set()) | matches.get("company", set()))
+            names = sorted(university) or [public_acronym.group(0).lower()]
+            verdict, reason = self.ACCEPT, f"{', '.join(names)} cursando, com {', '.join(evidence)}"
+        else:
+            verdict, reason = None, "ambíguo"
+
+        with self._lock:
+            key = {self.ACCEPT: "accepted", self.REJECT: "rejected"}.get(verdict, "ambiguous")
+            self.stats[key] += 1
+        return verdict, reason
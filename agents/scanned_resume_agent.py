@@ -0,0 +1,105 @@
+import logging
+import os
+import tempfile
+import threading
+import google.generativeai as genai
+from config import GEMINI_MODEL, RESPONSE_CACHE_ENABLED
+from cache import get_response_cache, get_upload_cache, sha256_bytes
+from utils import rate_limited_request, prompt_fingerprint
+from agents.combined_screening_agent import parse_screening_result, criteria_instructions
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = "application/pdf"
+
+class ScannedResumeAgent:
+    """
+    Agent that checks both criteria of a scanned resume in one multimodal Gemini request.
+
+    Scans have no text layer to extract, so the PDF itself is attached to the
+    prompt and Gemini reads the page images. With an SDK that has the Files
+    API, each PDF is uploaded once and its upload is reused (by SHA-256) until
+    Gemini deletes it; older SDKs send the PDF bytes inline with the request.
+    Answers are cached by file hash like every other Gemini answer.
+    """
+
+    def __init__(self):
+        """Initialize the scanned resume agent with the Gemini model"""
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.prompt = self._create_prompt()
+        # Identifies the criteria, prompt and model behind a stored verdict
+        self.fingerprint = prompt_fingerprint(self.prompt)
+        self._upload_lock = threading.Lock()
+
+    def screen_pdf(self, content):
+        """
+        Evaluate both criteria on the pages of a PDF
+
+        Returns:
+            dict: Validated result with university_ok, enrolled, research, company and reasons
+
+        Raises:
+            ValueError: If Gemini does not return a valid JSON answer
+        """
+        digest = sha256_bytes(content)
+        # The file hash stands in for the resume text in the cache key
+        cache_text = f"pdf:{digest}"
+        cache = get_response_cache() if RESPONSE_CACHE_ENABLED else None
+        if cache is not None:
+            cached = cache.get(cache_text, self.prompt, GEMINI_MODEL)
+            if cached is not None:
+                return parse_screening_result(cached)
+
+        with get_metrics().timer("criteria_check", agent="scanned"):
+            response = rate_limited_request(self.model.generate_content, [self.prompt, self._pdf_part(content, digest)])
+        result = parse_screening_result(response.text)
+        if cache is not None:
+            cache.put(cache_text, self.prompt, GEMINI_MODEL, response.text)
+        return result
+
+    def _pdf_part(self, content, digest):
+        """Return the prompt part carrying the PDF: a Files API reference when possible, else the inline bytes"""
+        upload_file = getattr(genai, "upload_file", None)
+        if upload_file is None:
+            get_metrics().increment("pdf_attachments", mode="inline")
+            return {"mime_type": PDF_MIME_TYPE, "data": content}
+
+        uploads = get_upload_cache()
+        # One upload per file even when several threads screen copies of it
+        with self._upload_lock:
+            uri = uploads.get(digest)
+            if uri is None:
+                uploaded = self._upload(upload_file, content, digest)
+                uri = uploaded.uri
+                uploads.put(digest, uploaded.name, uri)
+                get_metrics().increment("pdf_attachments", mode="uploaded")
+            else:
+                logger.debug(f"Reusing the Gemini upload of PDF {digest[:12]}")
+                get_metrics().increment("pdf_attachments", mode="reused")
+        return {"file_data": {"mime_type": PDF_MIME_TYPE, "file_uri": uri}}
+
+    def _upload(self, upload_file, content, digest):
+        """Upload a PDF through the Files API (from a temporary file, which every SDK version accepts)"""
+        handle, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(content)
+            with get_metrics().timer("gemini_upload"):
+                return upload_file(path, mime_type=PDF_MIME_TYPE, display_name=f"cv-{digest[:16]}")
+        finally:
+            os.remove(path)
+
+    def _create_prompt(self):
+        """Build the prompt sent with every PDF (instructions and CRITERIA keywords)"""
+        return f"""
+        O PDF anexado é um currículo digitalizado (as páginas são imagens). Leia todas as páginas
+        e avalie cada um dos critérios abaixo de forma independente.
+
+        {criteria_instructions()}
+
+        Se o PDF estiver ilegível, responda com todos os critérios false e explique em "reasons".
+
+        Responda APENAS com um objeto JSON, sem texto adicional, no formato:
+        {{"university_ok": true/false, "enrolled": true/false, "research": true/false, "company": true/false, "reasons": "justificativa curta"}}
+        """
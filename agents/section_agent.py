@@ -0,0 +1,133 @@
+import re
+import threading
+import unicodedata
+from rate_limiter import estimate_tokens
+
+def normalize(text):
+    """Lowercase text and strip accents so 'Itaú' matches 'itau'"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+# Heading keywords of each section, normalized (lowercase, no accents)
+SECTION_HEADINGS = {
+    "education": [
+        "formacao", "formacao academica", "formacao academica e complementar", "educacao", "escolaridade",
+        "graduacao", "dados academicos", "education", "academic background"
+    ],
+    "experience": [
+        "experiencia", "experiencias", "experiencia profissional", "experiencias profissionais",
+        "historico profissional", "estagios", "estagio", "atividades extracurriculares",
+        "atividades complementares", "experience", "work experience", "professional experience"
+    ],
+    "research": [
+        "pesquisa", "pesquisas", "iniciacao cientifica", "projetos", "projetos academicos", "publicacoes",
+        "producao cientifica", "research", "publications", "projects"
+    ],
+    "other": [
+        "idiomas", "habilidades", "competencias", "conhecimentos", "cursos", "cursos complementares",
+        "certificacoes", "certificados", "premios", "interesses", "informacoes adicionais", "referencias",
+        "skills", "languages", "certifications", "awards", "courses"
+    ]
+}
+
+# The text before the first heading (name, contact, objective) is kept as "summary";
+# it often says "cursando X na UFMG" or names the current employer
+AGENT_SECTIONS = {
+    "university": ("summary", "education"),
+    "company": ("summary", "experience", "research"),
+    "combined": ("summary", "education", "experience", "research")
+}
+
+# Headings are short lines; longer lines are content even if they start with a keyword
+MAX_HEADING_WORDS = 6
+
+_HEADING_PATTERN = re.compile(
+    r"^(?:\d+[.)]\s*)?(" + "|".join(
+        re.escape(heading) for headings in SECTION_HEADINGS.values()
+        for heading in sorted(headings, key=len, reverse=True)
+    ) + r")\b[\s:.\-–]*$"
+)
+_HEADING_SECTIONS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+def heading_section(line):
+    """Return the section a line opens, or None if the line is not a heading"""
+    stripped = line.strip()
+    if not stripped or len(stripped.split()) > MAX_HEADING_WORDS:
+        return None
+    match = _HEADING_PATTERN.match(normalize(stripped))
+    return _HEADING_SECTIONS[match.group(1)] if match else None
+
+def split_sections(resume_text):
+    """
+    Split resume text into sections by heading lines
+
+    Returns:
+        dict: section name -> text, in document order; repeated sections are joined.
+              Text before the first heading is under "summary".
+    """
+    sections = {}
+    current = "summary"
+    for line in resume_text.splitlines():
+        section = heading_section(line)
+        if section is not None:
+            current = section
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items()}
+
+def truncate_to_tokens(text, token_budget):
+    """Cut text to roughly token_budget tokens, at a line break when possible"""
+    max_chars = token_budget * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars]
+
+def select_sections(resume_text, wanted, token_budget):
+    """
+    Keep only the wanted sections of a resume, within a token budget
+
+    Falls back to the (truncated) full text when the resume has no recognizable
+    headings or none of the wanted sections besides the summary, so a resume
+    with an unusual layout is never screened on an empty excerpt.
+    """
+    sections = split_sections(resume_text)
+    found = [name for name in wanted if name != "summary" and sections.get(name)]
+    if not found:
+        return truncate_to_tokens(resume_text, token_budget)
+    selected = "\n\n".join(sections[name] for name in wanted if sections.get(name))
+    return truncate_to_tokens(selected, token_budget)
+
+class ResumeSectionAgent:
+    """
+    Agent that trims a resume to the sections each filter agent needs.
+
+    The resume is split at heading lines (Formação, Experiência, Pesquisa, ...)
+    and every agent receives only its sections, cut to a token budget, instead
+    of the whole multi-page text.
+    """
+
+    def __init__(self, token_budgets):
+        """
+        Initialize the section agent
+
+        Args:
+            token_budgets (dict): agent name ("university", "company", "combined") -> token budget
+        """
+        self.token_budgets = token_budgets
+        self._lock = threading.Lock()
+        self.stats = {"prompts": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def select(self, agent_name, resume_text):
+        """
+        Return the part of the resume sent to an agent
+
+        Returns:
+            tuple: (selected_text, tokens_saved)
+        """
+        selected = select_sections(resume_text, AGENT_SECTIONS[agent_name], self.token_budgets[agent_name])
+        before, after = estimate_tokens(resume_text), estimate_tokens(selected)
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["tokens_before"] += before
+            self.stats["tokens_after"] += after
+        return selected, before - after
@@ -1,13 +1,23 @@
-import pandas as pd
+import logging
+from candidate_store import get_candidate_store, DUPLICATE_COLUMN
 from config import COLUMN_NAMES
 
+logger = logging.getLogger(__name__)
+
 class SheetAgent:
     """Agent responsible for reading and writing to Excel sheets"""
     
-    def __init__(self, excel_path):
+    def __init__(self, excel_path, store=None):
         """Initialize the sheet agent with the Excel file path"""
         self.excel_path = excel_path
-        self.df = pd.read_excel(excel_path)
+        # The candidate store holds the working state; the Excel file is imported once and exported on save
+        self.store = store if store is not None else get_candidate_store()
+        imported = self.store.load(excel_path)
+        if imported:
+            logger.info(f"Imported {imported} candidates from {excel_path} into {self.store.path}")
+        columns = list(COLUMN_NAMES.values()) + [DUPLICATE_COLUMN]
+        self.df = self.store.frame([column for column in columns if column in self.store.columns])
+        
         self._validate_and_prepare_columns()
     
     def _validate_and_prepare_columns(self):
@@ -20,29 +30,60 @@ class SheetAgent:
         ]
         
         # Check for required columns that cannot be automatically created
-        essential_columns = [col for col in required_columns if col not in self.df.columns]
+        available = set(self.store.columns) | set(self.store.source_columns)
+        essential_columns = [col for col in required_columns if col not in available]
         if essential_columns:
             raise ValueError(f"Excel file is missing essential columns: {', '.join(essential_columns)}")
         
         # Add the result column if it doesn't exist
         if COLUMN_NAMES["result"] not in self.df.columns:
-            print(f"Adding missing column: {COLUMN_NAMES['result']}")
+            logger.info(f"Adding missing column: {COLUMN_NAMES['result']}")
             self.df[COLUMN_NAMES["result"]] = None
-            # Save the updated dataframe with the new column
-            self.save_results()
     
     def get_candidates(self):
         """Returns the dataframe with all candidates"""
         return self.df
 
     def save_results(self):
-        """Saves the updated dataframe back to Excel"""
-        self.df.to_excel(self.excel_path, index=False)
-        print(f"Results saved to {self.excel_path}")
+        """Exports the candidate store to the Excel file"""
+        self.store.export(self.excel_path)
+        logger.info(f"Results saved to {self.excel_path}")
         
-    def update_candidate_status(self, index, status):
-        """Updates a specific candidate's status in the 'Primeira Fase' column"""
+    def update_candidate_status(self, index, status, stages=None):
+        """Updates a specific candidate's status in the 'Primeira Fase' column, with the screening stages behind it"""
         self.df.at[index, COLUMN_NAMES["result"]] = status
+        # Make the update durable without rewriting the workbook
+        self.store.update(index, **{COLUMN_NAMES["result"]: status})
+        if stages is not None:
+            self.store.record_stages(COLUMN_NAMES["result"], index, stages)
+    
+    def outdated_candidates(self, analysis_agent):
+        """Candidates whose verdict came from stages analysis_agent would now run differently; index -> recorded stages"""
+        return self.store.outdated(COLUMN_NAMES["result"], lambda stages: bool(analysis_agent.outdated_stages(stages)))
+        
+    def mark_duplicates(self, duplicates, released=()):
+        """
+        Record that each row of duplicates (index -> representative index) reuses its representative's verdict
+        
+        Rows in released stop being duplicates and are screened on their own.
+        """
+        self.store.mark_duplicates(duplicates, released)
+        for index, representative in duplicates.items():
+            self.df.at[index, DUPLICATE_COLUMN] = representative
+        for index in released:
+            if index not in duplicates:
+                self.df.at[index, DUPLICATE_COLUMN] = None
+    
+    def duplicate_groups(self):
+        """Returns representative index -> indexes of the duplicates reusing its verdict"""
+        return self.store.duplicate_groups()
+    
+    def propagate_duplicates(self):
+        """Copy each representative's verdict to its duplicates; returns index -> verdict copied"""
+        copied = self.store.propagate_duplicates(COLUMN_NAMES["result"])
+        for index, status in copied.items():
+            self.df.at[index, COLUMN_NAMES["result"]] = status
+        return copied
         
     def get_unprocessed_candidates(self):
         """Returns only the candidates that haven't been processed yet"""
@@ -3,10 +3,10 @@ import pandas as pd
 import google.generativeai as genai
 from dotenv import load_dotenv
 import requests
-from PyPDF2 import PdfReader
-from io import BytesIO
 import re
 import time
+from cache import get_extraction_cache, sha256_bytes
+from agents.extraction_agent import extract_pdf_bytes, pdf_extractor_version
 
 # Load environment variables
 load_dotenv()
@@ -53,12 +53,14 @@ class TextExtractionAgent:
             
             # Try to determine file type and extract text
             if "application/pdf" in response.headers.get('Content-Type', ''):
-                # PDF file
-                pdf_file = BytesIO(response.content)
-                pdf_reader = PdfReader(pdf_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
+                # PDF file, reusing text already extracted by the other scripts
+                cache = get_extraction_cache()
+                digest = sha256_bytes(response.content)
+                text = cache.get(digest, pdf_extractor_version())
+                if text is not None:
+                    return text
+                text = extract_pdf_bytes(response.content)
+                cache.put(digest, pdf_extractor_version(), text)
                 return text
             else:
                 # Try using Gemini for document understanding
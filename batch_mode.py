@@ -0,0 +1,311 @@
+"""
+Gemini Batch mode: screen many resumes as one asynchronous batch job
+"""
+
+import logging
+import json
+import os
+import time
+import requests
+from config import (
+    GEMINI_MODEL, GEMINI_API_BASE_URL, BATCH_POLL_INTERVAL, BATCH_STATE_PATH, BATCH_JOB_FILE,
+    RESPONSE_CACHE_ENABLED
+)
+from cache import get_response_cache
+from logging_setup import candidate_context, candidate_trace_id
+
+logger = logging.getLogger(__name__)
+
+# Batch states after which polling stops
+TERMINAL_STATES = {
+    "BATCH_STATE_SUCCEEDED", "BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED",
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"
+}
+SUCCEEDED_STATES = {"BATCH_STATE_SUCCEEDED", "JOB_STATE_SUCCEEDED"}
+
+class BatchError(Exception):
+    """Raised when a batch job cannot be submitted or does not succeed"""
+
+class BatchJobFailed(BatchError):
+    """Raised when a batch job finishes in a state other than succeeded"""
+
+def batch_state(batch):
+    """Return the state of a batch resource or of the operation wrapping it (None while it has none yet)"""
+    state = (
+        batch.get("state")
+        or batch.get("metadata", {}).get("state")
+        or batch.get("response", {}).get("state")
+    )
+    if state is None and batch.get("done"):
+        # A finished operation without a state failed if it carries an error, else it succeeded
+        state = "BATCH_STATE_FAILED" if "error" in batch else "BATCH_STATE_SUCCEEDED"
+    return state
+
+def batch_error(batch):
+    """Return the error message of a finished operation, or None"""
+    error = batch.get("error")
+    if not error:
+        return None
+    return error.get("message", str(error)) if isinstance(error, dict) else str(error)
+
+def batch_output_file(batch):
+    """Return the name of the results file of a finished batch"""
+    for container in (batch, batch.get("response", {}), batch.get("metadata", {})):
+        output = container.get("output") or container.get("dest") or container
+        name = output.get("responsesFile") or output.get("fileName")
+        if name:
+            return name
+    return None
+
+def response_text(response):
+    """Extract the answer text from a GenerateContentResponse dict"""
+    candidates = response.get("candidates") or []
+    if not candidates:
+        return None
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+class GeminiBatchClient:
+    """
+    Minimal REST client for the Gemini Batch API
+
+    base_url can point to a local stand-in server, which is how the batch flow
+    is exercised without a real API key.
+    """
+
+    def __init__(self, api_key=None, base_url=GEMINI_API_BASE_URL, model=GEMINI_MODEL, session=None):
+        """Initialize the client; the API key defaults to GEMINI_API_KEY from the environment"""
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.session = session or requests.Session()
+
+    def _request(self, method, url, **kwargs):
+        """Send an authenticated request and raise BatchError on connection and HTTP errors"""
+        headers = kwargs.pop("headers", {})
+        if self.api_key:
+            headers["x-goog-api-key"] = self.api_key
+        try:
+            response = self.session.request(method, url, headers=headers, timeout=120, **kwargs)
+        except requests.exceptions.RequestException as e:
+            raise BatchError(f"{method} {url} failed: {str(e) or type(e).__name__}") from e
+        if response.status_code >= 400:
+            raise BatchError(f"{method} {url} failed with HTTP {response.status_code}: {response.text[:500]}")
+        return response
+
+    def upload_jsonl(self, path, display_name="resume-screening"):
+        """Upload a JSONL requests file with the resumable Files API and return its name"""
+        with open(path, "rb") as f:
+            content = f.read()
+
+        start = self._request(
+            "POST", f"{self.base_url}/upload/v1beta/files",
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(len(content)),
+                "X-Goog-Upload-Header-Content-Type": "application/jsonl",
+                "Content-Type": "application/json"
+            },
+            json={"file": {"display_name": display_name}}
+        )
+        upload_url = start.headers.get("X-Goog-Upload-URL")
+        if not upload_url:
+            raise BatchError("Files API did not return an upload URL")
+
+        uploaded = self._request(
+            "POST", upload_url,
+            headers={"X-Goog-Upload-Offset": "0", "X-Goog-Upload-Command": "upload, finalize"},
+            data=content
+        )
+        return uploaded.json()["file"]["name"]
+
+    def create_batch(self, file_name, display_name="resume-screening"):
+        """Create a batch job from an uploaded requests file and return the batch name"""
+        response = self._request(
+            "POST", f"{self.base_url}/v1beta/models/{self.model}:batchGenerateContent",
+            json={"batch": {"display_name": display_name, "input_config": {"file_name": file_name}}}
+        )
+        name = response.json().get("name")
+        if not name:
+            raise BatchError("Batch API did not return a batch name")
+        return name
+
+    def get_batch(self, name):
+        """Return the current batch resource"""
+        return self._request("GET", f"{self.base_url}/v1beta/{name}").json()
+
+    def wait(self, name, poll_interval=BATCH_POLL_INTERVAL):
+        """Poll a batch until it reaches a terminal state and return it"""
+        while True:
+            batch = self.get_batch(name)
+            state = batch_state(batch)
+            if state in TERMINAL_STATES:
+                if state not in SUCCEEDED_STATES:
+                    error = batch_error(batch)
+                    raise BatchJobFailed(f"Batch {name} finished with state {state}" + (f": {error}" if error else ""))
+                return batch
+            logger.info(f"Batch {name} is {state or 'pending'}; checking again in {poll_interval} seconds...")
+            time.sleep(poll_interval)
+
+    def download_results(self, file_name):
+        """
+        Download a results file
+
+        Yields:
+            tuple: (key, text, error) for each line; text is None when the request failed
+        """
+        response = self._request("GET", f"{self.base_url}/download/v1beta/{file_name}:download", params={"alt": "media"})
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "error" in entry:
+                yield entry.get("key"), None, entry["error"].get("message", str(entry["error"]))
+            else:
+                yield entry.get("key"), response_text(entry.get("response", {})), None
+
+class BatchScreeningRunner:
+    """
+    Screens many resumes through one Gemini batch job.
+
+    Local pre-filter decisions and cached answers are used first; every other
+    resume contributes a university prompt and a company prompt to a JSONL job
+    file. After the job finishes, answers are merged back by candidate index.
+    The submitted batch is remembered in BATCH_STATE_PATH, so an interrupted
+    run resumes polling instead of paying for a second job.
+    """
+
+    def __init__(self, analysis_agent, client=None, state_path=BATCH_STATE_PATH,
+                 job_file=BATCH_JOB_FILE, poll_interval=BATCH_POLL_INTERVAL):
+        """Initialize the runner with the CriteriaAnalysisAgent whose prompts are batched"""
+        self.analysis_agent = analysis_agent
+        self.client = client or GeminiBatchClient()
+        self.state_path = state_path
+        self.job_file = job_file
+        self.poll_interval = poll_interval
+        self.cache = get_response_cache() if RESPONSE_CACHE_ENABLED else None
+
+    def _agents(self):
+        """Return the filter agents whose prompts go into the batch, by key suffix"""
+        return {
+            "university": self.analysis_agent.university_agent,
+            "company": self.analysis_agent.company_agent
+        }
+
+    def run(self, resumes, stages=None):
+        """
+        Screen resumes with one batch job
+
+        Args:
+            resumes (dict): candidate index -> resume text
+            stages (dict, optional): Filled with candidate index -> the stages behind its verdict,
+                recorded with the same fingerprints as CriteriaAnalysisAgent.analyze_resume
+
+        Returns:
+            dict: candidate index -> "Sim" or "Não"; candidates the batch left without an answer
+                are missing, so they stay pending for the per-candidate screening
+        """
+        results = {}
+        answers = {}  # (index, agent name) -> answer text
+        pending = {}
+        prompt_texts = {}  # key -> resume text sent with that prompt
+        stages = {} if stages is None else stages
+
+        for index, resume_text in resumes.items():
+            stages[index] = {}
+            verdict = self.analysis_agent._prefilter_stage(resume_text, stages[index])
+            if verdict is not None:
+                results[index] = verdict
+                continue
+            self.analysis_agent._count_trimmed_candidate()
+            for name, agent in self._agents().items():
+                agent_text = self.analysis_agent.section_text(name, resume_text)
+                cached = self.cache.get(agent_text, agent.prompt_template, GEMINI_MODEL) if self.cache else None
+                if cached is not None:
+                    answers[(index, name)] = cached
+                else:
+                    pending[f"{index}:{name}"] = (index, name)
+                    prompt_texts[f"{index}:{name}"] = agent_text
+
+        if pending:
+            logger.info(f"Submitting {len(pending)} prompts for {len({i for i, _ in pending.values()})} candidates as a batch job...")
+            for key, text, error in self._run_batch(prompt_texts, pending):
+                if key not in pending:
+                    continue
+                index, name = pending[key]
+                if text is None:
+                    with candidate_context(candidate_trace_id(index)):
+                        logger.warning(f"Batch request {key} failed: {error}")
+                    continue
+                answers[(index, name)] = text
+                if self.cache is not None:
+                    self.cache.put(prompt_texts[key], self._agents()[name].prompt_template, GEMINI_MODEL, text)
+
+        for index in resumes:
+            if index in results:
+                continue
+            verdict = self._merge(answers.get((index, "university")), answers.get((index, "company")), stages[index])
+            if verdict is not None:
+                results[index] = verdict
+        return results
+
+    def _merge(self, university_answer, company_answer, stages):
+        """Combine both answers of a candidate into the final result and record them as its stages (None if an answer is missing)"""
+        if university_answer is None:
+            return None
+        uni_passes, _ = self.analysis_agent.university_agent._parse_result(university_answer)
+        self.analysis_agent._record_stage("university", stages, uni_passes)
+        if not uni_passes:
+            return "Não"
+        if company_answer is None:
+            return None
+        exp_passes, _ = self.analysis_agent.company_agent._parse_result(company_answer)
+        self.analysis_agent._record_stage("company", stages, exp_passes)
+        return "Sim" if exp_passes else "Não"
+
+    def _run_batch(self, prompt_texts, pending):
+        """Submit (or resume) the batch job and yield its (key, text, error) results"""
+        batch_name = self._load_state(pending)
+        if batch_name is None:
+            self._write_job_file(prompt_texts, pending)
+            file_name = self.client.upload_jsonl(self.job_file)
+            batch_name = self.client.create_batch(file_name)
+            with open(self.state_path, "w") as f:
+                json.dump({"batch": batch_name, "keys": sorted(pending)}, f)
+            logger.info(f"Submitted batch {batch_name}")
+        else:
+            logger.info(f"Resuming batch {batch_name}")
+
+        try:
+            batch = self.client.wait(batch_name, self.poll_interval)
+        except BatchJobFailed:
+            # The job is over, so the next run submits a new one instead of resuming it
+            os.remove(self.state_path)
+            raise
+        output_file = batch_output_file(batch)
+        if not output_file:
+            raise BatchError(f"Batch {batch_name} finished without a results file")
+
+        yield from self.client.download_results(output_file)
+        os.remove(self.state_path)
+
+    def _load_state(self, pending):
+        """Return the batch submitted earlier for exactly these prompts, if any"""
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state.get("keys") != sorted(pending):
+            logger.warning("Pending candidates changed since the last batch was submitted; submitting a new batch")
+            return None
+        return state.get("batch")
+
+    def _write_job_file(self, prompt_texts, pending):
+        """Serialize every pending prompt as one line of the JSONL job file"""
+        agents = self._agents()
+        with open(self.job_file, "w", encoding="utf-8") as f:
+            for key, (index, name) in pending.items():
+                prompt = agents[name]._create_analysis_prompt(prompt_texts[key])
+                line = {"key": key, "request": {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
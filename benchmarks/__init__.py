@@ -0,0 +1,3 @@
+"""
+Benchmarks for the screening pipeline (python -m benchmarks.run_benchmarks)
+"""
@@ -0,0 +1,107 @@
+"""
+Fake Gemini backend with tunable latency and error rate
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+import google.generativeai as genai
+
+class FakeGeminiError(Exception):
+    """Error raised by the fake model; code 429 exercises the rate-limit path"""
+
+    def __init__(self, code):
+        super().__init__(f"{code} fake Gemini error")
+        self.code = code
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel that answers locally.
+
+    Every call waits latency ± jitter seconds and fails with probability
+    error_rate (a share of them as 429s). Answers are "Sim"/"Não" from a
+    keyword check, or a JSON object when the prompt asks for one.
+    """
+
+    def __init__(self, model_name=None, latency=0.2, jitter=0.05, error_rate=0.0,
+                 rate_limit_share=0.5, seed=0, recorder=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_share = rate_limit_share
+        self.recorder = recorder
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """Return the latency of the next call and the error it raises, if any"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            error = None
+            if self._rng.random() < self.error_rate:
+                error = FakeGeminiError(429 if self._rng.random() < self.rate_limit_share else 500)
+        return delay, error
+
+    def _response(self, prompt):
+        """Build a response object shaped like the SDK's"""
+        if isinstance(prompt, list):
+            # Multimodal request: only the text parts are read, attached files pass as a generic resume
+            prompt = "\n".join(part if isinstance(part, str) else "cursando federal" for part in prompt)
+        blocks = re.findall(r"=== INÍCIO (\w+) ===\n(.*?)\n=== FIM \1 ===", prompt, re.DOTALL)
+        if blocks:
+            # Multi-resume prompt: one verdict per tagged resume
+            answer = json.dumps([{"id": candidate_id, **self._verdict(resume)} for candidate_id, resume in blocks])
+        elif "objeto json" in prompt.lower():
+            answer = json.dumps(self._verdict(prompt))
+        else:
+            answer = "Sim" if self._passes(prompt) else "Não"
+        prompt_tokens = len(prompt) // 4
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, cached_content_token_count=0, total_token_count=prompt_tokens + 1)
+        return SimpleNamespace(text=answer, usage_metadata=usage)
+
+    @staticmethod
+    def _passes(text):
+        text = text.lower()
+        return "cursando" in text and ("federal" in text or "estadual" in text)
+
+    def _verdict(self, text):
+        passes = self._passes(text)
+        return {"university_ok": passes, "enrolled": passes, "research": True, "company": False, "reasons": "fake"}
+
+    def _record(self, start):
+        if self.recorder is not None:
+            self.recorder.add("gemini", time.perf_counter() - start)
+
+    def generate_content(self, prompt):
+        start = time.perf_counter()
+        delay, error = self._draw()
+        time.sleep(delay)
+        self._record(start)
+        if error is not None:
+            raise error
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt):
+        start = time.perf_counter()
+        delay, error = self._draw()
+        await asyncio.sleep(delay)
+        self._record(start)
+        if error is not None:
+            raise error
+        return self._response(prompt)
+
+@contextmanager
+def fake_gemini(**options):
+    """Make every genai.GenerativeModel created inside the block a FakeGenerativeModel(**options)"""
+    original = genai.GenerativeModel
+    genai.GenerativeModel = lambda model_name=None, **_: FakeGenerativeModel(model_name, **options)
+    try:
+        yield
+    finally:
+        genai.GenerativeModel = original
@@ -0,0 +1,102 @@
+"""
+Per-page throughput and text quality of each PDF extraction backend
+
+Runs every installed backend over the same PDFs: the real cvs/ folder by
+default, or synthetic CVs when it is missing or --synthetic is given. Each
+backend runs single-threaded in this process, so the numbers compare the
+parsers themselves.
+
+Usage:
+    python -m benchmarks.pdf_backends --corpus cvs --limit 200
+    python -m benchmarks.pdf_backends --synthetic 100 --pages 3
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+from benchmarks.run_benchmarks import percentile
+from benchmarks.synthetic import write_candidates
+from config import PDF_MAX_PAGES, PDF_MIN_TEXT_QUALITY
+from pdf_backends import BACKENDS, available_backends, extract_pages, extract_pdf_pages, text_quality
+
+def load_corpus(folder, limit=None):
+    """Return (filename, bytes) for the PDFs of a folder, in name order"""
+    paths = sorted(glob.glob(os.path.join(folder, "*.pdf")))[:limit]
+    corpus = []
+    for path in paths:
+        with open(path, "rb") as f:
+            corpus.append((os.path.basename(path), f.read()))
+    return corpus
+
+def bench_backend(corpus, extract, max_pages):
+    """
+    Extract every PDF of the corpus with extract(content, max_pages)
+
+    Returns:
+        dict: pages, failures, total seconds, pages per second, p50/p95 seconds per file,
+            mean page quality and share of pages below PDF_MIN_TEXT_QUALITY
+    """
+    pages = 0
+    failures = 0
+    durations = []
+    qualities = []
+    for _, content in corpus:
+        start = time.perf_counter()
+        try:
+            texts = extract(content, max_pages)
+        except Exception:
+            failures += 1
+            continue
+        finally:
+            durations.append(time.perf_counter() - start)
+        pages += len(texts)
+        qualities += [text_quality(text) for text in texts]
+
+    seconds = sum(durations)
+    return {
+        "pages": pages,
+        "failures": failures,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds if seconds else 0.0,
+        "p50": percentile(durations, 0.50) if durations else 0.0,
+        "p95": percentile(durations, 0.95) if durations else 0.0,
+        "quality": sum(qualities) / len(qualities) if qualities else 0.0,
+        "low_quality": sum(quality < PDF_MIN_TEXT_QUALITY for quality in qualities) / len(qualities) if qualities else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PDF extraction backends on a folder of CVs")
+    parser.add_argument("--corpus", default="cvs", help="Folder of PDFs (default: cvs)")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N PDFs")
+    parser.add_argument("--synthetic", type=int, default=None, help="Benchmark N synthetic CVs instead of the corpus")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per synthetic CV")
+    parser.add_argument("--max-pages", type=int, default=PDF_MAX_PAGES, help="Pages extracted per file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_") as workdir:
+        folder = args.corpus
+        if args.synthetic is not None or not os.path.isdir(folder):
+            folder = os.path.join(workdir, "cvs")
+            write_candidates(folder, args.synthetic or 50, args.pages)
+        corpus = load_corpus(folder, args.limit)
+    if not corpus:
+        print(f"No PDFs found in {args.corpus}")
+        return
+
+    installed = available_backends()
+    missing = [name for name in BACKENDS if name not in installed]
+    print(f"{len(corpus)} PDFs from {args.corpus if folder == args.corpus else 'synthetic CVs'}"
+          + (f" (not installed: {', '.join(missing)})" if missing else ""))
+    print(f"  {'backend':<12} {'pages':>6} {'fail':>5} {'pages/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'quality':>8} {'low q':>6}")
+    runs = [(name, lambda content, max_pages, name=name: extract_pages(content, name, max_pages)) for name in installed]
+    # The configured chain, with its fast path and page-by-page fallback
+    runs.append(("configured", extract_pdf_pages))
+    for name, extract in runs:
+        stats = bench_backend(corpus, extract, args.max_pages)
+        print(f"  {name:<12} {stats['pages']:>6} {stats['failures']:>5} {stats['pages_per_second']:>9.1f} "
+              f"{stats['p50'] * 1000:>8.1f} {stats['p95'] * 1000:>8.1f} {stats['quality']:>8.2f} {stats['low_quality']:>6.0%}")
+
+if __name__ == "__main__":
+    main()
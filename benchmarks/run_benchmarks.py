@@ -0,0 +1,219 @@
+"""
+Throughput and latency benchmarks for the screening pipeline
+
+Runs TextExtractionAgent, AgentPDFProcessor.process_pdf and AgentChain.run on
+synthetic CVs with a fake Gemini backend, so no API key or real cvs/ folder is
+needed. Each scenario runs in a fresh temporary directory, so the extraction
+and response caches start cold.
+
+Usage:
+    python -m benchmarks.run_benchmarks --candidates 200 --pages 3 --latency 0.3 --error-rate 0.02
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from benchmarks.fake_gemini import fake_gemini
+from benchmarks.synthetic import make_pdf, write_candidates, write_sheet
+from candidate_store import CandidateStore
+from logging_setup import setup_logging
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class LatencyRecorder:
+    """Collects per-stage latencies from any thread"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, obj, method_name, stage):
+        """Replace obj.method_name with a version that records its duration under stage"""
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        setattr(obj, method_name, timed)
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of values"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[rank]
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its finished children, in MB (None if unknown)"""
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+def bench_extraction(workdir, candidates, recorder):
+    """Extract every CV with TextExtractionAgent, one file at a time"""
+    from agents import TextExtractionAgent
+    agent = TextExtractionAgent()
+    recorder.wrap(agent, "extract_text_from_local_file", "extract")
+    for _, pdf_filename in candidates:
+        agent.extract_text_from_local_file(os.path.join(workdir, "cvs", pdf_filename))
+
+def bench_process_pdf(workdir, candidates, recorder):
+    """Run AgentPDFProcessor.process_pdf on every CV, as process_cvs.py does"""
+    from agent_chain import AgentPDFProcessor
+    processor = AgentPDFProcessor()
+    recorder.wrap(processor.extraction_agent, "extract_text_from_local_file", "extract")
+    recorder.wrap(processor.analysis_agent, "analyze_resume", "analyze")
+    recorder.wrap(processor, "process_pdf", "candidate")
+    for name, pdf_filename in candidates:
+        processor.process_pdf(os.path.join(workdir, "cvs", pdf_filename), person_name=name)
+
+def bench_agent_chain(workdir, candidates, recorder):
+    """Run AgentChain.run on a sheet listing every CV"""
+    from agent_chain import AgentChain
+    sheet_path = os.path.join(workdir, "candidates.xlsx")
+    write_sheet(sheet_path, candidates)
+    chain = AgentChain(sheet_path, store=CandidateStore(os.path.join(workdir, "candidates.sqlite3")))
+    chain.cv_folder = os.path.join(workdir, "cvs")
+    recorder.wrap(chain, "_prefetch_texts", "prefetch")
+    recorder.wrap(chain.analysis_agent, "analyze_resume", "analyze")
+    recorder.wrap(chain, "_screen_candidate", "candidate")
+    chain.run()
+
+def bench_agent_chain_multi(workdir, candidates, recorder):
+    """Run AgentChain.run with several resumes packed into each Gemini request"""
+    from agent_chain import AgentChain
+    from agents import CriteriaAnalysisAgent
+    sheet_path = os.path.join(workdir, "candidates.xlsx")
+    write_sheet(sheet_path, candidates)
+    chain = AgentChain(sheet_path, store=CandidateStore(os.path.join(workdir, "candidates.sqlite3")))
+    chain.cv_folder = os.path.join(workdir, "cvs")
+    chain.analysis_agent = CriteriaAnalysisAgent(multi_resume=True)
+    recorder.wrap(chain, "_prefetch_texts", "prefetch")
+    recorder.wrap(chain.analysis_agent, "analyze_batch", "analyze")
+    recorder.wrap(chain, "_screen_group", "group")
+    chain.run()
+
+def bench_agent_chain_duplicates(workdir, candidates, recorder):
+    """Run AgentChain.run on a sheet where every fourth candidate submitted the form twice (another email, same CV)"""
+    from agent_chain import AgentChain
+    resubmitted = []
+    for name, pdf_filename in candidates[::4]:
+        shutil.copy(os.path.join(workdir, "cvs", pdf_filename), os.path.join(workdir, "cvs", f"again_{pdf_filename}"))
+        resubmitted.append((name, f"again_{pdf_filename}"))
+    sheet_path = os.path.join(workdir, "candidates.xlsx")
+    write_sheet(sheet_path, candidates + resubmitted)
+    chain = AgentChain(sheet_path, store=CandidateStore(os.path.join(workdir, "candidates.sqlite3")))
+    chain.cv_folder = os.path.join(workdir, "cvs")
+    recorder.wrap(chain, "_prefetch_texts", "prefetch")
+    recorder.wrap(chain, "_skip_duplicates", "dedup")
+    recorder.wrap(chain.analysis_agent, "analyze_resume", "analyze")
+    chain.run()
+
+def bench_agent_chain_scanned(workdir, candidates, recorder):
+    """Run AgentChain.run where every fifth CV is a scan without a text layer, screened with the PDF attached"""
+    from agent_chain import AgentChain
+    for name, pdf_filename in candidates[::5]:
+        with open(os.path.join(workdir, "cvs", pdf_filename), "wb") as f:
+            f.write(make_pdf([[name], []], scanned=True))
+    sheet_path = os.path.join(workdir, "candidates.xlsx")
+    write_sheet(sheet_path, candidates)
+    chain = AgentChain(sheet_path, store=CandidateStore(os.path.join(workdir, "candidates.sqlite3")))
+    chain.cv_folder = os.path.join(workdir, "cvs")
+    recorder.wrap(chain.extraction_agent, "read_scanned_pdf", "detect")
+    recorder.wrap(chain.analysis_agent, "analyze_resume", "analyze")
+    recorder.wrap(chain.analysis_agent, "analyze_scanned", "scanned")
+    chain.run()
+
+SCENARIOS = {
+    "extraction": bench_extraction,
+    "process_pdf": bench_process_pdf,
+    "agent_chain": bench_agent_chain,
+    "agent_chain_multi": bench_agent_chain_multi,
+    "agent_chain_duplicates": bench_agent_chain_duplicates,
+    "agent_chain_scanned": bench_agent_chain_scanned
+}
+
+def run_scenario(name, args, seed):
+    """Run one scenario in a fresh directory and return its report"""
+    recorder = LatencyRecorder()
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+        candidates = write_candidates(os.path.join(workdir, "cvs"), args.candidates, args.pages, args.lines_per_page, seed)
+        os.chdir(workdir)  # Caches and journals go to the temporary directory
+        try:
+            with fake_gemini(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=seed, recorder=recorder):
+                start = time.perf_counter()
+                SCENARIOS[name](workdir, candidates, recorder)
+                elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(previous_dir)
+
+    return {
+        "scenario": name,
+        "candidates": len(candidates),
+        "seconds": elapsed,
+        "throughput": len(candidates) / elapsed if elapsed else 0.0,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99)
+            }
+            for stage, values in recorder.samples.items()
+        },
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def print_report(report):
+    print(f"\n{report['scenario']}: {report['candidates']} candidates in {report['seconds']:.2f}s "
+          f"({report['throughput']:.2f} candidates/sec)")
+    if report["peak_rss_mb"] is not None:
+        print(f"  peak RSS so far: {report['peak_rss_mb']:.1f} MB")
+    print(f"  {'stage':<10} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<10} {stats['count']:>6} {stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the screening pipeline with synthetic CVs and a fake Gemini backend")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--candidates", type=int, default=50, help="Synthetic CVs per scenario")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per CV")
+    parser.add_argument("--lines-per-page", type=int, default=40, help="Text lines per page")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean fake Gemini latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Maximum deviation from the mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake Gemini calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+    if args.verbose:
+        setup_logging()
+    else:
+        # Keep the report readable; injected errors would otherwise log a warning each
+        logging.disable(logging.CRITICAL)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    for offset, name in enumerate(names):
+        # A different seed per scenario keeps CVs (and cache keys) distinct between scenarios
+        print_report(run_scenario(name, args, args.seed + offset))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Synthetic resumes, PDFs and spreadsheets for the benchmarks
+"""
+
+import os
+import random
+import pandas as pd
+from config import COLUMN_NAMES, CRITERIA
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabriela", "Henrique", "Isabela", "João", "Larissa", "Marcos"]
+LAST_NAMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Costa", "Almeida", "Ferreira", "Rodrigues", "Lima"]
+COURSES = ["Engenharia de Computação", "Ciência da Computação", "Engenharia Elétrica", "Economia", "Matemática Aplicada"]
+# Institutions the local pre-filter cannot classify, so some resumes always reach Gemini
+UNKNOWN_INSTITUTIONS = ["Instituto Tecnológico Regional", "Escola Superior de Tecnologia", "Universidade do Vale"]
+SMALL_COMPANIES = ["Padaria Central", "Loja do Bairro", "Startup Alfa", "Consultoria Beta"]
+FILLER = [
+    "Conhecimentos em Python, SQL, Excel avançado e Power BI.",
+    "Participação em hackathons e grupos de estudo de algoritmos.",
+    "Inglês avançado e espanhol intermediário.",
+    "Voluntário em projetos sociais de ensino de programação.",
+    "Curso de extensão em análise de dados e estatística.",
+    "Experiência com metodologias ágeis e trabalho em equipe."
+]
+
+def make_resume_lines(rng, pages=2, lines_per_page=40):
+    """
+    Return the lines of a random resume, grouped by page
+
+    University, enrollment status and experience are drawn from CRITERIA and
+    from unknown names, so the mix of pre-filter decisions and Gemini calls
+    resembles a real candidate pool.
+    """
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    institution = rng.choice(CRITERIA["university_type"] + CRITERIA["excluded_university_type"] + UNKNOWN_INSTITUTIONS)
+    status = rng.choice(CRITERIA["education_status"] + CRITERIA["graduation_keywords"])
+    experience = rng.choice(CRITERIA["top_companies"] + SMALL_COMPANIES)
+
+    header = [
+        name,
+        f"{name.lower().replace(' ', '.')}@email.com | (31) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "Formação Acadêmica",
+        f"{rng.choice(COURSES)} - {institution} ({status})",
+        "Experiência Profissional",
+        f"Estagiário na {experience}"
+    ]
+    if rng.random() < 0.3:
+        header += ["Pesquisa", f"{rng.choice(CRITERIA['research_keywords']).capitalize()} em aprendizado de máquina"]
+    header.append("Habilidades")
+
+    lines = header + [rng.choice(FILLER) for _ in range(max(0, pages * lines_per_page - len(header)))]
+    return [lines[page * lines_per_page:(page + 1) * lines_per_page] for page in range(pages)]
+
+def _pdf_string(text):
+    """Escape text for a PDF literal string in WinAnsi encoding"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("cp1252", errors="replace")
+
+def make_pdf(pages, scanned=False):
+    """
+    Build a minimal text PDF, or one that looks scanned
+
+    Args:
+        pages (list): One list of text lines per page
+        scanned (bool): Draw an image on each page instead of the text, like a scanner does
+
+    Returns:
+        bytes: The PDF file content
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ]
+    # A one-row gray image, stretched over the page, stands in for the scan; its pixels are
+    # the first line of text, so different resumes still give different files
+    image = 4 + 2 * len(pages)
+    pixels = (pages[0][0] if pages and pages[0] else " ").encode("cp1252", errors="replace")
+    for i, lines in enumerate(pages):
+        if scanned:
+            stream = b"q 612 0 0 792 0 0 cm /Im1 Do Q"
+            resources = f"/XObject << /Im1 {image} 0 R >>"
+        else:
+            stream = b"BT /F1 10 Tf 40 760 Td 14 TL " + b" ".join(b"(" + _pdf_string(line) + b") '" for line in lines) + b" ET"
+            resources = "/Font << /F1 3 0 R >>"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << {resources} >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    if scanned:
+        objects.append(f"<< /Type /XObject /Subtype /Image /Width {len(pixels)} /Height 1 /ColorSpace /DeviceGray "
+                       f"/BitsPerComponent 8 /Length {len(pixels)} >>\nstream\n".encode() + pixels + b"\nendstream")
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    content += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return content
+
+def write_candidates(folder, count, pages=2, lines_per_page=40, seed=0):
+    """
+    Write count synthetic CVs to folder
+
+    Returns:
+        list: (name, pdf_filename) for each candidate
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    candidates = []
+    for index in range(count):
+        resume_pages = make_resume_lines(rng, pages, lines_per_page)
+        name = resume_pages[0][0]
+        pdf_filename = f"candidate_{seed}_{index}.pdf"
+        with open(os.path.join(folder, pdf_filename), "wb") as f:
+            f.write(make_pdf(resume_pages))
+        candidates.append((name, pdf_filename))
+    return candidates
+
+def write_sheet(path, candidates):
+    """Write an application sheet in the format AgentChain expects"""
+    rows = [
+        {
+            COLUMN_NAMES["timestamp"]: "2024-01-01 00:00:00",
+            COLUMN_NAMES["resume_link"]: f"https://drive.google.com/file/d/synthetic{index}/view",
+            COLUMN_NAMES["name"]: name,
+            COLUMN_NAMES["email"]: f"candidate{index}@email.com",
+            COLUMN_NAMES["pdf_filename"]: pdf_filename
+        }
+        for index, (name, pdf_filename) in enumerate(candidates)
+    ]
+    pd.DataFrame(rows).to_excel(path, index=False)
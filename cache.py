@@ -0,0 +1,317 @@
+"""
+On-disk caches for the resume screening application
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import (
+    EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES,
+    UPLOAD_CACHE_PATH, GEMINI_FILE_TTL
+)
+from metrics import get_metrics
+
+def sha256_bytes(content):
+    """Return the hex SHA-256 digest of a bytes object"""
+    return hashlib.sha256(content).hexdigest()
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different copies share a key"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def sha256_text(text):
+    """Return the hex SHA-256 digest of a string"""
+    return sha256_bytes(text.encode('utf-8'))
+
+class SQLiteCache:
+    """
+    Base class for the SQLite-backed caches.
+
+    A single connection is shared by all threads of the process and guarded by
+    a lock; WAL mode lets several processes read and write the same file.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path):
+        """Open (and create if needed) the cache database"""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+class ExtractionCache(SQLiteCache):
+    """
+    Content-addressed cache of extracted resume text.
+
+    Entries are keyed by the SHA-256 of the file bytes and the extractor version,
+    so a changed file or a new extractor never returns stale text. When the
+    stored text exceeds max_bytes, the least recently used entries are evicted.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS extracted_text (
+            sha256 TEXT NOT NULL,
+            extractor_version TEXT NOT NULL,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (sha256, extractor_version)
+        );
+        CREATE INDEX IF NOT EXISTS idx_extracted_text_access ON extracted_text (last_access);
+    """
+
+    def __init__(self, path=EXTRACTION_CACHE_PATH, max_bytes=EXTRACTION_CACHE_MAX_BYTES):
+        """Open the extraction cache"""
+        super().__init__(path)
+        self.max_bytes = max_bytes
+
+    def get(self, digest, extractor_version):
+        """Return the cached text for a file digest, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM extracted_text WHERE sha256 = ? AND extractor_version = ?",
+                (digest, extractor_version)
+            ).fetchone()
+            if row is None:
+                get_metrics().increment("cache_lookups", cache="extraction", result="miss")
+                return None
+            get_metrics().increment("cache_lookups", cache="extraction", result="hit")
+            self._conn.execute(
+                "UPDATE extracted_text SET last_access = ? WHERE sha256 = ? AND extractor_version = ?",
+                (time.time(), digest, extractor_version)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, digest, extractor_version, text):
+        """Store extracted text and evict old entries if the cache is too large"""
+        now = time.time()
+        size = len(text.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted_text VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, extractor_version, text, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extracted_text").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Free a little more than needed so we do not evict on every insert
+        to_free = total - int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT sha256, extractor_version, size FROM extracted_text ORDER BY last_access"
+        )
+        victims = []
+        for digest, version, size in rows:
+            if to_free <= 0:
+                break
+            victims.append((digest, version))
+            to_free -= size
+        self._conn.executemany(
+            "DELETE FROM extracted_text WHERE sha256 = ? AND extractor_version = ?", victims
+        )
+
+class ResponseCache(SQLiteCache):
+    """
+    Persistent cache of Gemini responses.
+
+    Keys combine the normalized resume text, the prompt template and the model,
+    so identical resumes screened with unchanged prompts never hit the API.
+    Entries expire after ttl seconds and the least recently used ones are
+    dropped above max_entries. Both are checked every PURGE_INTERVAL inserts,
+    or as soon as the row count goes over max_entries; lookups ignore expired
+    entries meanwhile. Hit/miss counters cover the current process.
+    """
+
+    # Inserts between two purges of expired entries (which also recount the rows written by other processes)
+    PURGE_INTERVAL = 100
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_responses (
+            cache_key TEXT PRIMARY KEY,
+            resume_hash TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses (last_access);
+        CREATE INDEX IF NOT EXISTS idx_llm_responses_created ON llm_responses (created_at);
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        """Open the response cache"""
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Row count as of the last purge plus the inserts since (replaced keys count twice until the next purge)
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        self._inserts_since_purge = 0
+
+    @staticmethod
+    def make_key(resume_text, prompt_template, model):
+        """Return (cache_key, resume_hash, prompt_hash) for a request"""
+        resume_hash = sha256_text(normalize_text(resume_text))
+        prompt_hash = sha256_text(prompt_template)
+        cache_key = sha256_text(f"{resume_hash}:{prompt_hash}:{model}")
+        return cache_key, resume_hash, prompt_hash
+
+    def get(self, resume_text, prompt_template, model):
+        """Return the cached response text, or None on a miss or expired entry"""
+        cache_key, _, _ = self.make_key(resume_text, prompt_template, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                get_metrics().increment("cache_lookups", cache="response", result="miss")
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            self._conn.commit()
+            self.hits += 1
+            get_metrics().increment("cache_lookups", cache="response", result="hit")
+            return row[0]
+
+    def put(self, resume_text, prompt_template, model, response):
+        """Store a response and apply TTL/LRU eviction when due"""
+        cache_key, resume_hash, prompt_hash = self.make_key(resume_text, prompt_template, model)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, resume_hash, prompt_hash, model, response, now, now)
+            )
+            self._entries += 1
+            self._inserts_since_purge += 1
+            if self._inserts_since_purge >= self.PURGE_INTERVAL or (self.max_entries and self._entries > self.max_entries):
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then the least recently used ones above max_entries"""
+        self._inserts_since_purge = 0
+        if self.ttl:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        if self.max_entries and self._entries > self.max_entries:
+            # Free a little more than needed so we do not evict on every insert
+            keep = int(self.max_entries * 0.9)
+            self._conn.execute(
+                """DELETE FROM llm_responses WHERE cache_key IN (
+                       SELECT cache_key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                   )""",
+                (keep,)
+            )
+            self._entries = keep
+
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class UploadCache(SQLiteCache):
+    """
+    Files uploaded to the Gemini Files API, by SHA-256 of their bytes.
+
+    Gemini deletes uploads after ttl seconds, so an entry is only returned
+    while its file is sure to exist; the same PDF is never uploaded twice
+    before that.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS gemini_files (
+            sha256 TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            uri TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path=UPLOAD_CACHE_PATH, ttl=GEMINI_FILE_TTL):
+        """Open the upload cache"""
+        super().__init__(path)
+        self.ttl = ttl
+
+    def get(self, digest):
+        """Return the URI of a live upload of the file, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT uri FROM gemini_files WHERE sha256 = ? AND expires_at > ?", (digest, now)
+            ).fetchone()
+        get_metrics().increment("cache_lookups", cache="upload", result="hit" if row is not None else "miss")
+        return row[0] if row is not None else None
+
+    def put(self, digest, name, uri):
+        """Record an upload made just now and drop the expired ones"""
+        now = time.time()
+        # Stop reusing an upload a little before Gemini deletes it
+        expires_at = now + self.ttl * 0.9
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO gemini_files VALUES (?, ?, ?, ?)", (digest, name, uri, expires_at))
+            self._conn.execute("DELETE FROM gemini_files WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+def get_extraction_cache():
+    """Return the process-wide extraction cache"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache()
+        return _extraction_cache
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Return the process-wide Gemini response cache"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+_upload_cache = None
+_upload_cache_lock = threading.Lock()
+
+def get_upload_cache():
+    """Return the process-wide registry of Gemini uploads"""
+    global _upload_cache
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            _upload_cache = UploadCache()
+        return _upload_cache
\ No newline at end of file
@@ -0,0 +1,417 @@
+"""
+SQLite working store for candidate state, with Excel as an export format
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import pandas as pd
+from config import CANDIDATE_STORE_PATH, COLUMN_NAMES
+from journal import ResultsJournal, journal_path_for, write_excel_atomic
+from metrics import get_metrics
+from sheet_io import read_sheet, read_header, cell_value
+
+logger = logging.getLogger(__name__)
+
+# Row of the submission whose verdict a duplicate submission reuses
+DUPLICATE_COLUMN = "Duplicate_Of"
+
+# Sheet columns the pipeline reads or writes; the rest of the form stays in the source workbook
+STORE_COLUMNS = [
+    COLUMN_NAMES["name"], COLUMN_NAMES["email"], COLUMN_NAMES["resume_link"], COLUMN_NAMES["pdf_filename"],
+    COLUMN_NAMES["result"], "Download_Status", "Error_Message", "Retry_Count", "Processed_Result", DUPLICATE_COLUMN
+]
+
+# Columns queried for pending work and errors
+INDEXED_COLUMNS = [COLUMN_NAMES["pdf_filename"], COLUMN_NAMES["result"], "Download_Status", "Processed_Result", DUPLICATE_COLUMN]
+
+def _quote(column):
+    """Quote a sheet column name as an SQLite identifier"""
+    return '"' + column.replace('"', '""') + '"'
+
+def _sql_value(value):
+    """Convert a dataframe cell to a value SQLite can bind"""
+    value = cell_value(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+class CandidateStore:
+    """
+    Candidate rows, download status and verdicts in one SQLite table.
+
+    The table is filled once from a workbook (keeping its row order as idx),
+    and rows appended to the workbooks later are added on the next load;
+    every update is a single committed UPDATE, and queries such as
+    pending rows or errors to retry use indexes instead of scanning a sheet.
+    Only the working columns are stored: export() merges them back into the
+    source workbook, so the other form columns are carried over untouched.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS candidates (idx INTEGER PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS screening_stages (
+            idx INTEGER NOT NULL,
+            result_column TEXT NOT NULL,
+            stages TEXT NOT NULL,
+            PRIMARY KEY (idx, result_column)
+        );
+    """
+
+    def __init__(self, path=CANDIDATE_STORE_PATH):
+        """Open (and create if needed) the store"""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Verdicts cost Gemini calls, so every commit is synced to disk
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+        self.columns = [row[1] for row in self._conn.execute("PRAGMA table_info(candidates)")][1:]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @property
+    def source_path(self):
+        """Workbook the candidates were imported from"""
+        with self._lock:
+            return self._meta("source_path")
+
+    @property
+    def source_columns(self):
+        """Header of that workbook, including the columns that are not stored"""
+        with self._lock:
+            return self._meta("source_columns", [])
+
+    def _add_columns(self, columns):
+        """Add missing columns to the table (called with the lock held)"""
+        for column in columns:
+            if column in self.columns:
+                continue
+            self._conn.execute(f"ALTER TABLE candidates ADD COLUMN {_quote(column)}")
+            if column in INDEXED_COLUMNS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote('idx_' + column)} ON candidates ({_quote(column)})")
+            self.columns.append(column)
+
+    def import_sheet(self, excel_path):
+        """
+        Replace the store content with the working columns of a workbook
+
+        Results still waiting in the workbook's journal (left by a run that
+        wrote the sheet directly) are replayed first.
+
+        Returns:
+            int: Number of candidates imported
+        """
+        df = read_sheet(excel_path, STORE_COLUMNS)
+        journal_path = journal_path_for(excel_path)
+        if os.path.exists(journal_path):
+            journal = ResultsJournal(journal_path)
+            journal.apply(df)
+            journal.close()
+
+        columns = list(df.columns)
+        values = zip(*(df[column].tolist() for column in columns)) if columns else ((),) * len(df)
+        rows = [(position, *(_sql_value(value) for value in row)) for position, row in enumerate(values)]
+        with self._lock, get_metrics().timer("sheet_write", op="import"):
+            self._conn.execute("DELETE FROM candidates")
+            self._conn.execute("DELETE FROM screening_stages")
+            self._add_columns(columns)
+            self._conn.executemany(
+                f"INSERT INTO candidates ({', '.join(['idx'] + [_quote(column) for column in columns])}) "
+                f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+                rows
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('source_path', ?)", (json.dumps(excel_path),))
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('source_columns', ?)", (json.dumps(read_header(excel_path)),))
+            self._conn.execute("DELETE FROM meta WHERE key = 'source_mtimes'")
+            self._record_mtime(excel_path)
+            self._conn.commit()
+        return len(rows)
+
+    def _record_mtime(self, excel_path):
+        """Remember the modification time of a workbook whose rows are all in the store (called with the lock held)"""
+        mtimes = self._meta("source_mtimes", {})
+        mtimes[os.path.abspath(excel_path)] = os.path.getmtime(excel_path)
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('source_mtimes', ?)", (json.dumps(mtimes),))
+
+    def import_new_rows(self, excel_path):
+        """
+        Add the rows of a workbook that come after the last stored row
+
+        Rows are matched by position, as in import_sheet, so form answers
+        appended to the sheet after the first run are picked up. A workbook
+        unchanged since it was last read (or exported) is not opened.
+
+        Returns:
+            int: Number of candidates added
+        """
+        with self._lock:
+            if self._meta("source_mtimes", {}).get(os.path.abspath(excel_path)) == os.path.getmtime(excel_path):
+                return 0
+        df = read_sheet(excel_path, STORE_COLUMNS)
+        with self._lock, get_metrics().timer("sheet_write", op="import"):
+            next_index = self._conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM candidates").fetchone()[0]
+            new = df.iloc[next_index:]
+            columns = list(new.columns)
+            self._add_columns(columns)
+            values = zip(*(new[column].tolist() for column in columns)) if columns else ((),) * len(new)
+            self._conn.executemany(
+                f"INSERT INTO candidates ({', '.join(['idx'] + [_quote(column) for column in columns])}) "
+                f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+                [(next_index + offset, *(_sql_value(value) for value in row)) for offset, row in enumerate(values)]
+            )
+            self._record_mtime(excel_path)
+            self._conn.commit()
+        if len(df) < next_index:
+            logger.warning(f"{excel_path} has {len(df)} rows but {self.path} holds {next_index}; "
+                  f"rows removed from the sheet are kept in the store")
+        return len(new)
+
+    def load(self, *excel_paths):
+        """
+        Import the first existing workbook of excel_paths, unless the store is already filled
+
+        A filled store takes the rows appended to any of the workbooks since
+        they were last read instead.
+
+        Returns:
+            int: Number of candidates imported (0 when the store was reused)
+        """
+        if len(self):
+            added = sum(self.import_new_rows(excel_path) for excel_path in excel_paths if excel_path and os.path.exists(excel_path))
+            if added:
+                logger.info(f"Added {added} candidates appended to the sheet since the last run to {self.path}")
+            return 0
+        for excel_path in excel_paths:
+            if excel_path and os.path.exists(excel_path):
+                return self.import_sheet(excel_path)
+        raise FileNotFoundError(f"No candidates in {self.path} and none of {', '.join(excel_paths)} exists")
+
+    def frame(self, columns=None):
+        """Return the given columns (all by default) as a dataframe indexed by row"""
+        columns = list(self.columns if columns is None else columns)
+        with self._lock:
+            stored = [column for column in columns if column in self.columns]
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(['idx'] + [_quote(column) for column in stored])} FROM candidates ORDER BY idx",
+                self._conn, index_col="idx"
+            )
+        df.index.name = None
+        for column in columns:
+            if column not in df.columns:
+                df[column] = None
+        return df[columns]
+
+    def update(self, index, **fields):
+        """Durably set new values for the row at index"""
+        with self._lock, get_metrics().timer("sheet_write", op="store"):
+            self._add_columns(fields)
+            self._conn.execute(
+                f"UPDATE candidates SET {', '.join(f'{_quote(column)} = ?' for column in fields)} WHERE idx = ?",
+                [_sql_value(value) for value in fields.values()] + [int(index)]
+            )
+            self._conn.commit()
+
+    def _indexes(self, where, params=()):
+        """Return the row indexes matching an SQL condition, in sheet order"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT idx FROM candidates WHERE {where} ORDER BY idx", params).fetchall()
+        return [row[0] for row in rows]
+
+    def pending(self, column):
+        """Rows with a downloaded CV, no value yet in a result column and no duplicate mark"""
+        where = f"{_quote(COLUMN_NAMES['pdf_filename'])} IS NOT NULL"
+        if column in self.columns:
+            where += f" AND {_quote(column)} IS NULL"
+        if DUPLICATE_COLUMN in self.columns:
+            where += f" AND {_quote(DUPLICATE_COLUMN)} IS NULL"
+        return self._indexes(where)
+
+    def errors(self, column):
+        """Rows whose result column holds an error ("ERROR: ...", "Error: ..." or "Erro")"""
+        if column not in self.columns:
+            return []
+        return self._indexes(f"{_quote(column)} LIKE 'err%'")
+
+    def clear(self, column, indexes):
+        """Empty a column for the given rows, so the next run processes them again"""
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE candidates SET {_quote(column)} = NULL WHERE idx = ?",
+                [(int(index),) for index in indexes]
+            )
+            self._conn.commit()
+
+    def record_stages(self, column, index, stages):
+        """Keep the screening stages (results and fingerprints) behind the verdict of a row in a result column"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO screening_stages VALUES (?, ?, ?)",
+                (int(index), column, json.dumps(stages, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def outdated(self, column, is_outdated):
+        """
+        Rows whose verdict in a result column was reached by stages that are out of date
+
+        Verdicts stored without stages (older runs) and errors are left alone.
+
+        Args:
+            column (str): Result column
+            is_outdated (callable): Recorded stages -> True when the verdict must be screened again
+
+        Returns:
+            dict: Row index -> recorded stages, so the stages still up to date can be reused
+        """
+        if column not in self.columns:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT s.idx, s.stages FROM screening_stages s JOIN candidates c ON c.idx = s.idx "
+                f"WHERE s.result_column = ? AND c.{_quote(column)} IS NOT NULL AND c.{_quote(column)} NOT LIKE 'err%' ORDER BY s.idx",
+                (column,)
+            ).fetchall()
+        outdated = {}
+        for index, stages in rows:
+            stages = json.loads(stages)
+            if is_outdated(stages):
+                outdated[index] = stages
+        return outdated
+
+    def mark_duplicates(self, duplicates, indexes=()):
+        """
+        Record the representative of each duplicate row
+
+        Args:
+            duplicates (dict): Row index -> row index of its group's representative
+            indexes (iterable): Rows that were checked again; their old mark is removed unless in duplicates
+        """
+        cleared = [index for index in indexes if index not in duplicates]
+        with self._lock:
+            self._add_columns([DUPLICATE_COLUMN])
+            self._conn.executemany(
+                f"UPDATE candidates SET {_quote(DUPLICATE_COLUMN)} = ? WHERE idx = ?",
+                [(int(representative), int(index)) for index, representative in duplicates.items()] +
+                [(None, int(index)) for index in cleared]
+            )
+            self._conn.commit()
+
+    def duplicate_groups(self):
+        """Return representative row -> rows reusing its verdict"""
+        if DUPLICATE_COLUMN not in self.columns:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT CAST({_quote(DUPLICATE_COLUMN)} AS INTEGER), idx FROM candidates "
+                f"WHERE {_quote(DUPLICATE_COLUMN)} IS NOT NULL ORDER BY idx"
+            ).fetchall()
+        groups = {}
+        for representative, index in rows:
+            groups.setdefault(representative, []).append(index)
+        return groups
+
+    def propagate_duplicates(self, column):
+        """
+        Copy a result column from each representative to its duplicates whose value differs
+
+        Errors are not copied, so duplicates wait until their representative is screened again.
+
+        Returns:
+            dict: Row index -> value copied
+        """
+        if DUPLICATE_COLUMN not in self.columns or column not in self.columns:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT d.idx, r.{_quote(column)} FROM candidates d JOIN candidates r ON r.idx = d.{_quote(DUPLICATE_COLUMN)} "
+                f"WHERE r.{_quote(column)} IS NOT NULL AND r.{_quote(column)} NOT LIKE 'err%' "
+                f"AND (d.{_quote(column)} IS NULL OR d.{_quote(column)} != r.{_quote(column)})"
+            ).fetchall()
+            self._conn.executemany(
+                f"UPDATE candidates SET {_quote(column)} = ? WHERE idx = ?",
+                [(value, index) for index, value in rows]
+            )
+            self._conn.commit()
+        return dict(rows)
+
+    def export(self, excel_path, columns=None):
+        """Write the candidates to Excel, merged into the source workbook when it still exists"""
+        source_path = self.source_path
+        if source_path is not None and not os.path.exists(source_path):
+            source_path = None
+        df = self.frame(columns).reset_index(drop=True)
+        with get_metrics().timer("sheet_write", op="export"):
+            write_excel_atomic(df, excel_path, source_path)
+        # The export holds no row the store lacks, so the next load does not read it back
+        with self._lock:
+            self._record_mtime(excel_path)
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_candidate_store():
+    """Return the process-wide candidate store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CandidateStore()
+        return _store
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, export or reset the candidate store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write the candidates to an Excel file")
+    export_parser.add_argument("excel_path")
+    subparsers.add_parser("stats", help="Show how many candidates are in each state")
+    subparsers.add_parser("duplicates", help="List the groups of duplicate submissions")
+    retry_parser = subparsers.add_parser("retry-errors", help="Clear error results so the next run screens them again")
+    retry_parser.add_argument("--column", default="Processed_Result")
+    args = parser.parse_args()
+
+    store = get_candidate_store()
+    if args.command == "export":
+        store.export(args.excel_path)
+        print(f"Exported {len(store)} candidates to {args.excel_path}")
+    elif args.command == "stats":
+        print(f"Candidates: {len(store)} (imported from {store.source_path})")
+        df = store.frame(["Download_Status", "Processed_Result", COLUMN_NAMES["result"]])
+        print(f"Downloads: {df['Download_Status'].value_counts(dropna=False).to_dict()}")
+        for column in ("Processed_Result", COLUMN_NAMES["result"]):
+            print(f"{column}: {len(store.pending(column))} pending, {len(store.errors(column))} errors")
+        groups = store.duplicate_groups()
+        print(f"Duplicates: {sum(len(members) for members in groups.values())} rows in {len(groups)} groups")
+    elif args.command == "duplicates":
+        df = store.frame([COLUMN_NAMES["name"], COLUMN_NAMES["email"]])
+        for representative, members in store.duplicate_groups().items():
+            print(f"Row {representative} ({df.at[representative, COLUMN_NAMES['name']]}, {df.at[representative, COLUMN_NAMES['email']]}) "
+                  f"also stands for rows {', '.join(str(index) for index in members)}")
+    else:
+        indexes = store.errors(args.column)
+        store.clear(args.column, indexes)
+        print(f"Cleared {len(indexes)} errors in {args.column}")
+
+if __name__ == "__main__":
+    main()
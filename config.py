@@ -5,6 +5,24 @@ Configuration settings for the resume screening application
 # Gemini model settings
 GEMINI_MODEL = 'gemini-2.0-flash'  # Use 'gemini-1.5-pro' for more accuracy if available
 
+USE_COMBINED_SCREENING = False  # Check both criteria in one Gemini request with a JSON answer
+MULTI_RESUME_SCREENING = False  # Screen several resumes per Gemini request (JSON array answer, one verdict per resume)
+MULTI_RESUME_MAX_PER_REQUEST = 8  # Most resumes packed into one request
+MULTI_RESUME_TOKEN_BUDGET = 12000  # Resume tokens packed into one request (a longer resume goes alone)
+USE_LOCAL_PREFILTER = True  # Decide clear-cut resumes with keyword matching before calling Gemini
+INCREMENTAL_RESCREENING = True  # Screen stored verdicts again when their criteria, prompt or model changed, reusing the stages that did not
+DEDUP_ENABLED = True  # Screen one submission per person (same email or near-identical resume) and copy its verdict to the others
+DEDUP_SIMILARITY_THRESHOLD = 0.8  # Estimated Jaccard similarity of resume word shingles above which two resumes are duplicates
+DEDUP_NUM_PERM = 128  # MinHash signature length (more is more precise and slower)
+DEDUP_LSH_BANDS = 32  # LSH bands the signature is cut into (must divide DEDUP_NUM_PERM)
+DEDUP_SHINGLE_SIZE = 5  # Words per shingle
+USE_SECTION_EXTRACTION = True  # Send each agent only the resume sections it needs (education, experience, ...)
+SECTION_TOKEN_BUDGETS = {  # Maximum resume tokens sent to each agent
+    "university": 1500,
+    "company": 2500,
+    "combined": 3500
+}
+
 # Resume screening criteria
 CRITERIA = {
     "university_type": ["federal", "estadual", "state", "fed", "UFMG", "USP", "UNICAMP", "UNESP", "UFRJ", "UNB", "UFPR", "UFSC", "UFRGS", "UFC"],
@@ -30,11 +48,73 @@ CRITERIA = {
 
 # File handling settings
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB max file size
+CACHE_DIR = ".cache"  # Folder for on-disk caches
+EXTRACTION_CACHE_ENABLED = True  # Reuse extracted resume text across runs
+EXTRACTION_CACHE_PATH = ".cache/extracted_text.sqlite3"
+EXTRACTION_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Evict least recently used text above 500MB
+PDF_EXTRACTOR_VERSION = "v3"  # Bump when PDF extraction logic changes (the backend list is part of the cache key)
+PDF_BACKENDS = ["pypdfium2", "pypdf2", "pdfminer"]  # PDF text extractors tried in order; those not installed are skipped
+PDF_MIN_TEXT_QUALITY = 0.6  # Pages scoring lower (empty, garbled, glued words) are extracted again with the next backend
+PDF_MAX_PAGES = 20  # Only the first pages of a resume are extracted
+SCANNED_PDF_ROUTING = True  # Screen scanned PDFs (almost no text, pages made of images) with one multimodal Gemini call on the PDF itself
+SCANNED_MIN_CHARS_PER_PAGE = 100  # PDFs with less extracted text per page than this may be scans
+SCANNED_MIN_IMAGE_RATIO = 0.5  # ...and are scans when at least this share of their pages shows an embedded image
+GEMINI_FILE_TTL = 48 * 3600  # Seconds the Gemini Files API keeps an upload; the same PDF is not uploaded again before that
+UPLOAD_CACHE_PATH = ".cache/gemini_files.sqlite3"  # Uploaded PDFs by SHA-256, reused until they expire
+EXTRACTION_WORKERS = None  # Processes used for batch PDF extraction (None = one per CPU)
+EXTRACTION_TIMEOUT = 60  # Seconds before a single PDF extraction is given up
+RESPONSE_CACHE_ENABLED = True  # Reuse Gemini answers for identical resumes and prompts
+RESPONSE_CACHE_PATH = ".cache/llm_responses.sqlite3"
+RESPONSE_CACHE_TTL = 30 * 24 * 3600  # Seconds before a cached answer expires (0 = never)
+RESPONSE_CACHE_MAX_ENTRIES = 100_000  # Least recently used answers are dropped above this
 ALLOWED_FILE_TYPES = ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
 
 # API settings
 API_RATE_LIMIT_DELAY = 0.1  # Seconds to wait between API calls
 MAX_RETRIES = 3  # Maximum number of retries for API calls
+GEMINI_REQUESTS_PER_MINUTE = 2000  # Requests-per-minute quota of the Gemini project
+GEMINI_TOKENS_PER_MINUTE = 4_000_000  # Tokens-per-minute quota of the Gemini project
+GEMINI_REQUEST_TIMEOUT = 60  # Seconds before a single async Gemini request is abandoned and retried
+ASYNC_MAX_IN_FLIGHT = 200  # Concurrent Gemini requests in the async screening path
+RETRY_BASE_DELAY = 1  # Base delay (seconds) for the jittered exponential backoff
+RETRY_MAX_DELAY = 60  # Upper bound (seconds) for a single backoff wait
+
+# Batch mode settings (python process_cvs.py --batch)
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com"  # Point to a local stand-in server for testing
+BATCH_POLL_INTERVAL = 60  # Seconds between batch job status checks
+BATCH_JOB_FILE = "batch_requests.jsonl"  # Serialized prompts uploaded as the batch input
+BATCH_STATE_PATH = "batch_job.json"  # Submitted batch, kept so an interrupted run resumes polling
+
+# Logging settings
+LOG_LEVEL = "INFO"  # DEBUG also shows each screening step of every candidate
+LOG_FILE = None  # Optional log file written in addition to the console (e.g. "screening.log")
+LOG_FILE_FORMAT = "text"  # "text" or "json" (one JSON object per line) for LOG_FILE
+
+# Candidate store settings
+CANDIDATE_STORE_PATH = "candidates.sqlite3"  # Working state of every candidate; Excel files are exported from it
+
+# Metrics settings
+METRICS_ENABLED = True  # Record per-stage timings and counters and print a summary table at the end of a run
+METRICS_PROMETHEUS_PATH = "metrics.prom"  # Prometheus text file written at the end of a run (None = off)
+METRICS_TRACE_PATH = None  # JSONL file receiving every timing and counter event (None = off)
+
+# Concurrency settings
+MAX_WORKERS = 4  # Number of candidates screened in parallel (1 = sequential)
+
+# Download settings
+DOWNLOAD_WORKERS = 4  # Concurrent Google Drive downloads
+DOWNLOAD_TIMEOUT = 60  # Seconds before a stalled download request is abandoned
+DOWNLOAD_MIN_INTERVAL = 0.5  # Seconds between requests to Drive while it is not throttling
+DOWNLOAD_MAX_INTERVAL = 60  # Upper bound for the interval after repeated throttling
+DOWNLOAD_MAX_RETRIES = 2  # Retry attempts per file across runs before it is marked FAILED
+DOWNLOAD_DAILY_LIMIT = None  # Optional cap on files downloaded per run (None = no cap)
+DRIVE_METADATA_PREFETCH = True  # Batch-fetch size/type/checksum through the Drive API when credentials.json exists
+
+# Streaming pipeline settings (run_cv_pipeline.py)
+PIPELINE_QUEUE_SIZE = 16  # Items buffered between two stages before the earlier stage waits
+PIPELINE_DOWNLOAD_WORKERS = 4  # Threads downloading CVs
+PIPELINE_EXTRACT_WORKERS = 2  # Threads extracting text (PDF parsing runs on a process pool)
+PIPELINE_ANALYSIS_WORKERS = 4  # Threads screening resumes with Gemini
 
 # Excel column names
 COLUMN_NAMES = {
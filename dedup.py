@@ -0,0 +1,223 @@
+"""
+Near-duplicate detection for re-submitted resumes (MinHash signatures and LSH buckets)
+"""
+
+import hashlib
+import logging
+import re
+import numpy as np
+from cache import normalize_text
+from config import DEDUP_SIMILARITY_THRESHOLD, DEDUP_NUM_PERM, DEDUP_LSH_BANDS, DEDUP_SHINGLE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Modulus of the MinHash permutations (a Mersenne prime, as in the usual a * x + b mod p family)
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+def normalize_email(email):
+    """Lowercase and trim an email address; None for empty values"""
+    if email is None:
+        return None
+    email = str(email).strip().lower()
+    return email or None
+
+def shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """Return the set of size-word shingles of a text, ignoring case, spacing and punctuation"""
+    words = re.findall(r"\w+", normalize_text(text))
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[start:start + size]) for start in range(len(words) - size + 1)}
+
+class DisjointSets:
+    """Union-find over hashable keys, used to merge pairs of duplicates into groups"""
+
+    def __init__(self):
+        self.parents = {}
+
+    def add(self, key):
+        self.parents.setdefault(key, key)
+
+    def find(self, key):
+        self.add(key)
+        while self.parents[key] != key:
+            # Path halving keeps the trees flat
+            self.parents[key] = self.parents[self.parents[key]]
+            key = self.parents[key]
+        return key
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parents[max(first, second)] = min(first, second)
+
+    def groups(self):
+        """Return the sets of two or more keys, each sorted, in order of their first key"""
+        groups = {}
+        for key in self.parents:
+            groups.setdefault(self.find(key), []).append(key)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda group: group[0])
+
+def group_by_keys(identities):
+    """
+    Group items that share any identity key
+
+    Args:
+        identities (dict): Item -> iterable of identity keys (email, file id, ...); None keys are ignored
+
+    Returns:
+        list: Groups of two or more items, each sorted
+    """
+    sets = DisjointSets()
+    owners = {}
+    for item, keys in identities.items():
+        sets.add(item)
+        for key in keys:
+            if key is not None:
+                sets.union(owners.setdefault(key, item), item)
+    return sets.groups()
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets.
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of the two sets, so resumes are compared through num_perm
+    integers instead of thousands of shingles.
+    """
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, seed=1):
+        """Draw the num_perm hash permutations"""
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        """Return the MinHash signature (uint64 array) of a set of shingles"""
+        if not shingle_set:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.sha1(shingle.encode("utf-8")).digest()[:4], "little") for shingle in shingle_set],
+            dtype=np.uint64
+        )
+        # uint64 overflow in a * x + b is intended; it only reshuffles the permutation
+        permuted = np.bitwise_and((np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME, MAX_HASH)
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(first, second):
+        """Estimated Jaccard similarity of the sets behind two signatures"""
+        return float(np.count_nonzero(first == second)) / len(first)
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures.
+
+    Signatures are cut into bands; two signatures that agree on a whole band
+    land in the same bucket and become candidate pairs, so only likely
+    duplicates are compared instead of every pair of resumes.
+    """
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, bands=DEDUP_LSH_BANDS):
+        """Initialize empty buckets"""
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = {}  # (band, band values) -> keys
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        """Index a signature and return the keys already sharing a bucket with it"""
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.setdefault(band_key, [])
+            candidates.update(bucket)
+            bucket.append(key)
+        return candidates
+
+class DuplicateDetector:
+    """
+    Groups candidates whose submissions belong to the same person.
+
+    Two candidates are duplicates when they used the same email in the form,
+    or when their resume texts are near-identical (estimated Jaccard similarity
+    of word shingles at or above the threshold) and do not list different
+    email addresses, so two people filling in the same template stay apart.
+    """
+
+    def __init__(self, threshold=DEDUP_SIMILARITY_THRESHOLD, num_perm=DEDUP_NUM_PERM, bands=DEDUP_LSH_BANDS,
+                 shingle_size=DEDUP_SHINGLE_SIZE):
+        """Initialize the detector with the similarity threshold and the MinHash/LSH parameters"""
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+    def find_groups(self, texts, emails=None):
+        """
+        Group duplicate candidates
+
+        Args:
+            texts (dict): Key -> resume text (keys missing here are grouped by email only)
+            emails (dict, optional): Key -> email given in the form
+
+        Returns:
+            list: Groups of two or more keys, each sorted, in order of their first key
+        """
+        sets = DisjointSets()
+
+        # Same form email
+        owners = {}
+        for key, email in (emails or {}).items():
+            email = normalize_email(email)
+            sets.add(key)
+            if email is not None:
+                sets.union(owners.setdefault(email, key), key)
+
+        # Near-identical resume text
+        index = LSHIndex(self.num_perm, self.bands)
+        signatures = {}
+        text_emails = {}
+        for key, text in texts.items():
+            sets.add(key)
+            shingle_set = shingles(text, self.shingle_size)
+            # Texts without words would all share the same empty signature
+            if not shingle_set:
+                continue
+            signatures[key] = self.hasher.signature(shingle_set)
+            text_emails[key] = {email.lower() for email in EMAIL_PATTERN.findall(text)}
+            for other in index.add(key, signatures[key]):
+                if text_emails[key] and text_emails[other] and not text_emails[key] & text_emails[other]:
+                    continue
+                if MinHasher.similarity(signatures[key], signatures[other]) >= self.threshold:
+                    sets.union(key, other)
+
+        return sets.groups()
+
+def representatives(groups):
+    """
+    Map every non-representative member of each group to its representative
+
+    The latest submission (highest key) represents the group, since people
+    re-submit the form to send an updated CV.
+    """
+    return {member: group[-1] for group in groups for member in group[:-1]}
+
+def log_clusters(groups, names=None, duplicates=None):
+    """Log a summary line and one line per duplicate group (representatives from duplicates, else the latest key)"""
+    if not groups:
+        logger.info("No duplicate submissions found")
+        return
+    logger.info(f"Found {len(groups)} groups of duplicate submissions covering {sum(len(group) for group in groups)} candidates")
+    for group in groups:
+        members = ", ".join(f"{key} ({names.get(key)})" if names else str(key) for key in group)
+        representative = next((duplicates[key] for key in group if key in (duplicates or {})), group[-1])
+        logger.info(f"Duplicate group represented by row {representative}: {members}")
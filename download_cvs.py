@@ -1,188 +1,244 @@
-import pandas as pd
-import gdown
+import logging
 import os
 import re
-import time
-import random
+from collections import namedtuple
 from urllib.parse import urlparse, parse_qs
+from config import DOWNLOAD_MAX_RETRIES, DOWNLOAD_DAILY_LIMIT, DRIVE_METADATA_PREFETCH, DEDUP_ENABLED
+from downloader import DriveDownloader
+from candidate_store import get_candidate_store, DUPLICATE_COLUMN
+from dedup import group_by_keys, normalize_email, representatives, log_clusters
+from metrics import get_metrics
+from sheet_io import iter_records
+from logging_setup import setup_logging, candidate_context, candidate_trace_id
+from utils import prefetch_drive_metadata
 
-# Create cvs directory if it doesn't exist
-if not os.path.exists('cvs'):
-    os.makedirs('cvs')
-
-# Check if there's an updated Excel file to continue from
-if os.path.exists('aplication_updated.xlsx'):
-    print("Found existing aplication_updated.xlsx. Continuing from where it stopped...")
-    df = pd.read_excel('aplication_updated.xlsx')
-    # Ensure required columns exist even in previously saved files
-    if 'PDF_Filename' not in df.columns:
-        df['PDF_Filename'] = None
-    if 'Download_Status' not in df.columns:
-        df['Download_Status'] = None
-    if 'Error_Message' not in df.columns:
-        df['Error_Message'] = None
-    if 'Retry_Count' not in df.columns:
-        df['Retry_Count'] = 0
-else:
-    # Start from the original file
-    print("Starting new download process...")
-    df = pd.read_excel('aplication.xlsx')
-    # Add a new column for the saved PDF filenames if it doesn't exist
-    if 'PDF_Filename' not in df.columns:
-        df['PDF_Filename'] = None
-    # Add a column for download status if it doesn't exist
-    if 'Download_Status' not in df.columns:
-        df['Download_Status'] = None
-    # Add a column for error messages if it doesn't exist
-    if 'Error_Message' not in df.columns:
-        df['Error_Message'] = None
-    # Add a column for retry count
-    if 'Retry_Count' not in df.columns:
-        df['Retry_Count'] = 0
-
-# Define max retries and delay settings
-MAX_RETRIES = 2  # Maximum number of retry attempts per file
-MIN_DELAY = 8    # Minimum delay between downloads in seconds
-MAX_DELAY = 19   # Maximum delay between downloads in seconds
-
-# Count how many are already downloaded
-already_downloaded = df['PDF_Filename'].notna().sum()
-failed_downloads = (df['Download_Status'] == 'FAILED').sum() if 'Download_Status' in df.columns else 0
-to_download = len(df) - already_downloaded - failed_downloads
-print(f"Already downloaded: {already_downloaded}")
-print(f"Failed downloads: {failed_downloads}")
-print(f"Remaining to download: {to_download}")
-
-# Add a daily limit to avoid excessive downloads
-daily_limit = 100  # Adjust this based on your needs
-today_downloads = 0
-
-# Process each row
-processed_count = 0
-for index, row in df.iterrows():
-    # Check if we've hit the daily download limit
-    if today_downloads >= daily_limit:
-        print(f"\nReached daily download limit of {daily_limit} files.")
-        print("Please run the script again tomorrow to continue downloads.")
-        break
-    
-    # Skip rows that already have PDF filenames (successful downloads)
-    if pd.notna(row['PDF_Filename']):
-        continue
-    
-    # Skip rows that are marked as failed downloads and have reached max retries
-    if pd.notna(row['Download_Status']) and row['Download_Status'] == 'FAILED' and row['Retry_Count'] >= MAX_RETRIES:
-        continue
-    
-    # Skip rows with missing curriculum links
-    if pd.isna(row['Adicione seu Currículo']):
-        continue
-    
-    # Get the URL from the cell
-    url = row['Adicione seu Currículo']
-    
-    # Extract the file_id from the Google Drive URL
-    if 'drive.google.com' in url:
-        # Parse the URL to extract the file ID
-        if 'open?id=' in url:
-            # For URLs like https://drive.google.com/open?id=FILE_ID
-            parsed_url = urlparse(url)
-            file_id = parse_qs(parsed_url.query).get('id', [None])[0]
-        elif '/file/d/' in url:
-            # For URLs like https://drive.google.com/file/d/FILE_ID/view
-            match = re.search(r'/file/d/([^/]+)', url)
-            file_id = match.group(1) if match else None
+logger = logging.getLogger(__name__)
+
+INPUT_PATH = 'aplication.xlsx'
+OUTPUT_PATH = 'aplication_updated.xlsx'
+CV_FOLDER = 'cvs'
+
+# Columns the downloader reads or writes; the rest of the form is copied over on export
+SHEET_COLUMNS = ['Nome Completo', 'Email', 'Adicione seu Currículo', 'PDF_Filename', 'Download_Status', 'Error_Message', 'Retry_Count', DUPLICATE_COLUMN]
+
+# Maximum number of retry attempts per file
+MAX_RETRIES = DOWNLOAD_MAX_RETRIES
+
+# One pending download
+DownloadJob = namedtuple('DownloadJob', ['index', 'file_id', 'pdf_filename', 'output_path', 'person_name', 'retry_count'])
+
+def load_sheet(store=None):
+    """
+    Load the download columns from the candidate store
+
+    An empty store is filled from aplication_updated.xlsx (to continue a run
+    started before the store existed) or else from aplication.xlsx.
+    """
+    store = store if store is not None else get_candidate_store()
+    imported = store.load(OUTPUT_PATH, INPUT_PATH)
+    if imported:
+        logger.info(f"Starting new download process with {imported} candidates from {store.source_path}...")
+    else:
+        logger.info(f"Found existing {store.path}. Continuing from where it stopped...")
+    df = store.frame(SHEET_COLUMNS)
+
+    # Retry counts start at 0 for candidates never attempted
+    df['Retry_Count'] = df['Retry_Count'].fillna(0)
+
+    return df, store
+
+def extract_drive_file_id(url):
+    """Extract the file ID from a Google Drive URL, or None"""
+    if 'drive.google.com' not in url:
+        return None
+    if 'open?id=' in url:
+        # For URLs like https://drive.google.com/open?id=FILE_ID
+        return parse_qs(urlparse(url).query).get('id', [None])[0]
+    if '/file/d/' in url:
+        # For URLs like https://drive.google.com/file/d/FILE_ID/view
+        match = re.search(r'/file/d/([^/]+)', url)
+        return match.group(1) if match else None
+    return None
+
+def mark_duplicate_submissions(df, store):
+    """
+    Download a CV submitted more than once a single time
+
+    Rows that share an email or a Drive file with a later submission are marked
+    as duplicates of the latest one, which alone is downloaded and screened;
+    its verdict is copied to them afterwards. Only rows without a CV yet are
+    (re)marked, and rows whose download was given up never represent a group.
+
+    Returns:
+        dict: Row index -> row index of its representative, for the rows marked
+    """
+    if not DEDUP_ENABLED:
+        return {}
+    fields = {'email': 'Email', 'link': 'Adicione seu Currículo', 'pdf_filename': 'PDF_Filename',
+              'status': 'Download_Status', 'retry_count': 'Retry_Count'}
+    identities = {}
+    waiting = []
+    for row in iter_records(df, fields):
+        if row.status == 'FAILED' and row.retry_count is not None and row.retry_count >= MAX_RETRIES:
+            continue
+        file_id = extract_drive_file_id(str(row.link)) if row.link is not None else None
+        email = normalize_email(row.email)
+        identities[row.index] = [f"email:{email}" if email else None, f"file:{file_id}" if file_id else None]
+        if row.pdf_filename is None:
+            waiting.append(row.index)
+
+    groups = group_by_keys(identities)
+    waiting_rows = set(waiting)
+    duplicates = {index: representative for index, representative in representatives(groups).items() if index in waiting_rows}
+    store.mark_duplicates(duplicates, waiting)
+    df.loc[waiting, DUPLICATE_COLUMN] = None
+    for index, representative in duplicates.items():
+        df.at[index, DUPLICATE_COLUMN] = representative
+    log_clusters([group for group in groups if any(index in duplicates for index in group)], df['Nome Completo'].to_dict())
+    return duplicates
+
+def build_jobs(df):
+    """Return the DownloadJobs for every row that still needs its CV"""
+    jobs = []
+    fields = {'name': 'Nome Completo', 'link': 'Adicione seu Currículo', 'pdf_filename': 'PDF_Filename',
+              'status': 'Download_Status', 'retry_count': 'Retry_Count', 'duplicate_of': DUPLICATE_COLUMN}
+    for row in iter_records(df, fields):
+        index = row.index
+
+        # Skip rows that already have PDF filenames (successful downloads)
+        if row.pdf_filename is not None:
+            continue
+
+        # Skip re-submissions; the latest submission of the same person is downloaded instead
+        if row.duplicate_of is not None:
+            continue
+
+        # Skip rows that are marked as failed downloads and have reached max retries
+        if row.status == 'FAILED' and row.retry_count is not None and row.retry_count >= MAX_RETRIES:
+            continue
+
+        # Skip rows with missing curriculum links
+        if row.link is None:
+            continue
+
+        file_id = extract_drive_file_id(str(row.link))
+        if not file_id:
+            continue
+
+        # Get the person's name, convert to string in case it's a number
+        person_name = str(row.name) if row.name is not None else f"unnamed_{index}"
+
+        # Create a filename using the sanitized name and index
+        sanitized_name = re.sub(r'[^\w\s]', '', person_name).replace(' ', '_').lower()
+        pdf_filename = f"{sanitized_name}_{index}.pdf"
+
+        # Get current retry count or initialize to 0
+        retry_count = int(row.retry_count) if row.retry_count is not None else 0
+
+        jobs.append(DownloadJob(index, file_id, pdf_filename, os.path.join(CV_FOLDER, pdf_filename), person_name, retry_count))
+    return jobs
+
+def record_download(df, store, job, error):
+    """Update the download columns of a row after an attempt and commit them to the store"""
+    if error is None:
+        # Update the dataframe with the filename
+        df.at[job.index, 'PDF_Filename'] = job.pdf_filename
+        df.at[job.index, 'Download_Status'] = 'SUCCESS'
+        df.at[job.index, 'Error_Message'] = None
+        logger.info(f"Successfully downloaded: {job.pdf_filename}")
+    else:
+        error_message = str(error)
+        logger.warning(f"Error downloading file for {job.person_name}: {error_message}")
+
+        # Increment retry count
+        retry_count = job.retry_count + 1
+        df.at[job.index, 'Retry_Count'] = retry_count
+
+        if retry_count > MAX_RETRIES or getattr(error, 'permanent', False):
+            # Mark as failed download if max retries reached or the file cannot be fetched at all
+            df.at[job.index, 'Download_Status'] = 'FAILED'
+            df.at[job.index, 'PDF_Filename'] = None
+            df.at[job.index, 'Error_Message'] = error_message
+            logger.warning(f"Failed to download file for {job.person_name} after {retry_count} attempts")
         else:
-            file_id = None
-        
-        if file_id:
-            # Get the person's name, convert to string in case it's a number
-            person_name = str(row['Nome Completo']) if pd.notna(row['Nome Completo']) else f"unnamed_{index}"
-            
-            # Create a filename using the sanitized name and index
-            sanitized_name = re.sub(r'[^\w\s]', '', person_name).replace(' ', '_').lower()
-            pdf_filename = f"{sanitized_name}_{index}.pdf"
-            output_path = os.path.join('cvs', pdf_filename)
-            
-            # Get current retry count or initialize to 0
-            retry_count = row['Retry_Count'] if pd.notna(row['Retry_Count']) else 0
-            
-            # Add a random delay between downloads to avoid rate limiting
-            delay = random.uniform(MIN_DELAY, MAX_DELAY)
-            print(f"Waiting {delay:.1f} seconds before next download...")
-            time.sleep(delay)
-            
-            try:
-                # Download the file
-                download_url = f'https://drive.google.com/uc?id={file_id}'
-                processed_count += 1
-                print(f"Downloading CV for {person_name} ({processed_count}/{to_download}) - Attempt {retry_count + 1}/{MAX_RETRIES + 1}...")
-                success = gdown.download(download_url, output_path, quiet=False)
-                
-                if success:
-                    # Update the dataframe with the filename
-                    df.at[index, 'PDF_Filename'] = pdf_filename
-                    df.at[index, 'Download_Status'] = 'SUCCESS'
-                    df.at[index, 'Error_Message'] = None
-                    print(f"Successfully downloaded: {pdf_filename}")
-                    today_downloads += 1
-                else:
-                    # Increment retry count
-                    retry_count += 1
-                    df.at[index, 'Retry_Count'] = retry_count
-                    
-                    if retry_count > MAX_RETRIES:
-                        # Mark as failed download if max retries reached
-                        df.at[index, 'Download_Status'] = 'FAILED'
-                        df.at[index, 'PDF_Filename'] = None
-                        df.at[index, 'Error_Message'] = "Download failed after multiple attempts - file might be inaccessible or requires permission"
-                        print(f"Failed to download file for {person_name} after {MAX_RETRIES + 1} attempts")
-                    else:
-                        df.at[index, 'Download_Status'] = 'RETRY'
-                        print(f"Failed attempt {retry_count}/{MAX_RETRIES + 1} for {person_name} - will retry later")
-                
-                # Save the Excel file after each download attempt
-                df.to_excel('aplication_updated.xlsx', index=False)
-                print("Progress saved to aplication_updated.xlsx")
-                
-            except Exception as e:
-                error_message = str(e)
-                print(f"Error downloading file for {person_name}: {error_message}")
-                
-                # Increment retry count
-                retry_count += 1
-                df.at[index, 'Retry_Count'] = retry_count
-                
-                if retry_count > MAX_RETRIES or "Cannot retrieve the public link" in error_message:
-                    # Mark as failed download if max retries reached or specific error
-                    df.at[index, 'Download_Status'] = 'FAILED'
-                    df.at[index, 'PDF_Filename'] = None
-                    df.at[index, 'Error_Message'] = error_message
-                    print(f"Failed to download file for {person_name} after {retry_count} attempts")
-                else:
-                    df.at[index, 'Download_Status'] = 'RETRY'
-                    df.at[index, 'Error_Message'] = error_message
-                    print(f"Failed attempt {retry_count}/{MAX_RETRIES + 1} for {person_name} - will retry later")
-                
-                # Save the Excel file after each error
-                df.to_excel('aplication_updated.xlsx', index=False)
-                print("Progress saved to aplication_updated.xlsx")
-
-# Make sure the final updated Excel file is saved
-df.to_excel('aplication_updated.xlsx', index=False)
-
-# Print summary statistics
-successful_downloads = df['PDF_Filename'].notna().sum()
-failed_downloads = (df['Download_Status'] == 'FAILED').sum() if 'Download_Status' in df.columns else 0
-retry_downloads = (df['Download_Status'] == 'RETRY').sum() if 'Download_Status' in df.columns else 0
-
-print("\nDownload process completed.")
-print(f"Total CVs successfully downloaded: {successful_downloads}")
-print(f"Total CVs failed to download: {failed_downloads}")
-print(f"Total CVs pending retry: {retry_downloads}")
-print(f"Total downloads today: {today_downloads}")
-
-if retry_downloads > 0:
-    print("\nThere are files pending retry. Run the script again tomorrow to attempt downloading these files.")
-
-print("Updated Excel file saved as 'aplication_updated.xlsx'") 
\ No newline at end of file
+            df.at[job.index, 'Download_Status'] = 'RETRY'
+            df.at[job.index, 'Error_Message'] = error_message
+            logger.warning(f"Failed attempt {retry_count}/{MAX_RETRIES + 1} for {job.person_name} - will retry later")
+
+    store.update(
+        job.index,
+        PDF_Filename=df.at[job.index, 'PDF_Filename'],
+        Download_Status=df.at[job.index, 'Download_Status'],
+        Error_Message=df.at[job.index, 'Error_Message'],
+        Retry_Count=df.at[job.index, 'Retry_Count']
+    )
+
+def prefetch_metadata(jobs):
+    """Resolve type, size and checksum of all pending files up front, if the Drive API is set up"""
+    if not DRIVE_METADATA_PREFETCH or not jobs or not os.path.exists('credentials.json'):
+        return None
+    try:
+        logger.info(f"Fetching Drive metadata for {len(jobs)} files...")
+        return prefetch_drive_metadata(job.file_id for job in jobs)
+    except Exception as e:
+        logger.warning(f"Could not prefetch Drive metadata ({str(e)}), downloading without it")
+        return None
+
+def main():
+    setup_logging()
+    
+    # Create cvs directory if it doesn't exist
+    if not os.path.exists(CV_FOLDER):
+        os.makedirs(CV_FOLDER)
+
+    df, store = load_sheet()
+
+    # Count how many are already downloaded
+    already_downloaded = df['PDF_Filename'].notna().sum()
+    failed_downloads = (df['Download_Status'] == 'FAILED').sum()
+    duplicates = mark_duplicate_submissions(df, store)
+    jobs = build_jobs(df)
+    logger.info(f"Already downloaded: {already_downloaded}")
+    logger.info(f"Failed downloads: {failed_downloads}")
+    logger.info(f"Duplicate submissions skipped: {len(duplicates)}")
+    logger.info(f"Remaining to download: {len(jobs)}")
+
+    # Optional cap on downloads per run
+    if DOWNLOAD_DAILY_LIMIT is not None and len(jobs) > DOWNLOAD_DAILY_LIMIT:
+        logger.info(f"Limiting this run to {DOWNLOAD_DAILY_LIMIT} files; run the script again to continue.")
+        jobs = jobs[:DOWNLOAD_DAILY_LIMIT]
+
+    metadata = prefetch_metadata(jobs)
+    downloader = DriveDownloader()
+    today_downloads = 0
+    processed_count = 0
+    for job, _, error in downloader.download_all(jobs, metadata):
+        processed_count += 1
+        with candidate_context(candidate_trace_id(job.index)):
+            logger.debug(f"Finished CV for {job.person_name} ({processed_count}/{len(jobs)}) - Attempt {job.retry_count + 1}/{MAX_RETRIES + 1}")
+            record_download(df, store, job, error)
+        if error is None:
+            today_downloads += 1
+
+    # Export the updated Excel file
+    store.export(OUTPUT_PATH)
+
+    # Print summary statistics
+    successful_downloads = df['PDF_Filename'].notna().sum()
+    failed_downloads = (df['Download_Status'] == 'FAILED').sum()
+    retry_downloads = (df['Download_Status'] == 'RETRY').sum()
+
+    logger.info("Download process completed.")
+    logger.info(f"Total CVs successfully downloaded: {successful_downloads}")
+    logger.info(f"Total CVs failed to download: {failed_downloads}")
+    logger.info(f"Total CVs pending retry: {retry_downloads}")
+    logger.info(f"Total downloads today: {today_downloads}")
+
+    if retry_downloads > 0:
+        logger.info("There are files pending retry. Run the script again to attempt downloading these files.")
+
+    get_metrics().report()
+    logger.info("Updated Excel file saved as 'aplication_updated.xlsx'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Parallel, resumable Google Drive downloader
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    DOWNLOAD_WORKERS, DOWNLOAD_TIMEOUT, DOWNLOAD_MIN_INTERVAL, DOWNLOAD_MAX_INTERVAL,
+    MAX_FILE_SIZE, ALLOWED_FILE_TYPES
+)
+from rate_limiter import retry_after_seconds
+from metrics import get_metrics
+
+# Drive serves public files from this host; confirm=t skips the virus-scan warning page
+DRIVE_DOWNLOAD_URL = "https://drive.usercontent.google.com/download"
+
+# Status codes Drive uses when it throttles a client
+THROTTLE_STATUS_CODES = {429, 503}
+
+def metadata_error_is_permanent(metadata):
+    """True when a Drive metadata error means the file is missing or not readable (404, permission 403)"""
+    status = metadata.get("status")
+    # Drive also answers 403 when a client exceeds its rate limit
+    return status == 404 or (status == 403 and "rate limit" not in str(metadata.get("error", "")).lower())
+
+CHUNK_SIZE = 256 * 1024
+
+def file_md5(path):
+    """Return the hex MD5 of a file, as reported by Drive's md5Checksum"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadError(Exception):
+    """Raised when a file cannot be downloaded"""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent  # True when retrying will not help (private file, not a PDF...)
+
+class AdaptiveRateController:
+    """
+    Per-host request pacing that only slows down when the host throttles us.
+
+    Each host starts at min_interval between requests. A throttled response
+    doubles the interval (or uses Retry-After), and every success shrinks it
+    again by a small step (AIMD), so we converge just below the host's limit.
+    """
+
+    def __init__(self, min_interval=DOWNLOAD_MIN_INTERVAL, max_interval=DOWNLOAD_MAX_INTERVAL):
+        """Initialize the controller with interval bounds in seconds"""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._interval = {}
+        self._next_slot = {}
+
+    def wait(self, host):
+        """Block until the next request slot for host"""
+        with self._lock:
+            now = time.monotonic()
+            interval = self._interval.setdefault(host, self.min_interval)
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_success(self, host):
+        """Additive decrease of the interval after a successful request"""
+        with self._lock:
+            interval = self._interval.get(host, self.min_interval)
+            self._interval[host] = max(self.min_interval, interval - self.min_interval / 2)
+
+    def on_throttle(self, host, retry_after=None):
+        """Multiplicative increase of the interval and a pause for the whole host"""
+        with self._lock:
+            interval = self._interval.get(host, self.min_interval)
+            interval = min(self.max_interval, max(interval * 2, self.min_interval))
+            self._interval[host] = interval
+            pause = retry_after if retry_after is not None else interval
+            self._next_slot[host] = max(self._next_slot.get(host, 0), time.monotonic() + pause)
+
+    def interval(self, host):
+        """Return the current interval for host"""
+        with self._lock:
+            return self._interval.get(host, self.min_interval)
+
+class DriveDownloader:
+    """
+    Downloads public Google Drive files on a bounded thread pool.
+
+    All workers share one keep-alive HTTP session. Bytes go to a .part file that
+    is resumed with an HTTP Range request after an interruption and atomically
+    renamed to the final path once complete.
+    """
+
+    def __init__(self, max_workers=DOWNLOAD_WORKERS, timeout=DOWNLOAD_TIMEOUT, rate_controller=None):
+        """Initialize the downloader with a shared session"""
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.rate_controller = rate_controller or AdaptiveRateController()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def download(self, file_id, output_path, max_attempts=3):
+        """
+        Download one Drive file to output_path
+
+        Throttled requests are retried after the rate controller's pause; other
+        errors raise DownloadError so the caller can record them.
+
+        Returns:
+            int: Size of the downloaded file in bytes
+        """
+        url = DRIVE_DOWNLOAD_URL
+        params = {"id": file_id, "export": "download", "confirm": "t"}
+        host = urlparse(url).netloc
+        part_path = output_path + ".part"
+
+        for attempt in range(max_attempts):
+            self.rate_controller.wait(host)
+
+            # Resume a partial download left by a previous attempt or run
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+            try:
+                response = self.session.get(url, params=params, headers=headers, stream=True, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if attempt == max_attempts - 1:
+                    raise DownloadError(f"Connection error: {str(e)}")
+                continue
+
+            with response:
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    get_metrics().increment("retries", call="drive_download", reason="rate_limit")
+                    self.rate_controller.on_throttle(host, retry_after_seconds(requests.HTTPError(response=response)))
+                    if attempt == max_attempts - 1:
+                        raise DownloadError(f"Throttled by Google Drive (HTTP {response.status_code})")
+                    continue
+
+                if response.status_code == 416:
+                    # The .part file is already complete (or corrupt); start over
+                    os.remove(part_path)
+                    continue
+
+                if response.status_code not in (200, 206):
+                    raise DownloadError(
+                        f"HTTP {response.status_code} downloading file",
+                        permanent=response.status_code in (403, 404)
+                    )
+
+                if "text/html" in response.headers.get("Content-Type", ""):
+                    # Drive answers with an HTML page for private or deleted files
+                    raise DownloadError(
+                        "Cannot retrieve the public link of the file. You may need to change the permission to "
+                        "'Anyone with the link'.",
+                        permanent=True
+                    )
+
+                # 200 means the server ignored our Range header: start from scratch
+                mode = "ab" if response.status_code == 206 else "wb"
+                size = self._write_body(response, part_path, mode)
+
+            self.rate_controller.on_success(host)
+            os.replace(part_path, output_path)
+            return size
+
+        raise DownloadError("Download failed after repeated attempts")
+
+    def _write_body(self, response, part_path, mode):
+        """Stream the response body to the .part file and fsync it"""
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    if f.tell() > MAX_FILE_SIZE:
+                        f.close()
+                        os.remove(part_path)
+                        raise DownloadError(f"File too large (over {MAX_FILE_SIZE} bytes)", permanent=True)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def download_checked(self, file_id, output_path, metadata=None):
+        """
+        Download one file, using prefetched Drive metadata to avoid useless transfers
+
+        Files that are missing, too large or not documents fail before any byte is
+        fetched; a local copy whose MD5 matches Drive is kept as is. Other metadata
+        errors (throttling, server errors) fall back to the plain public download.
+        """
+        if metadata is not None and "error" in metadata:
+            if metadata_error_is_permanent(metadata):
+                raise DownloadError(f"Cannot read file metadata: {metadata['error']}", permanent=True)
+            get_metrics().increment("metadata_fallbacks")
+            metadata = None
+
+        if metadata is None:
+            with get_metrics().timer("download"):
+                return self.download(file_id, output_path)
+
+        if int(metadata.get("size", 0)) > MAX_FILE_SIZE:
+            raise DownloadError(f"File too large ({metadata['size']} bytes)", permanent=True)
+        mime_type = metadata.get("mimeType", "")
+        if mime_type and mime_type not in ALLOWED_FILE_TYPES:
+            raise DownloadError(f"Unsupported file type: {mime_type}", permanent=True)
+
+        expected_md5 = metadata.get("md5Checksum")
+        if expected_md5 and os.path.exists(output_path) and file_md5(output_path) == expected_md5:
+            # Unchanged since the last download
+            return os.path.getsize(output_path)
+
+        with get_metrics().timer("download"):
+            size = self.download(file_id, output_path)
+        if expected_md5 and file_md5(output_path) != expected_md5:
+            os.remove(output_path)
+            raise DownloadError("Downloaded file does not match the Drive checksum")
+        return size
+
+    def download_all(self, jobs, metadata=None):
+        """
+        Download many files concurrently
+
+        Args:
+            jobs (iterable): Items with file_id and output_path attributes
+            metadata (dict, optional): file_id -> Drive metadata from utils.prefetch_drive_metadata
+
+        Yields:
+            tuple: (job, size, error) as each download finishes; error is None on success
+        """
+        metadata = metadata or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.download_checked, job.file_id, job.output_path, metadata.get(job.file_id)): job
+                for job in jobs
+            }
+            try:
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        yield job, future.result(), None
+                    except Exception as e:
+                        yield job, None, e
+            finally:
+                for future in futures:
+                    future.cancel()
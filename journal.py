@@ -0,0 +1,114 @@
+"""
+Append-only results journal for per-candidate updates
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from metrics import get_metrics
+from sheet_io import write_sheet
+
+def journal_path_for(excel_path):
+    """Return the journal file that belongs to an Excel file"""
+    root, _ = os.path.splitext(excel_path)
+    return f"{root}.journal.jsonl"
+
+def write_excel_atomic(df, excel_path, source_path=None):
+    """Write a dataframe to Excel through a temporary file, so a crash never leaves a broken workbook"""
+    root, ext = os.path.splitext(excel_path)
+    tmp_path = f"{root}.tmp{ext}"
+    write_sheet(df, tmp_path, source_path)
+    os.replace(tmp_path, excel_path)
+
+def _to_json_value(value):
+    """Convert numpy/pandas scalars and NaN to plain JSON values"""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+class ResultsJournal:
+    """
+    Append-only JSONL journal of per-candidate updates.
+
+    Every update is one fsync'd line, so recording a result costs the same no
+    matter how many rows the sheet has. The Excel file is only rewritten at
+    checkpoints (compact), after which the journal is truncated. On startup
+    the journal is replayed on top of the last saved workbook.
+
+    When the dataframe holds only some columns of the sheet, source_path is
+    the workbook it was read from; the other columns are copied from there.
+    """
+
+    def __init__(self, path, source_path=None):
+        """Open (and create if needed) the journal file"""
+        self.path = path
+        self.source_path = source_path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self.pending = 0  # Updates not yet compacted into the Excel file
+
+    def append(self, index, **fields):
+        """Durably record new values for the row at index"""
+        entry = {
+            "index": _to_json_value(index),
+            "fields": {column: _to_json_value(value) for column, value in fields.items()},
+            "ts": time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, get_metrics().timer("sheet_write", op="journal"):
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending += 1
+
+    def replay(self):
+        """
+        Read the journal and return {index: {column: value}} with the latest value per cell
+
+        A torn last line (crash in the middle of a write) is ignored.
+        """
+        updates = {}
+        if not os.path.exists(self.path):
+            return updates
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                updates.setdefault(entry["index"], {}).update(entry["fields"])
+        return updates
+
+    def apply(self, df):
+        """Replay the journal onto a dataframe and return the number of rows updated"""
+        updates = self.replay()
+        for index, fields in updates.items():
+            for column, value in fields.items():
+                if column not in df.columns:
+                    df[column] = None
+                df.at[index, column] = value
+        with self._lock:
+            self.pending = len(updates)
+        return len(updates)
+
+    def compact(self, df, excel_path):
+        """Write the dataframe to Excel atomically, then truncate the journal"""
+        with self._lock, get_metrics().timer("sheet_write", op="compact"):
+            write_excel_atomic(df, excel_path, self.source_path)
+            if self.source_path is not None:
+                # The written workbook now holds every column
+                self.source_path = excel_path
+            self._file.truncate(0)
+            self._file.seek(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending = 0
+
+    def close(self):
+        """Close the journal file"""
+        with self._lock:
+            self._file.close()
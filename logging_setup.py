@@ -0,0 +1,92 @@
+"""
+Queue-based logging with per-candidate trace IDs
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+from config import LOG_LEVEL, LOG_FILE, LOG_FILE_FORMAT
+
+# Trace ID of the candidate being handled by the current thread or task
+current_candidate = contextvars.ContextVar("current_candidate", default="-")
+
+CONSOLE_FORMAT = "%(asctime)s %(levelname)-7s [%(candidate)s] %(message)s"
+FILE_FORMAT = "%(asctime)s %(levelname)-7s [%(candidate)s] %(threadName)s %(name)s: %(message)s"
+
+_listener = None
+
+def candidate_trace_id(index):
+    """Return the trace ID used for the candidate at a sheet row index"""
+    return f"cand-{index}"
+
+@contextmanager
+def candidate_context(trace_id):
+    """Tag every log record emitted inside the block with trace_id"""
+    token = current_candidate.set(str(trace_id))
+    try:
+        yield
+    finally:
+        current_candidate.reset(token)
+
+class CandidateFilter(logging.Filter):
+    """Adds the current candidate trace ID to each record, in the thread that logged it"""
+
+    def filter(self, record):
+        record.candidate = current_candidate.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log files that are searched or shipped elsewhere"""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "candidate": getattr(record, "candidate", "-"),
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging(level=LOG_LEVEL, log_file=LOG_FILE, file_format=LOG_FILE_FORMAT):
+    """
+    Route all logging through a queue drained by a background thread
+
+    Callers only put records on an in-memory queue, so a slow terminal or disk
+    never blocks screening threads. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT, "%H:%M:%S"))
+    handlers = [console]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if file_format == "json" else logging.Formatter(FILE_FORMAT))
+        handlers.append(file_handler)
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(CandidateFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # Third-party clients are chatty at INFO
+    for name in ("googleapiclient", "urllib3", "google_auth_oauthlib"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Drain the queue before the interpreter exits
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,180 @@
+"""
+Lightweight timers and counters for the screening pipeline
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config import METRICS_ENABLED, METRICS_PROMETHEUS_PATH, METRICS_TRACE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Prefix of every exported metric name
+PREFIX = "cv_screening"
+
+def _label_key(labels):
+    """Turn a labels dict into a hashable, ordered key"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key, extra=()):
+    """Format a label key as Prometheus {name="value",...}"""
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class Timing:
+    """Aggregated durations of one timer and label set"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for position, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[position] += 1
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters and timers.
+
+    Timers keep only aggregates (count, sum, max, histogram buckets), so
+    recording stays cheap on hot paths. When a trace path is set, every
+    observation is also appended to a JSONL trace for offline analysis.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, trace_path=METRICS_TRACE_PATH):
+        """Initialize an empty registry"""
+        self.enabled = enabled
+        self.counters = {}  # (name, label key) -> value
+        self.timings = {}  # (name, label key) -> Timing
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, "a", encoding="utf-8") if enabled and trace_path else None
+
+    def increment(self, name, value=1, **labels):
+        """Add value to a counter"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self._write_trace("counter", name, labels, value=value)
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration for a timer"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = Timing()
+            timing.add(seconds)
+            self._write_trace("timer", name, labels, seconds=seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the enclosed block; failures are recorded with status="error" """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, status=status, **labels)
+
+    def _write_trace(self, kind, name, labels, **values):
+        """Append one event to the JSONL trace (called with the lock held)"""
+        if self._trace is None:
+            return
+        event = {"ts": time.time(), "kind": kind, "name": name, "labels": labels, **values}
+        self._trace.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+    def prometheus_text(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                for (metric, key), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{PREFIX}_{name}_total{_format_labels(key)} {value}")
+            for name in sorted({name for name, _ in self.timings}):
+                lines.append(f"# TYPE {PREFIX}_{name}_seconds histogram")
+                for (metric, key), timing in sorted(self.timings.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(BUCKETS, timing.buckets):
+                        lines.append(f"{PREFIX}_{name}_seconds_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{PREFIX}_{name}_seconds_bucket{_format_labels(key, [('le', '+Inf')])} {timing.count}")
+                    lines.append(f"{PREFIX}_{name}_seconds_sum{_format_labels(key)} {timing.total:.6f}")
+                    lines.append(f"{PREFIX}_{name}_seconds_count{_format_labels(key)} {timing.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_PROMETHEUS_PATH):
+        """Write the Prometheus text file atomically (for node_exporter's textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def summary_table(self):
+        """Return a table of timers sorted by total time, followed by the counters"""
+        with self._lock:
+            timings = sorted(self.timings.items(), key=lambda item: item[1].total, reverse=True)
+            counters = sorted(self.counters.items())
+        wall = time.time() - self.started
+
+        lines = [f"{'timer':<48} {'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'% wall':>7}"]
+        for (name, key), timing in timings:
+            label = name + _format_labels(key).replace('"', "")
+            mean = timing.total / timing.count if timing.count else 0.0
+            lines.append(
+                f"{label[:48]:<48} {timing.count:>7} {timing.total:>9.1f} {mean * 1000:>9.1f} "
+                f"{timing.max * 1000:>9.1f} {timing.total / wall if wall else 0.0:>7.0%}"
+            )
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<48} {'value':>7}")
+            for (name, key), value in counters:
+                label = name + _format_labels(key).replace('"', "")
+                lines.append(f"{label[:48]:<48} {value:>7}")
+        return "\n".join(lines)
+
+    def report(self):
+        """Print the summary table and write the configured exports"""
+        if not self.enabled or not (self.timings or self.counters):
+            return
+        logger.info("Timing summary (timers overlap when work runs concurrently):\n" + self.summary_table())
+        if METRICS_PROMETHEUS_PATH:
+            self.write_prometheus(METRICS_PROMETHEUS_PATH)
+            logger.info(f"Metrics written to {METRICS_PROMETHEUS_PATH}")
+        if self._trace is not None:
+            with self._lock:
+                self._trace.flush()
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Return the process-wide metrics registry"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
@@ -0,0 +1,219 @@
+"""
+Interchangeable PDF text extraction backends with a quality-driven fallback
+"""
+
+import importlib.util
+import logging
+import re
+import unicodedata
+from io import BytesIO, StringIO
+from config import PDF_BACKENDS, PDF_MIN_TEXT_QUALITY, PDF_MAX_PAGES, SCANNED_MIN_CHARS_PER_PAGE, SCANNED_MIN_IMAGE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# Glyphs without a Unicode mapping, as pdfminer prints them
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+
+# Tokens this long are words glued together by a bad layout analysis
+GLUED_WORD_LENGTH = 30
+
+def _pypdfium2_pages(content, max_pages):
+    """PDFium (C++), by far the fastest; needs the pypdfium2 package"""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(content)
+    try:
+        pages = []
+        for position in range(min(len(pdf), max_pages) if max_pages else len(pdf)):
+            page = pdf[position]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+def _pypdf2_pages(content, max_pages, pdf_reader=None):
+    """PyPDF2 (pure Python), always installed"""
+    from PyPDF2 import PdfReader
+    pdf_reader = pdf_reader or PdfReader(BytesIO(content))
+    pages = pdf_reader.pages[:max_pages] if max_pages else pdf_reader.pages
+    # Pages without a text layer return None
+    return [page.extract_text() or "" for page in pages]
+
+def _pdfminer_pages(content, max_pages):
+    """pdfminer / pdfminer.six (pure Python), slow but with the most careful layout analysis"""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.pdfpage import PDFPage
+    resources = PDFResourceManager()
+    pages = []
+    for page in PDFPage.get_pages(BytesIO(content), maxpages=max_pages or 0):
+        output = StringIO()
+        device = TextConverter(resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(resources, device).process_page(page)
+        finally:
+            device.close()
+        pages.append(output.getvalue())
+    return pages
+
+# Backend name -> (module it needs, function returning the text of each page)
+BACKENDS = {
+    "pypdfium2": ("pypdfium2", _pypdfium2_pages),
+    "pypdf2": ("PyPDF2", _pypdf2_pages),
+    "pdfminer": ("pdfminer", _pdfminer_pages)
+}
+
+def available_backends(names=None):
+    """Return the backends of names (all by default) whose package is installed, in order"""
+    names = list(BACKENDS) if names is None else names
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown PDF backends: {', '.join(unknown)} (choose from {', '.join(BACKENDS)})")
+    return [name for name in names if importlib.util.find_spec(BACKENDS[name][0]) is not None]
+
+def extract_pages(content, backend, max_pages=PDF_MAX_PAGES, pdf_reader=None):
+    """Extract the text of the first max_pages pages of a PDF with one backend (pypdf2 reuses pdf_reader when given)"""
+    if backend == "pypdf2" and pdf_reader is not None:
+        return _pypdf2_pages(content, max_pages, pdf_reader)
+    return BACKENDS[backend][1](content, max_pages)
+
+def text_quality(text):
+    """
+    Score from 0 to 1 how much extracted page text looks like real text
+
+    Empty pages score 0. The share of letters is expected to be at least one
+    half (resumes also hold dates, phones and emails); replacement characters,
+    unmapped glyphs "(cid:N)", control characters and words glued together
+    count against the score.
+    """
+    text = text.strip()
+    if not text:
+        return 0.0
+    letters = sum(char.isalpha() for char in text)
+    garbage = text.count("\ufffd") + sum(len(match) for match in CID_PATTERN.findall(text))
+    garbage += sum(1 for char in text if unicodedata.category(char) in ("Cc", "Co", "Cn") and char not in "\n\r\t")
+    garbage += sum(len(word) for word in text.split() if len(word) >= GLUED_WORD_LENGTH)
+    return max(0.0, min(1.0, letters / len(text) / 0.5) * (1 - garbage / len(text)))
+
+def extract_pdf_pages(content, max_pages=PDF_MAX_PAGES, backends=PDF_BACKENDS, min_quality=PDF_MIN_TEXT_QUALITY, pdf_reader=None):
+    """
+    Extract the pages of a PDF with the first available backend, falling back page by page
+
+    Pages whose text scores below min_quality (empty, garbled, glued words)
+    are extracted again with the next backend, and its text replaces theirs
+    when it scores higher. A backend that fails on the file is skipped.
+    pdf_reader is a PyPDF2 PdfReader of content the pypdf2 backend can reuse.
+
+    Returns:
+        list: Text of each page
+
+    Raises:
+        Exception: The last backend error, when every backend failed
+    """
+    pages = None
+    qualities = []
+    last_error = None
+    for backend in available_backends(backends):
+        try:
+            extracted = extract_pages(content, backend, max_pages, pdf_reader)
+        except Exception as e:
+            logger.debug(f"PDF backend {backend} failed: {str(e) or type(e).__name__}")
+            last_error = e
+            continue
+
+        if pages is None:
+            pages, qualities = extracted, [text_quality(text) for text in extracted]
+        else:
+            for position, text in enumerate(extracted[:len(pages)]):
+                if qualities[position] < min_quality:
+                    quality = text_quality(text)
+                    if quality > qualities[position]:
+                        logger.debug(f"Page {position + 1} taken from PDF backend {backend}")
+                        pages[position], qualities[position] = text, quality
+
+        # Fast path: stop as soon as every page reads well
+        if all(quality >= min_quality for quality in qualities):
+            break
+
+    if pages is None:
+        if last_error is None:
+            raise RuntimeError(f"None of the PDF backends {', '.join(backends)} is installed")
+        raise last_error
+    return pages
+
+def _draws_image(resources, depth=0):
+    """True if page (or form) resources hold an image XObject, directly or inside a form XObject"""
+    if resources is None:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Image":
+            return True
+        # Scanners often wrap the page image in a form; a few levels are enough
+        if xobject.get("/Subtype") == "/Form" and depth < 3 and _draws_image(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+def scan_profile(content, text, max_pages=PDF_MAX_PAGES, pdf_reader=None):
+    """
+    Measure how much of a PDF is text and how much is images
+
+    Only the page tree and resources are read (no content stream is decoded),
+    so this costs far less than an extraction.
+
+    Args:
+        content (bytes): The PDF file
+        text (str): Text already extracted from its first max_pages pages
+        pdf_reader (PdfReader, optional): PyPDF2 reader of content that already parsed it
+
+    Returns:
+        dict: pages, chars_per_page (of the extracted text) and image_ratio
+            (share of the pages that show an embedded image)
+    """
+    from PyPDF2 import PdfReader
+    pdf_reader = pdf_reader or PdfReader(BytesIO(content))
+    pages = pdf_reader.pages[:max_pages] if max_pages else pdf_reader.pages
+    count = max(1, len(pages))
+    with_images = sum(1 for page in pages if _draws_image(page.get("/Resources")))
+    return {
+        "pages": len(pages),
+        "chars_per_page": len("".join(text.split())) / count,
+        "image_ratio": with_images / count
+    }
+
+def may_be_scanned(text, max_pages=PDF_MAX_PAGES):
+    """True unless the extracted text alone is long enough to rule out a scan"""
+    return len("".join(text.split())) < SCANNED_MIN_CHARS_PER_PAGE * max_pages
+
+def read_pdf(content, max_pages=PDF_MAX_PAGES):
+    """
+    Extract the text of a PDF and, when it may be a scan, its scan profile, parsing the file once
+
+    Returns:
+        tuple: (text, profile) where profile is None for files with plenty of text
+    """
+    from PyPDF2 import PdfReader
+    try:
+        pdf_reader = PdfReader(BytesIO(content))
+    except Exception:
+        # Another backend may still read it
+        pdf_reader = None
+    # A newline keeps words of adjacent pages apart
+    text = "\n".join(extract_pdf_pages(content, max_pages, pdf_reader=pdf_reader))
+    if pdf_reader is None or not may_be_scanned(text, max_pages):
+        return text, None
+    try:
+        return text, scan_profile(content, text, max_pages, pdf_reader)
+    except Exception as e:
+        logger.debug(f"Could not inspect the PDF for scanned pages: {str(e) or type(e).__name__}")
+        return text, None
+
+def is_scanned(profile, min_chars=SCANNED_MIN_CHARS_PER_PAGE, min_image_ratio=SCANNED_MIN_IMAGE_RATIO):
+    """True for a scan: too little text per page to screen, and pages made of images"""
+    return profile["chars_per_page"] < min_chars and profile["image_ratio"] >= min_image_ratio
@@ -0,0 +1,147 @@
+"""
+In-process staged pipeline with bounded queues between stages
+"""
+
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from config import PIPELINE_QUEUE_SIZE
+from logging_setup import candidate_context
+
+# Marks the end of the stream on a stage's input queue
+_DONE = object()
+
+class Stage:
+    """One pipeline stage: a function applied to every item by a pool of worker threads"""
+
+    def __init__(self, name, func, workers=1):
+        """Initialize the stage; func(item) returns the item to forward, or None to drop it"""
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Add one processed item to the stage statistics"""
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages, each with its own worker threads.
+
+    Stages are connected by bounded queues, so a slow stage applies backpressure
+    to the ones before it instead of letting work pile up in memory. Every item
+    moves on as soon as its current stage is done with it, so the wall time is
+    close to that of the slowest stage rather than the sum of all of them.
+    Finished items are handed to on_output in the calling thread.
+    """
+
+    def __init__(self, queue_size=PIPELINE_QUEUE_SIZE, on_error=None, trace_id=None):
+        """
+        Initialize an empty pipeline
+
+        Args:
+            queue_size (int): Capacity of each queue between stages
+            on_error (callable, optional): on_error(stage_name, item, exception) returns the item
+                to forward after a stage raised, or None to drop it
+            trace_id (callable, optional): trace_id(item) returns the ID that tags log records
+                emitted while the item is processed or handed to on_output
+        """
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.trace_id = trace_id
+        self.stages = []
+
+    def add_stage(self, name, func, workers=1):
+        """Append a stage and return the pipeline for chaining"""
+        self.stages.append(Stage(name, func, workers))
+        return self
+
+    def run(self, items, on_output):
+        """Feed items through every stage and call on_output(item) for each finished item"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+
+        for position, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            remaining_lock = threading.Lock()
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[position], queues[position + 1], remaining, remaining_lock),
+                    name=f"{stage.name}-{worker}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        # Feed from a separate thread so backpressure never blocks output handling
+        feeder = threading.Thread(target=self._feed, args=(items, queues[0], self.stages[0].workers), daemon=True)
+        feeder.start()
+
+        output = queues[-1]
+        while True:
+            item = output.get()
+            if item is _DONE:
+                break
+            with self._context(item):
+                on_output(item)
+
+        feeder.join()
+        for thread in threads:
+            thread.join()
+
+    def _feed(self, items, first_queue, workers):
+        """Put every input item on the first queue, then one end marker per worker"""
+        for item in items:
+            first_queue.put(item)
+        for _ in range(workers):
+            first_queue.put(_DONE)
+
+    def _work(self, stage, in_queue, out_queue, remaining, remaining_lock):
+        """Worker loop: process items until the end marker, then close the next queue"""
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            with self._context(item):
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    result = self.on_error(stage.name, item, e) if self.on_error else None
+            stage.record(time.perf_counter() - start)
+            if result is not None:
+                out_queue.put(result)
+
+        # The last worker of a stage tells the next stage (or the output) that the stream ended
+        with remaining_lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            next_workers = self._next_workers(stage)
+            for _ in range(next_workers):
+                out_queue.put(_DONE)
+
+    def _context(self, item):
+        """Return the logging context of an item"""
+        return candidate_context(self.trace_id(item)) if self.trace_id else nullcontext()
+
+    def _next_workers(self, stage):
+        """Number of end markers the queue after stage needs (1 for the output queue)"""
+        position = self.stages.index(stage)
+        if position + 1 < len(self.stages):
+            return self.stages[position + 1].workers
+        return 1
+
+    def summary(self):
+        """Return per-stage item counts and busy time"""
+        return [
+            {"stage": stage.name, "workers": stage.workers, "processed": stage.processed, "busy_seconds": stage.busy_seconds}
+            for stage in self.stages
+        ]
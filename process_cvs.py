@@ -1,37 +1,148 @@
-import pandas as pd
+import logging
 import os
 import sys
 from agent_chain import AgentPDFProcessor
+from batch_mode import BatchScreeningRunner, BatchError
+from candidate_store import get_candidate_store
+from config import INCREMENTAL_RESCREENING
+from rate_limiter import get_rate_limiter
+from metrics import get_metrics
+from sheet_io import iter_records
+from download_cvs import SHEET_COLUMNS as DOWNLOAD_COLUMNS
+from logging_setup import setup_logging, candidate_context, candidate_trace_id
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_PATH = 'aplication_processed.xlsx'
+INPUT_PATH = 'aplication_updated.xlsx'
+
+# Columns the processor reads or writes; the rest of the form is copied over on export
+SHEET_COLUMNS = DOWNLOAD_COLUMNS + ['Processed_Result']
+
+# Record attributes used when iterating over pending rows
+CANDIDATE_FIELDS = {'name': 'Nome Completo', 'email': 'Email', 'pdf_filename': 'PDF_Filename'}
+
+def record_result(df, store, index, result, stages=None, outdated=False):
+    """
+    Store a processing result in the dataframe and commit it to the candidate store
+    
+    stages are the screening stages behind a verdict; an error while screening
+    an outdated verdict again leaves that verdict in place.
+    """
+    if outdated and result.lower().startswith('error'):
+        logger.warning(f"Screening again failed ({result}), keeping the previous result")
+        return
+    df.at[index, 'Processed_Result'] = result
+    store.update(index, Processed_Result=result)
+    if stages is not None and not result.lower().startswith('error'):
+        store.record_stages('Processed_Result', index, stages)
+
+def outdated_results(store, analysis_agent):
+    """Rows whose result came from criteria, prompts or a model that changed since; index -> recorded stages"""
+    if not INCREMENTAL_RESCREENING:
+        return {}
+    previous = store.outdated('Processed_Result', lambda stages: bool(analysis_agent.outdated_stages(stages)))
+    if previous:
+        logger.info(f"Screening {len(previous)} CVs again: their result used criteria, prompts or a model "
+              f"that changed since (unchanged stages are reused)")
+    return previous
+
+def propagate_results(df, store):
+    """Copy each representative's result to its duplicate submissions"""
+    copied = store.propagate_duplicates('Processed_Result')
+    for index, result in copied.items():
+        df.at[index, 'Processed_Result'] = result
+    if copied:
+        logger.info(f"Copied results to {len(copied)} duplicate submissions")
+    return copied
+
+def load_sheet(store=None):
+    """
+    Load the processing columns from the candidate store
+    
+    An empty store is filled from aplication_processed.xlsx (to continue a run
+    started before the store existed) or else from aplication_updated.xlsx.
+    """
+    store = store if store is not None else get_candidate_store()
+    imported = store.load(OUTPUT_PATH, INPUT_PATH)
+    if imported:
+        logger.info(f"Starting new processing with {imported} candidates from {store.source_path}...")
+    else:
+        logger.info(f"Found existing {store.path}. Continuing from where it stopped...")
+    return store.frame(SHEET_COLUMNS), store
+
+def run_batch(df, store, agent):
+    """
+    Screen every pending CV with one Gemini batch job instead of request by request
+    
+    Trades latency (the job may take hours) for throughput and lower cost.
+    If the job fails, its candidates stay pending for the per-candidate loop.
+    """
+    paths = {}
+    for row in iter_records(df.loc[store.pending('Processed_Result')], CANDIDATE_FIELDS):
+        pdf_path = os.path.join('cvs', row.pdf_filename)
+        if not os.path.exists(pdf_path):
+            logger.warning(f"PDF file not found for {row.name}: {pdf_path}")
+            record_result(df, store, row.index, "ERROR: PDF file not found")
+            continue
+        paths[pdf_path] = row.index
+    
+    logger.info(f"Extracting {len(paths)} resumes...")
+    resumes = {}
+    scanned = 0
+    for pdf_path, text in agent.extraction_agent.extract_texts_from_local_files(list(paths)):
+        if text.startswith("Error"):
+            record_result(df, store, paths[pdf_path], f"ERROR: {text}")
+        elif agent.analysis_agent.scanned_agent is not None and agent.extraction_agent.read_scanned_pdf(pdf_path, text) is not None:
+            # The batch job only takes text prompts; scans stay pending and are screened one by one below
+            scanned += 1
+        else:
+            resumes[paths[pdf_path]] = text
+    if scanned:
+        logger.info(f"{scanned} scanned CVs left out of the batch job, they are screened with the PDF attached")
+    
+    stages = {}
+    try:
+        results = BatchScreeningRunner(agent.analysis_agent).run(resumes, stages)
+    except BatchError as e:
+        # Nothing was recorded for these candidates, so the loop in main screens them one by one
+        logger.error(f"Batch job failed: {str(e)}")
+        logger.info(f"Screening the {len(resumes)} remaining candidates one by one instead")
+        return
+    for index in sorted(results):
+        # With their stages, verdicts are screened again once criteria, prompts or the model change
+        record_result(df, store, index, results[index], stages=stages[index])
+    logger.info(f"Batch results merged for {len(results)} candidates")
+    unanswered = len(resumes) - len(results)
+    if unanswered:
+        logger.info(f"The batch job left {unanswered} candidates without an answer, they are screened one by one")
 
 def main():
-    # Check if the updated Excel file exists
-    if not os.path.exists('aplication_updated.xlsx'):
-        print("Error: aplication_updated.xlsx not found.")
-        print("Please run download_cvs.py first to download PDFs and create the updated Excel file.")
-        sys.exit(1)
+    setup_logging()
     
     # Check if the cvs directory exists
     if not os.path.exists('cvs'):
-        print("Error: cvs directory not found.")
-        print("Please run download_cvs.py first to download PDFs.")
+        logger.error("cvs directory not found.")
+        logger.info("Please run download_cvs.py first to download PDFs.")
         sys.exit(1)
     
-    # Check if there's an already processed file to continue from
-    if os.path.exists('aplication_processed.xlsx'):
-        print("Found existing aplication_processed.xlsx. Continuing from where it stopped...")
-        df = pd.read_excel('aplication_processed.xlsx')
-    else:
-        # Start from the updated file (after downloads)
-        print("Starting new processing...")
-        df = pd.read_excel('aplication_updated.xlsx')
-        # Create a new column for processed results if it doesn't exist
-        if 'Processed_Result' not in df.columns:
-            df['Processed_Result'] = None
+    try:
+        df, store = load_sheet()
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        logger.info("Please run download_cvs.py first to download PDFs.")
+        sys.exit(1)
+    
+    if "--retry-errors" in sys.argv:
+        errors = store.errors('Processed_Result')
+        store.clear('Processed_Result', errors)
+        df.loc[errors, 'Processed_Result'] = None
+        logger.info(f"Screening {len(errors)} candidates with errors again")
     
     # Count valid PDF filenames - only those that were successfully downloaded
     valid_pdfs = df['PDF_Filename'].notna().sum()
     if valid_pdfs == 0:
-        print("No PDF files were downloaded successfully. Please run download_cvs.py first.")
+        logger.error("No PDF files were downloaded successfully. Please run download_cvs.py first.")
         sys.exit(1)
     
     # Count failed downloads
@@ -41,71 +152,81 @@ def main():
     already_processed = df['Processed_Result'].notna().sum()
     remaining_to_process = valid_pdfs - already_processed
     
-    print(f"Found {valid_pdfs} PDFs to process.")
-    print(f"Failed downloads: {failed_downloads}")
-    print(f"Already processed: {already_processed}")
-    print(f"Remaining to process: {remaining_to_process}")
+    logger.info(f"Found {valid_pdfs} PDFs to process.")
+    logger.info(f"Failed downloads: {failed_downloads}")
+    logger.info(f"Already processed: {already_processed}")
+    logger.info(f"Remaining to process: {remaining_to_process}")
     
     # Initialize the agent for PDF processing
     agent = AgentPDFProcessor()
     
+    if "--batch" in sys.argv:
+        run_batch(df, store, agent)
+    
+    previous = outdated_results(store, agent.analysis_agent)
+    remaining_to_process += len(previous)
+    
     # Process each PDF
     processed_count = 0
-    for index, row in df.iterrows():
-        # Skip rows without PDF filenames - either not downloaded or failed downloads
-        if pd.isna(row['PDF_Filename']):
-            continue
-        
-        # Skip rows that have already been processed
-        if pd.notna(row['Processed_Result']):
-            continue
-        
-        pdf_path = os.path.join('cvs', row['PDF_Filename'])
-        person_name = row['Nome Completo']
+    # Skip rows without PDF filenames (not downloaded or failed) and rows already processed, unless their result is outdated
+    indexes = sorted(set(store.pending('Processed_Result')) | set(previous))
+    for row in iter_records(df.loc[indexes], CANDIDATE_FIELDS):
+        index = row.index
+        pdf_path = os.path.join('cvs', row.pdf_filename)
+        person_name = row.name
+        outdated = index in previous
         
-        # Check if the PDF exists
-        if not os.path.exists(pdf_path):
-            print(f"Warning: PDF file not found for {person_name}: {pdf_path}")
-            df.at[index, 'Processed_Result'] = "ERROR: PDF file not found"
-            df.to_excel('aplication_processed.xlsx', index=False)
-            continue
-        
-        try:
-            processed_count += 1
-            print(f"Processing CV for {person_name} ({processed_count}/{remaining_to_process})...")
-            
-            # Process the PDF using the agent
-            result = agent.process_pdf(pdf_path, person_name=person_name, email=row['Email'])
+        with candidate_context(candidate_trace_id(index)):
+            # Check if the PDF exists
+            if not os.path.exists(pdf_path):
+                logger.warning(f"PDF file not found for {person_name}: {pdf_path}")
+                record_result(df, store, index, "ERROR: PDF file not found", outdated=outdated)
+                continue
             
-            # Store the result in the dataframe
-            df.at[index, 'Processed_Result'] = str(result)
-            
-            print(f"Successfully processed: {row['PDF_Filename']}")
-            
-            # Save progress after each processed PDF
-            df.to_excel('aplication_processed.xlsx', index=False)
-            print("Progress saved to aplication_processed.xlsx")
-            
-        except Exception as e:
-            error_msg = f"Error processing PDF for {person_name}: {e}"
-            print(error_msg)
-            # Record the error in the dataframe
-            df.at[index, 'Processed_Result'] = f"ERROR: {str(e)}"
-            # Still save progress after errors
-            df.to_excel('aplication_processed.xlsx', index=False)
+            try:
+                processed_count += 1
+                logger.info(f"Processing CV for {person_name} ({processed_count}/{remaining_to_process})...")
+                
+                # Process the PDF using the agent, reusing the stages of an outdated result that still hold
+                stages = {}
+                result = agent.process_pdf(pdf_path, person_name=person_name, email=row.email, previous=previous.get(index), stages=stages)
+                
+                # Store the result in the dataframe and the candidate store
+                record_result(df, store, index, str(result), stages, outdated=outdated)
+                
+                logger.info(f"Successfully processed: {row.pdf_filename}")
+                
+            except Exception as e:
+                error_msg = f"Error processing PDF for {person_name}: {e}"
+                logger.warning(error_msg)
+                # Record the error in the dataframe and the candidate store
+                record_result(df, store, index, f"ERROR: {str(e)}", outdated=outdated)
+    
+    propagate_results(df, store)
     
-    # Make sure the final updated Excel file is saved
-    df.to_excel('aplication_processed.xlsx', index=False)
+    # Export the processed Excel file
+    store.export(OUTPUT_PATH)
     
     # Calculate final statistics
     successful_processing = df['Processed_Result'].notna().sum() - df['Processed_Result'].str.startswith('ERROR:').sum() if 'Processed_Result' in df.columns else 0
     error_processing = df['Processed_Result'].str.startswith('ERROR:').sum() if 'Processed_Result' in df.columns else 0
     
-    print("\nAll PDFs processed.")
-    print(f"Total CVs successfully processed: {successful_processing}")
-    print(f"Total CVs with processing errors: {error_processing}")
-    print(f"Total CVs that failed to download: {failed_downloads}")
-    print("Updated Excel file saved as 'aplication_processed.xlsx'")
+    logger.info("All PDFs processed.")
+    logger.info(f"Total CVs successfully processed: {successful_processing}")
+    logger.info(f"Total CVs with processing errors: {error_processing}")
+    logger.info(f"Total CVs that failed to download: {failed_downloads}")
+    prefilter = agent.analysis_agent.prefilter_summary()
+    if prefilter:
+        logger.info(f"Gemini calls saved by the local pre-filter: {prefilter['llm_calls_saved']}")
+    sections = agent.analysis_agent.section_summary()
+    if sections and sections['candidates']:
+        logger.info(f"Resume tokens saved by section extraction: {sections['tokens_saved']} "
+              f"({sections['tokens_saved_per_candidate']:.0f} per candidate)")
+    usage = get_rate_limiter().usage_summary()
+    if usage:
+        logger.info(f"Gemini input tokens: {usage['prompt_tokens']} ({usage['cached_tokens']} cached, {usage['uncached_tokens']} uncached)")
+    get_metrics().report()
+    logger.info("Updated Excel file saved as 'aplication_processed.xlsx'")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Process-wide rate limiting for Gemini API calls
+"""
+
+import random
+import re
+import threading
+import time
+from config import (
+    GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE,
+    RETRY_BASE_DELAY, RETRY_MAX_DELAY
+)
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously up to its capacity.
+
+    Reservations may take the bucket below zero; the caller then waits for the
+    returned delay, which keeps concurrent callers in FIFO order without polling.
+    """
+
+    def __init__(self, per_minute):
+        """Create a bucket holding one minute worth of budget"""
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # Units refilled per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        """Add the budget accumulated since the last update"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount from the bucket and return how long to wait before using it"""
+        self._refill(now)
+        self.tokens -= min(float(amount), self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def adjust(self, amount, now):
+        """Charge (positive) or refund (negative) budget after the fact"""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class GeminiRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by every thread.
+
+    Callers reserve one request plus an estimated token count before each call,
+    reconcile the estimate with the real usage afterwards and pause everyone
+    when the API answers with 429.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=GEMINI_TOKENS_PER_MINUTE):
+        """Initialize the limiter with per-minute budgets"""
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        # Input tokens reported by Gemini, split by whether Gemini served them from its implicit prefix cache
+        self.usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def reserve(self, tokens=0):
+        """
+        Reserve budget for one request and return the delay (seconds) before sending it.
+
+        Does not sleep, so both threads and asyncio code can share the same limiter.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self._requests.reserve(1, now),
+                self._tokens.reserve(tokens, now),
+                self._paused_until - now
+            )
+            return max(0.0, delay)
+
+    def acquire(self, tokens=0):
+        """Block the calling thread until the request fits in the budget"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the real token usage is known"""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.adjust(actual_tokens - estimated_tokens, time.monotonic())
+
+    def record_prompt_usage(self, response):
+        """Add the input tokens of a response to the cached/uncached usage counters"""
+        prompt_tokens, cached_tokens = response_prompt_tokens(response)
+        if prompt_tokens is None:
+            return
+        with self._lock:
+            self.usage["requests"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["cached_tokens"] += cached_tokens
+
+    def usage_summary(self):
+        """Return cached and uncached input token totals, or None before any usage was reported"""
+        with self._lock:
+            usage = dict(self.usage)
+        if not usage["requests"]:
+            return None
+        usage["uncached_tokens"] = usage["prompt_tokens"] - usage["cached_tokens"]
+        usage["cached_ratio"] = usage["cached_tokens"] / max(1, usage["prompt_tokens"])
+        return usage
+
+    def pause(self, seconds):
+        """Hold back every caller for the given time (used after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the process-wide Gemini rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = GeminiRateLimiter()
+        return _limiter
+
+def estimate_tokens(*args, **kwargs):
+    """Roughly estimate the input tokens of a call (~4 characters per token)"""
+    chars = 0
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, (list, tuple)):
+            chars += sum(len(item) for item in value if isinstance(item, str))
+    return chars // 4
+
+def response_token_count(response):
+    """Return the total tokens reported by a Gemini response, if available"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    return getattr(usage, "total_token_count", None) or None
+
+def response_prompt_tokens(response):
+    """
+    Return (prompt tokens, cached prompt tokens) reported by a Gemini response
+
+    The first value is None when the response has no usage metadata; the cached
+    count is 0 for SDK versions that do not report it.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) if usage is not None else None
+    if not prompt_tokens:
+        return None, 0
+    return prompt_tokens, getattr(usage, "cached_content_token_count", 0) or 0
+
+def is_rate_limit_error(error):
+    """Check whether an exception is an HTTP 429 / quota exhausted error"""
+    code = getattr(error, "code", None)
+    if code == 429 or getattr(code, "value", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "ResourceExhausted" in type(error).__name__ or "quota" in message.lower()
+
+def retry_after_seconds(error):
+    """Extract the server-suggested retry delay from an exception, if any"""
+    # HTTP responses (requests) carry a Retry-After header
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    # Gemini errors put the delay in the message ("retry_delay { seconds: 12 }" / "retry in 12.5s")
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(error))
+    if not match:
+        match = re.search(r"retry in ([\d.]+)\s*s", str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
@@ -1,45 +1,230 @@
+import logging
 import os
 import sys
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+import pandas as pd
+import download_cvs
+import process_cvs
+from agents import TextExtractionAgent, CriteriaAnalysisAgent
+from config import (
+    DOWNLOAD_DAILY_LIMIT, EXTRACTION_WORKERS, PIPELINE_QUEUE_SIZE,
+    PIPELINE_DOWNLOAD_WORKERS, PIPELINE_EXTRACT_WORKERS, PIPELINE_ANALYSIS_WORKERS
+)
+from downloader import DriveDownloader
+from pipeline import StagedPipeline
+from metrics import get_metrics
+from logging_setup import setup_logging, candidate_trace_id
+from sheet_io import iter_records
+
+logger = logging.getLogger(__name__)
 
 def print_separator():
-    print("\n" + "="*50 + "\n")
+    logger.info("=" * 50)
 
-def main():
-    print("CV Processing Pipeline")
-    print_separator()
-    
+class CandidateItem:
+    """A candidate flowing through the streaming pipeline"""
+
+    def __init__(self, index, person_name, email, pdf_path, job=None, previous=None):
+        self.index = index
+        self.person_name = person_name
+        self.email = email
+        self.pdf_path = pdf_path
+        self.job = job  # DownloadJob when the CV still has to be downloaded
+        self.previous = previous  # Stages of an outdated result that is screened again
+        self.download_error = None
+        self.resume_text = None
+        self.scanned_pdf = None  # PDF bytes of a scan, screened by Gemini instead of the text
+        self.result = None
+        self.stages = None
+
+class StreamingCVPipeline:
+    """
+    Downloads, extracts and screens CVs in one process.
+
+    Each candidate moves to extraction as soon as its file lands and to
+    screening as soon as its text is ready, so Drive downloads and Gemini
+    calls overlap instead of running one after the other. Sheet updates are
+    only made by the calling thread, through the same candidate store used by
+    download_cvs.py and process_cvs.py.
+    """
+
+    def __init__(self, download_workers=PIPELINE_DOWNLOAD_WORKERS, extract_workers=PIPELINE_EXTRACT_WORKERS,
+                 analysis_workers=PIPELINE_ANALYSIS_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        """Initialize the pipeline with per-stage concurrency and queue size"""
+        self.download_workers = download_workers
+        self.extract_workers = extract_workers
+        self.analysis_workers = analysis_workers
+        self.queue_size = queue_size
+        self.downloader = DriveDownloader(max_workers=download_workers)
+        self.analysis_agent = CriteriaAnalysisAgent()
+        self.extraction_agent = None
+        self.metadata = {}
+
+    def run(self):
+        """Run the pipeline over every candidate that still needs a download or a result"""
+        if not os.path.exists(download_cvs.CV_FOLDER):
+            os.makedirs(download_cvs.CV_FOLDER)
+
+        self.download_df, self.store = download_cvs.load_sheet()
+        self.process_df, _ = process_cvs.load_sheet(self.store)
+        download_cvs.mark_duplicate_submissions(self.download_df, self.store)
+        items = self._build_items()
+        self.metadata = download_cvs.prefetch_metadata([item.job for item in items if item.job]) or {}
+
+        pipeline = StagedPipeline(
+            queue_size=self.queue_size, on_error=self._on_error,
+            trace_id=lambda item: candidate_trace_id(item.index)
+        )
+        pipeline.add_stage("download", self._download, self.download_workers)
+        pipeline.add_stage("extract", self._extract, self.extract_workers)
+        pipeline.add_stage("analyze", self._analyze, self.analysis_workers)
+
+        with ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS) as pool:
+            self.extraction_agent = TextExtractionAgent(executor=pool)
+            try:
+                pipeline.run(items, self._record)
+            finally:
+                # Export everything recorded so far, even after Ctrl+C
+                process_cvs.propagate_results(self.process_df, self.store)
+                self.store.export(download_cvs.OUTPUT_PATH)
+                self.store.export(process_cvs.OUTPUT_PATH)
+
+        return pipeline.summary()
+
+    def _build_items(self):
+        """Create pipeline items for pending downloads and for downloaded CVs without a result"""
+        df = self.process_df
+
+        previous = process_cvs.outdated_results(self.store, self.analysis_agent)
+        indexes = sorted(set(self.store.pending('Processed_Result')) | set(previous))
+        ready = []
+        for row in iter_records(df.loc[indexes], process_cvs.CANDIDATE_FIELDS):
+            pdf_path = os.path.join(download_cvs.CV_FOLDER, row.pdf_filename)
+            ready.append(CandidateItem(row.index, row.name, row.email, pdf_path, previous=previous.get(row.index)))
+
+        jobs = [job for job in download_cvs.build_jobs(self.download_df) if pd.isna(df.at[job.index, 'Processed_Result'])]
+        if DOWNLOAD_DAILY_LIMIT is not None:
+            jobs = jobs[:DOWNLOAD_DAILY_LIMIT]
+        pending = [
+            CandidateItem(job.index, job.person_name, self.download_df.at[job.index, 'Email'], job.output_path, job)
+            for job in jobs
+        ]
+
+        logger.info(f"CVs ready to screen: {len(ready)}")
+        logger.info(f"CVs to download and screen: {len(pending)}")
+
+        # Interleave both kinds so downloads and Gemini calls start right away
+        return [item for pair in zip_longest(ready, pending) for item in pair if item is not None]
+
+    def _download(self, item):
+        """Download stage: fetch the CV if needed"""
+        if item.job is not None:
+            try:
+                self.downloader.download_checked(item.job.file_id, item.job.output_path, self.metadata.get(item.job.file_id))
+            except Exception as e:
+                item.download_error = e
+        return item
+
+    def _extract(self, item):
+        """Extraction stage: turn the CV into text"""
+        if item.download_error is not None:
+            return item
+        if not os.path.exists(item.pdf_path):
+            item.result = "ERROR: PDF file not found"
+            return item
+        logger.debug(f"Extracting resume for {item.person_name} from: {item.pdf_path}")
+        text = self.extraction_agent.extract_text_from_local_file(item.pdf_path)
+        if text.startswith("Error"):
+            item.result = f"Error: {text}"
+        else:
+            item.resume_text = text
+            if self.analysis_agent.scanned_agent is not None:
+                item.scanned_pdf = self.extraction_agent.read_scanned_pdf(item.pdf_path, text)
+        return item
+
+    def _analyze(self, item):
+        """Screening stage: check the resume against the criteria"""
+        if item.scanned_pdf is not None:
+            item.stages = {}
+            item.result = self.analysis_agent.analyze_scanned(item.scanned_pdf, previous=item.previous, stages=item.stages)
+            item.resume_text = item.scanned_pdf = None  # Free memory early
+        elif item.resume_text is not None:
+            item.stages = {}
+            item.result = self.analysis_agent.analyze_resume(item.resume_text, previous=item.previous, stages=item.stages)
+            item.resume_text = None  # Free memory early
+        return item
+
+    def _on_error(self, stage_name, item, error):
+        """Record an unexpected stage error on the item and keep it moving"""
+        logger.warning(f"Error in {stage_name} stage for {item.person_name}: {error}")
+        item.result = f"ERROR: {str(error)}"
+        return item
+
+    def _record(self, item):
+        """Commit a finished item to the candidate store (runs in the calling thread only)"""
+        if item.job is not None:
+            download_cvs.record_download(self.download_df, self.store, item.job, item.download_error)
+            if item.download_error is not None:
+                return
+            self.process_df.at[item.index, 'PDF_Filename'] = item.job.pdf_filename
+
+        if item.result is None:
+            return
+        logger.info(f"Result for {item.person_name}: {item.result}")
+        process_cvs.record_result(self.process_df, self.store, item.index, str(item.result), item.stages, outdated=item.previous is not None)
+
+def run_sequential():
+    """Run download_cvs.py and then process_cvs.py as separate processes"""
     # Step 1: Download CVs
-    print("Step 1: Downloading CVs from Google Drive links in Excel file")
-    print("Running download_cvs.py...")
-    
+    logger.info("Step 1: Downloading CVs from Google Drive links in Excel file")
+    logger.info("Running download_cvs.py...")
+
     try:
         result = subprocess.run(["python", "download_cvs.py"], check=True)
         if result.returncode != 0:
-            print("Error: download_cvs.py failed.")
+            logger.error("download_cvs.py failed.")
             sys.exit(1)
     except Exception as e:
-        print(f"Error running download_cvs.py: {e}")
+        logger.error(f"Error running download_cvs.py: {e}")
         sys.exit(1)
-    
+
     print_separator()
-    
+
     # Step 2: Process CVs
-    print("Step 2: Processing downloaded CVs using the agent")
-    print("Running process_cvs.py...")
-    
+    logger.info("Step 2: Processing downloaded CVs using the agent")
+    logger.info("Running process_cvs.py...")
+
     try:
         result = subprocess.run(["python", "process_cvs.py"], check=True)
         if result.returncode != 0:
-            print("Error: process_cvs.py failed.")
+            logger.error("process_cvs.py failed.")
             sys.exit(1)
     except Exception as e:
-        print(f"Error running process_cvs.py: {e}")
+        logger.error(f"Error running process_cvs.py: {e}")
         sys.exit(1)
-    
+
+def main():
+    setup_logging()
+    logger.info("CV Processing Pipeline")
+    print_separator()
+
+    if "--sequential" in sys.argv:
+        run_sequential()
+    else:
+        # Download, extraction and screening overlap in one process
+        logger.info("Downloading, extracting and screening CVs as a streaming pipeline...")
+        summary = StreamingCVPipeline().run()
+        print_separator()
+        for stage in summary:
+            logger.info(f"{stage['stage']}: {stage['processed']} items, {stage['busy_seconds']:.1f}s busy "
+                  f"across {stage['workers']} workers")
+        get_metrics().report()
+
     print_separator()
-    print("CV Processing Pipeline completed successfully!")
-    print("Results saved in 'aplication_processed.xlsx'")
+    logger.info("CV Processing Pipeline completed successfully!")
+    logger.info("Results saved in 'aplication_processed.xlsx'")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,114 @@
+"""
+Streaming reads and writes of application sheets
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+import openpyxl
+import pandas as pd
+
+def cell_value(value):
+    """Convert NaN/NaT and numpy scalars to values openpyxl can write"""
+    if value is None or value is pd.NaT:
+        return None
+    if hasattr(value, "item") and not isinstance(value, pd.Timestamp):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _header(row):
+    """Column names of a header row, named like pd.read_excel names blank headers"""
+    return [str(name) if name is not None else f"Unnamed: {position}" for position, name in enumerate(row)]
+
+def _iter_rows(path):
+    """Yield the header and then every row of the first worksheet as tuples, without loading the workbook"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def read_header(path):
+    """Return the column names of a sheet without reading its rows"""
+    rows = _iter_rows(path)
+    header = _header(next(rows, ()))
+    rows.close()
+    return header
+
+def read_sheet(path, columns=None):
+    """
+    Load a sheet into a dataframe, keeping only the given columns
+
+    Rows are streamed from the workbook in read-only mode, so cells of other
+    columns are never kept in memory. Columns missing from the sheet are
+    skipped; trailing empty rows are dropped, as pd.read_excel does.
+    """
+    rows = _iter_rows(path)
+    header = _header(next(rows, ()))
+    if columns is None:
+        positions = list(range(len(header)))
+    else:
+        positions = [header.index(column) for column in columns if column in header]
+
+    data = []
+    last_filled = 0
+    for row in rows:
+        values = [row[position] if position < len(row) else None for position in positions]
+        data.append(values)
+        if any(value is not None for value in row):
+            last_filled = len(data)
+    del data[last_filled:]
+
+    return pd.DataFrame(data, columns=[header[position] for position in positions])
+
+@lru_cache(maxsize=None)
+def _record_type(fields):
+    return namedtuple("SheetRecord", ("index",) + fields)
+
+def iter_records(df, fields):
+    """
+    Yield one lightweight record per row instead of a pandas Series
+
+    Args:
+        df (DataFrame): The sheet
+        fields (dict): Record attribute -> column name; missing columns read as None
+
+    Yields:
+        namedtuple: index plus one attribute per field, with NaN turned into None
+    """
+    record_type = _record_type(tuple(fields))
+    columns = [df[column].tolist() if column in df.columns else [None] * len(df) for column in fields.values()]
+    for position, index in enumerate(df.index):
+        yield record_type(index, *(cell_value(column[position]) for column in columns))
+
+def write_sheet(df, path, source_path=None):
+    """
+    Write a dataframe to Excel, carrying over the columns it does not hold from source_path
+
+    A dataframe read with only some columns (read_sheet(path, columns)) is
+    merged row by row into the full rows of the workbook it came from, so the
+    other columns survive without ever being loaded. Both workbooks are
+    streamed, and row i of the sheet is matched with position i of df.
+    """
+    if source_path is None:
+        df.to_excel(path, index=False)
+        return
+
+    rows = _iter_rows(source_path)
+    header = _header(next(rows, ()))
+    header += [column for column in df.columns if column not in header]
+    columns = [(header.index(column), df[column].tolist()) for column in df.columns]
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(header)
+    for position in range(len(df)):
+        values = list(next(rows, ()))
+        values += [None] * (len(header) - len(values))
+        for column_position, column in columns:
+            values[column_position] = cell_value(column[position])
+        sheet.append(values)
+    rows.close()
+    workbook.save(path)
@@ -0,0 +1,169 @@
+"""
+Batch mode against a local stand-in for the Gemini Files and Batch APIs
+"""
+
+import json
+import os
+import pytest
+import requests
+from agents import CriteriaAnalysisAgent
+from batch_mode import BatchScreeningRunner, BatchError, GeminiBatchClient, batch_state
+
+BASE_URL = "http://gemini.test"
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, text=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = text if text is not None else json.dumps(payload)
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+class FakeBatchServer:
+    """
+    requests.Session stand-in that serves upload -> create -> poll -> download
+
+    Batches stay running for running_polls polls, then finish with an answer
+    for every uploaded request except the dropped keys, or with error when one
+    is given. Answers are "Sim" for prompts containing "APROVADO" and "Não"
+    otherwise.
+    """
+
+    def __init__(self, running_polls=1, error=None, dropped=()):
+        self.running_polls = running_polls
+        self.error = error
+        self.dropped = set(dropped)
+        self.calls = []
+        self.uploads = {}
+        self.batches = {}
+
+    def request(self, method, url, headers=None, timeout=None, json=None, data=None, params=None):
+        path = url[len(BASE_URL):]
+        self.calls.append((method, path))
+        if method == "POST" and path == "/upload/v1beta/files":
+            return FakeResponse(headers={"X-Goog-Upload-URL": f"{BASE_URL}/upload-session/{len(self.uploads) + 1}"})
+        if method == "POST" and path.startswith("/upload-session/"):
+            name = f"files/input-{len(self.uploads) + 1}"
+            self.uploads[name] = data.decode("utf-8")
+            return FakeResponse(payload={"file": {"name": name}})
+        if method == "POST" and path.endswith(":batchGenerateContent"):
+            name = f"batches/{len(self.batches) + 1}"
+            self.batches[name] = {"input": json["batch"]["input_config"]["file_name"], "polls": 0}
+            return FakeResponse(payload={"name": name})
+        if method == "GET" and path.startswith("/v1beta/batches/"):
+            return FakeResponse(payload=self._poll(path[len("/v1beta/"):]))
+        if method == "GET" and path.startswith("/download/v1beta/files/output-"):
+            batch = self.batches[f"batches/{path.split('output-')[1].split(':')[0]}"]
+            return FakeResponse(text=self._results(self.uploads[batch["input"]], self.dropped))
+        return FakeResponse(404, payload={"error": {"message": "not found"}})
+
+    def _poll(self, name):
+        batch = self.batches[name]
+        batch["polls"] += 1
+        if batch["polls"] <= self.running_polls:
+            return {"name": name, "metadata": {"state": "BATCH_STATE_RUNNING"}}
+        if self.error is not None:
+            # A failed long-running operation carries an error and no state
+            return {"name": name, "done": True, "error": {"code": 400, "message": self.error}}
+        return {"name": name, "done": True, "response": {"responsesFile": f"files/output-{name.split('/')[1]}"}}
+
+    @staticmethod
+    def _results(requests_file, dropped):
+        lines = []
+        for line in requests_file.splitlines():
+            request = json.loads(line)
+            if request["key"] in dropped:
+                continue
+            prompt = request["request"]["contents"][0]["parts"][0]["text"]
+            answer = "Sim" if "APROVADO" in prompt else "Não"
+            lines.append(json.dumps({"key": request["key"], "response": {"candidates": [{"content": {"parts": [{"text": answer}]}}]}}))
+        return "\n".join(lines)
+
+@pytest.fixture
+def runner_factory(tmp_path, monkeypatch):
+    """Build BatchScreeningRunners that keep their files in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    analysis_agent = CriteriaAnalysisAgent(combined=False, prefilter=False, sections=False, multi_resume=False, scanned=False)
+
+    def make(server):
+        client = GeminiBatchClient(api_key="test", base_url=BASE_URL, session=server)
+        runner = BatchScreeningRunner(
+            analysis_agent, client, state_path=str(tmp_path / "batch_job.json"),
+            job_file=str(tmp_path / "batch_requests.jsonl"), poll_interval=0
+        )
+        runner.cache = None
+        return runner
+
+    return make
+
+RESUMES = {0: "Cursando UFMG, APROVADO", 3: "Formado em faculdade particular"}
+
+def test_batch_state_of_finished_operations():
+    assert batch_state({"done": True, "response": {}}) == "BATCH_STATE_SUCCEEDED"
+    assert batch_state({"done": True, "error": {"message": "quota"}}) == "BATCH_STATE_FAILED"
+    assert batch_state({"metadata": {"state": "BATCH_STATE_RUNNING"}}) == "BATCH_STATE_RUNNING"
+    assert batch_state({"name": "batches/1"}) is None
+
+def test_run_uploads_creates_polls_downloads_and_merges(runner_factory):
+    server = FakeBatchServer(running_polls=2)
+    runner = runner_factory(server)
+
+    stages = {}
+    assert runner.run(RESUMES, stages) == {0: "Sim", 3: "Não"}
+    assert [call for call in server.calls if call[0] == "GET" and "batches" in call[1]] == [("GET", "/v1beta/batches/1")] * 3
+    assert len(server.uploads) == 1 and len(server.batches) == 1
+    # Two prompts per candidate
+    assert len(server.uploads["files/input-1"].splitlines()) == 4
+    assert not os.path.exists(runner.state_path)
+    # Recorded like analyze_resume's stages, so a change of prompt or model screens them again
+    fingerprints = runner.analysis_agent.fingerprints
+    assert stages[0] == {"university": {"fp": fingerprints["university"], "result": True},
+                         "company": {"fp": fingerprints["company"], "result": True}}
+    assert stages[3] == {"university": {"fp": fingerprints["university"], "result": False}}
+    assert not runner.analysis_agent.outdated_stages(stages[0])
+
+def test_failed_job_raises_and_forgets_the_batch(runner_factory):
+    runner = runner_factory(FakeBatchServer(error="Quota exceeded"))
+
+    with pytest.raises(BatchError, match="Quota exceeded"):
+        runner.run(RESUMES)
+    # The next run submits a new job instead of resuming the failed one
+    assert not os.path.exists(runner.state_path)
+
+def test_connection_errors_raise_batch_error(runner_factory):
+    class UnreachableServer(FakeBatchServer):
+        def request(self, method, url, **kwargs):
+            raise requests.exceptions.ConnectionError("Connection refused")
+
+    with pytest.raises(BatchError, match="Connection refused"):
+        runner_factory(UnreachableServer()).run(RESUMES)
+
+def test_candidates_without_an_answer_stay_pending(runner_factory):
+    runner = runner_factory(FakeBatchServer(running_polls=0, dropped={"0:company", "3:university"}))
+    stages = {}
+
+    # Neither gets an error verdict, so the per-candidate screening picks both up
+    assert runner.run(RESUMES, stages) == {}
+    assert "company" not in stages[0] and "university" not in stages[3]
+
+def test_resumes_the_batch_recorded_in_the_state_file(runner_factory):
+    server = FakeBatchServer(running_polls=0)
+    first = runner_factory(server)
+    # A previous run submitted the job and was interrupted while polling
+    file_name = first.client.upload_jsonl(_write_job_file(first))
+    batch_name = first.client.create_batch(file_name)
+    with open(first.state_path, "w") as f:
+        json.dump({"batch": batch_name, "keys": sorted(f"{index}:{name}" for index in RESUMES for name in ("university", "company"))}, f)
+    server.calls.clear()
+
+    assert runner_factory(server).run(RESUMES) == {0: "Sim", 3: "Não"}
+    assert not any(method == "POST" for method, _ in server.calls)
+    assert len(server.batches) == 1
+
+def _write_job_file(runner):
+    """Write the job file a runner would submit for RESUMES and return its path"""
+    pending = {f"{index}:{name}": (index, name) for index in RESUMES for name in ("university", "company")}
+    runner._write_job_file({key: RESUMES[index] for key, (index, _) in pending.items()}, pending)
+    return runner.job_file
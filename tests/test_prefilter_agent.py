@@ -0,0 +1,53 @@
+"""
+Keyword pre-filter decisions on resumes with education and experience sections
+"""
+
+import pytest
+from agents.prefilter_agent import KeywordPreFilterAgent
+
+def resume(education, experience="", courses=""):
+    """Build a resume with the usual section headings"""
+    text = f"Maria Silva\nmaria@example.com\n\nFormação Acadêmica\n{education}\n"
+    if experience:
+        text += f"\nExperiência Profissional\n{experience}\n"
+    if courses:
+        text += f"\nCursos Complementares\n{courses}\n"
+    return text
+
+@pytest.fixture
+def prefilter():
+    return KeywordPreFilterAgent()
+
+def test_agency_in_experience_is_not_a_public_university(prefilter):
+    text = resume("Administração - Insper, cursando", "Estágio na Receita Federal, projeto de pesquisa em tributação")
+    assert prefilter.decide(text)[0] is None
+
+def test_state_ngo_and_top_company_do_not_accept_a_private_school(prefilter):
+    text = resume("Economia - FGV, período atual", "Voluntária em ONG estadual\nEstágio no Itaú")
+    assert prefilter.decide(text)[0] is None
+
+def test_excluded_school_outside_education_does_not_reject(prefilter):
+    text = resume("Engenharia de Produção - USP, cursando", "Estágio no Itaú", courses="Excel avançado - SENAC")
+    assert prefilter.decide(text) == ("Sim", "usp cursando, com itau")
+
+def test_unlisted_public_university_with_excluded_school_is_ambiguous(prefilter):
+    text = resume("Engenharia Elétrica - UTFPR, cursando\nTécnico em Eletrônica - SENAI")
+    assert prefilter.decide(text)[0] is None
+
+def test_unlisted_institute_with_excluded_school_is_ambiguous(prefilter):
+    text = resume("Engenharia da Computação - ITA, cursando\nMBA em Dados - FIAP")
+    assert prefilter.decide(text)[0] is None
+
+def test_only_excluded_institutions_reject(prefilter):
+    text = resume("Sistemas de Informação - UNINOVE, cursando\nTecnólogo - FIAP")
+    assert prefilter.decide(text) == ("Não", "instituição particular: fiap, uninove")
+
+def test_accepted_and_excluded_institutions_are_ambiguous(prefilter):
+    text = resume("Ciência da Computação - UFMG, cursando\nTecnólogo - FIAP", "Estágio no Nubank")
+    assert prefilter.decide(text)[0] is None
+
+def test_generic_words_are_not_evidence(prefilter):
+    assert prefilter.decide(resume("Universidade Federal, período atual", "Estágio no Nubank"))[0] is None
+
+def test_resume_without_education_section_is_ambiguous(prefilter):
+    assert prefilter.decide("Cursando Ciência da Computação na UFMG, estágio no Nubank\nFIAP")[0] is None
@@ -2,64 +2,130 @@
 Utility functions for the resume screening application
 """
 
+import logging
+import asyncio
 import os
 import re
 import time
 import requests
 import io
 import json
+import threading
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from config import API_RATE_LIMIT_DELAY, MAX_RETRIES
+from config import MAX_RETRIES, GEMINI_MODEL, RESPONSE_CACHE_ENABLED, GEMINI_REQUEST_TIMEOUT
+from cache import get_response_cache, ResponseCache, sha256_text
+from metrics import get_metrics
+from rate_limiter import (
+    get_rate_limiter, estimate_tokens, response_token_count,
+    is_rate_limit_error, retry_after_seconds, backoff_delay
+)
+
+logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+# Drive credentials are loaded once per process and shared by every thread
+_drive_credentials = None
+_drive_lock = threading.Lock()
+# httplib2 is not thread-safe, so each thread keeps its own service object
+_drive_local = threading.local()
+
+def _get_drive_credentials():
+    """
+    Load (and refresh or create, if needed) the Google Drive API credentials once per process
+    """
+    global _drive_credentials
+    with _drive_lock:
+        if _drive_credentials is not None and _drive_credentials.valid:
+            return _drive_credentials
+        
+        # Check if credentials.json exists
+        if not os.path.exists('credentials.json'):
+            raise Exception(
+                "credentials.json not found. Please follow the instructions in README.md to set up Google Drive API credentials. "
+                "You can use credentials.json.example as a template."
+            )
+        
+        creds = _drive_credentials
+        # The file token.json stores the user's access and refresh tokens
+        if creds is None and os.path.exists('token.json'):
+            creds = Credentials.from_authorized_user_info(
+                json.loads(open('token.json').read()), SCOPES)
+        
+        # If there are no valid credentials available, let the user log in
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    'credentials.json', SCOPES)
+                creds = flow.run_local_server(port=0)
+            # Save the credentials for the next run
+            with open('token.json', 'w') as token:
+                token.write(creds.to_json())
+        
+        _drive_credentials = creds
+        return creds
+
 def get_drive_service():
     """
     Get an authorized Google Drive API service instance
+    
+    The service is built once per thread (using the bundled discovery document)
+    and reused; expired access tokens are refreshed automatically by the client.
     """
-    # Check if credentials.json exists
-    if not os.path.exists('credentials.json'):
-        raise Exception(
-            "credentials.json not found. Please follow the instructions in README.md to set up Google Drive API credentials. "
-            "You can use credentials.json.example as a template."
-        )
-        
-    creds = None
-    # The file token.json stores the user's access and refresh tokens
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_info(
-            json.loads(open('token.json').read()), SCOPES)
+    service = getattr(_drive_local, 'service', None)
+    if service is None:
+        service = build('drive', 'v3', credentials=_get_drive_credentials(), cache_discovery=False)
+        _drive_local.service = service
+    return service
+
+def prefetch_drive_metadata(file_ids, fields='id,name,mimeType,size,md5Checksum', batch_size=100):
+    """
+    Resolve the metadata of many Drive files with batched API requests
+    
+    Returns:
+        dict: file_id -> metadata dict, or {'error': message, 'status': HTTP status or None}
+              for files that could not be read
+    """
+    service = get_drive_service()
+    metadata = {}
+    file_ids = list(dict.fromkeys(file_ids))
     
-    # If there are no valid credentials available, let the user log in
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+    def callback(request_id, response, exception):
+        if exception is not None:
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            metadata[request_id] = {'error': str(exception), 'status': int(status) if status is not None else None}
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
+            metadata[request_id] = response
     
-    # Return an authorized Drive API service
-    return build('drive', 'v3', credentials=creds)
+    # Drive accepts at most 100 calls per batch request
+    for start in range(0, len(file_ids), batch_size):
+        batch = service.new_batch_http_request(callback=callback)
+        for file_id in file_ids[start:start + batch_size]:
+            batch.add(service.files().get(fileId=file_id, fields=fields), request_id=file_id)
+        retry_request(batch.execute)
+    
+    return metadata
 
-def download_file_from_drive(file_id):
+def download_file_from_drive(file_id, file_metadata=None):
     """
     Download a file from Google Drive using the API
+    
+    Pass file_metadata (from prefetch_drive_metadata) to skip the metadata request.
     """
     try:
         # Get Drive API service
         service = get_drive_service()
         
         # Get file metadata to determine file type
-        file_metadata = service.files().get(fileId=file_id, fields='name,mimeType').execute()
+        if file_metadata is None:
+            file_metadata = service.files().get(fileId=file_id, fields='name,mimeType').execute()
         
         # Download file content
         request = service.files().get_media(fileId=file_id)
@@ -83,21 +149,154 @@ def download_file_from_drive(file_id):
 
 def rate_limited_request(func, *args, **kwargs):
     """
-    Wrapper for rate-limited API requests with retries
+    Wrapper for Gemini API requests with the shared rate limiter and retries
+    """
+    return _request_with_retries(func, args, kwargs, get_rate_limiter())
+
+def prompt_fingerprint(prompt_template, model=GEMINI_MODEL):
+    """Hash of a prompt template and model, which together decide an agent's answer for a given resume"""
+    return sha256_text(f"{model}\n{prompt_template}")
+
+def cached_generate(model, prompt, resume_text, prompt_template, validate=None):
+    """
+    Generate a Gemini answer for prompt, memoized on (resume, prompt template, model)
+    
+    Returns the response text. Identical resumes screened with an unchanged
+    prompt template are answered from the persistent cache without an API call.
+    If validate is given, answers it rejects (by raising) are not cached.
+    """
+    cache = get_response_cache() if RESPONSE_CACHE_ENABLED else None
+    if cache is not None:
+        cached = cache.get(resume_text, prompt_template, GEMINI_MODEL)
+        if cached is not None:
+            return cached
+    
+    response = rate_limited_request(model.generate_content, prompt)
+    return _store_response(cache, resume_text, prompt_template, response.text, validate)
+
+def _store_response(cache, resume_text, prompt_template, text, validate):
+    """Cache a response text unless validate rejects it, and return the text"""
+    if cache is not None:
+        if validate is not None:
+            try:
+                validate(text)
+            except ValueError:
+                return text
+        cache.put(resume_text, prompt_template, GEMINI_MODEL, text)
+    return text
+
+# Gemini requests currently running, by (event loop, cache key), shared by identical callers
+_in_flight_requests = {}
+
+async def cached_generate_async(model, prompt, resume_text, prompt_template, validate=None):
+    """
+    Async version of cached_generate with request coalescing
+    
+    Identical prompts requested while a call is already in flight on the same
+    event loop wait for that call instead of sending their own. Cancelling one
+    waiter does not cancel the shared request.
+    """
+    cache = get_response_cache() if RESPONSE_CACHE_ENABLED else None
+    if cache is not None:
+        cached = cache.get(resume_text, prompt_template, GEMINI_MODEL)
+        if cached is not None:
+            return cached
+    
+    cache_key, _, _ = ResponseCache.make_key(resume_text, prompt_template, GEMINI_MODEL)
+    key = (id(asyncio.get_running_loop()), cache_key)
+    task = _in_flight_requests.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _generate_and_store_async(model, prompt, cache, resume_text, prompt_template, validate)
+        )
+        _in_flight_requests[key] = task
+        task.add_done_callback(lambda _: _in_flight_requests.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _generate_and_store_async(model, prompt, cache, resume_text, prompt_template, validate):
+    """Send one Gemini request and cache its answer"""
+    response = await rate_limited_request_async(model.generate_content_async, prompt)
+    return _store_response(cache, resume_text, prompt_template, response.text, validate)
+
+async def rate_limited_request_async(func, *args, **kwargs):
+    """
+    Async wrapper for Gemini API requests with the shared rate limiter, retries
+    and a per-attempt timeout (GEMINI_REQUEST_TIMEOUT)
+    
+    Waiting for the limiter or a backoff never blocks the event loop.
+    """
+    limiter = get_rate_limiter()
+    metrics = get_metrics()
+    for attempt in range(MAX_RETRIES):
+        estimated_tokens = estimate_tokens(*args, **kwargs)
+        delay = limiter.reserve(estimated_tokens)
+        if delay > 0:
+            metrics.observe("rate_limit_wait", delay)
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), GEMINI_REQUEST_TIMEOUT)
+            metrics.observe("gemini_request", time.perf_counter() - start, status="ok")
+            limiter.record_usage(estimated_tokens, response_token_count(result))
+            limiter.record_prompt_usage(result)
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.observe("gemini_request", time.perf_counter() - start, status="error")
+            if attempt < MAX_RETRIES - 1:
+                wait_time = backoff_delay(attempt)
+                metrics.increment("retries", call="gemini", reason="rate_limit" if is_rate_limit_error(e) else "error")
+                if is_rate_limit_error(e):
+                    # Use the server's hint when given and hold back every caller
+                    wait_time = max(wait_time, retry_after_seconds(e) or 0)
+                    limiter.pause(wait_time)
+                logger.warning(f"Request failed: {str(e) or type(e).__name__}. Retrying in {wait_time:.1f} seconds...")
+                await asyncio.sleep(wait_time)
+            else:
+                logger.error(f"Request failed after {MAX_RETRIES} attempts: {str(e) or type(e).__name__}")
+                raise
+
+def retry_request(func, *args, **kwargs):
+    """
+    Wrapper for non-Gemini requests (e.g. Google Drive) with retries only
+    """
+    return _request_with_retries(func, args, kwargs, None)
+
+def _request_with_retries(func, args, kwargs, limiter):
+    """
+    Call func with jittered exponential backoff, honoring 429/Retry-After
     """
+    metrics = get_metrics()
+    call = "gemini" if limiter else "http"
     for attempt in range(MAX_RETRIES):
+        estimated_tokens = 0
+        if limiter:
+            estimated_tokens = estimate_tokens(*args, **kwargs)
+            with metrics.timer("rate_limit_wait"):
+                limiter.acquire(estimated_tokens)
+        start = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            time.sleep(API_RATE_LIMIT_DELAY)  # Rate limiting
+            metrics.observe(f"{call}_request", time.perf_counter() - start, status="ok")
+            if limiter:
+                limiter.record_usage(estimated_tokens, response_token_count(result))
+                limiter.record_prompt_usage(result)
             return result
         except Exception as e:
+            metrics.observe(f"{call}_request", time.perf_counter() - start, status="error")
             if attempt < MAX_RETRIES - 1:
-                # Exponential backoff
-                wait_time = (2 ** attempt) + 1
-                print(f"Request failed: {str(e)}. Retrying in {wait_time} seconds...")
+                wait_time = backoff_delay(attempt)
+                metrics.increment("retries", call=call, reason="rate_limit" if is_rate_limit_error(e) else "error")
+                if is_rate_limit_error(e):
+                    # Use the server's hint when given and hold back every caller
+                    wait_time = max(wait_time, retry_after_seconds(e) or 0)
+                    if limiter:
+                        limiter.pause(wait_time)
+                logger.warning(f"Request failed: {str(e)}. Retrying in {wait_time:.1f} seconds...")
                 time.sleep(wait_time)
             else:
-                print(f"Request failed after {MAX_RETRIES} attempts: {str(e)}")
+                logger.error(f"Request failed after {MAX_RETRIES} attempts: {str(e)}")
                 raise
 
 def is_valid_file_path(path):